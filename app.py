@@ -1,17 +1,113 @@
 # app.py
-from flask import Flask, render_template, request, session, redirect, url_for, send_file
-import io, csv, os, numpy as np
-
-from ml.model_runtime import load_model_or_none, row_from_inputs, predict_proba
-MODEL, MODEL_COLS = load_model_or_none()
+from flask import Flask, render_template, request, session, redirect, url_for, send_file, jsonify, Response, stream_with_context
+import io, csv, os, json, time, codecs, itertools, click, numpy as np
+
+from ml.model_runtime import (ModelRegistry, score_chunks, iter_chunks, iter_csv_chunks, frame_from_records,
+                              predict_proba_batch, _to_float, DATA_DIR, artifact_paths, _content_hash,
+                              _fingerprint)
+from ml.explain import load_explainer_or_none, EXPLAIN_PATH
+import projection, multiasset
+from holdings import HoldingsStore
+from sessions import make_session_interface
+from metrics import Metrics
+from jobs import JobQueue, QueueFull
 
 app = Flask(__name__, instance_relative_config=True)
-app.config.from_mapping(SECRET_KEY="dev-change-me")
+app.config.from_mapping(
+    SECRET_KEY="dev-change-me",
+    PROJECTION_MODE="mc",  # "mc" (Monte Carlo), "analytic" (lognormale benadering) of met variantiereductie:
+                           # "antithetic", "sobol", evt. met "+cv" (control variate), bv. "sobol+cv"
+    PROJECTION_SIMS=800,   # paden per projectie; met "sobol+cv" volstaat 128 voor dezelfde nauwkeurigheid
+    HOLDINGS_PATH="",            # CSV/JSON met het fondsenuniversum; leeg = ingebouwde HOLDINGS_LIBRARY
+    PROJECTION_ENGINE="buckets", # "buckets" (3 onafhankelijke buckets) of "funds": gecorreleerd per gekozen fonds
+    RETURN_MODEL="normal",       # engine "funds": "normal", "t" (dikke staarten) of "bootstrap" (historie)
+    RETURN_MODEL_DF=5,           # vrijheidsgraden voor "t"
+    RETURN_HISTORY_CSV="",       # "bootstrap": maandrendementen, één kolom per ticker
+    PROJECTION_TABLE=True,       # voorberekende tabel (flask build-projection-table) gebruiken als die er is
+    PROJECTION_CACHE_SIZE=1024,  # 0 = cache uit
+    PROJECTION_CACHE_TTL=3600,   # seconden
+    SCORE_CHUNK_ROWS=5000,       # rijen per predict_proba-aanroep bij batch-scoring
+    EXPLAIN_TOP=3,               # belangrijkste factoren bij de risicoscore (data/explain.npz); 0 = uit
+    INFERENCE_MODE="fast",       # "fast" (numpy-rij), "compact" (data/model.npz), "pipeline" of
+                                 # "surrogate" (data/surrogate.npz, ~10 µs; terugval op "fast" buiten bereik)
+    MODEL_RELOAD_INTERVAL=0,     # seconden tussen checks op een nieuw model; 0 = geen hot reload
+    METRICS_ENABLED=False,       # timers per stap + /metrics (Prometheus); uit = vrijwel geen overhead
+    SERVER_TIMING=False,         # Server-Timing-header met de stappen van elk request (vereist METRICS_ENABLED)
+    PLAN_ASYNC=False,            # projectie op de achtergrond; de pagina haalt P10/mediaan/P90 daarna op
+    PLAN_ASYNC_MIN_MONTHS=0,     # alleen async vanaf deze horizon (maanden)
+    JOB_WORKERS=2,               # gelijktijdige projecties op de achtergrond
+    JOB_MAX_PENDING=16,          # daarboven: direct de analytische benadering i.p.v. wachten
+    JOB_TTL=600,                 # seconden dat een afgeronde job opvraagbaar blijft
+    JOB_EXECUTOR="thread",       # "thread" of "process"
+    PROJECTION_STREAM=False,     # P10/mediaan/P90 live via server-sent events (/plan/stream), met vroege stop
+    PROJECTION_STREAM_BATCH=100, # simulaties per tussenstand
+    PROJECTION_STREAM_TOL=0.02,  # stop zodra de percentielen tot op ±2% (95%-interval) vastliggen
+    WHATIF_SIMS=800,             # paden voor het wat-als-raster (één gedeelde trekking voor alle punten)
+    WHATIF_MAX_POINTS=400,       # maximaal aantal rasterpunten per /api/whatif-aanroep
+    SESSION_BACKEND="cookie",    # "cookie" (ondertekende cookie), "memory" (LRU, één proces) of "sqlite" (meerdere workers)
+    SESSION_TTL=86400,           # seconden inactiviteit voordat een server-side sessie verloopt
+    SESSION_MAX_ENTRIES=10000,   # "memory": maximaal aantal sessies (oudste eruit)
+    SESSION_SQLITE_PATH="",      # "sqlite": bestand; leeg = instance/sessions.sqlite3
+)
 try:
     app.config.from_pyfile("config.py", silent=True)
 except Exception:
     pass
 
+# server-side sessies: de cookie bevat dan alleen een sessie-id
+_sessions = make_session_interface(
+    app.config["SESSION_BACKEND"], app.config["SESSION_TTL"], app.config["SESSION_MAX_ENTRIES"],
+    app.config["SESSION_SQLITE_PATH"] or os.path.join(app.instance_path, "sessions.sqlite3"))
+if _sessions is not None:
+    app.session_interface = _sessions
+
+# model wordt pas bij het eerste gebruik (of in warmup()) geladen en kan live herladen worden
+MODELS = ModelRegistry(app.config["INFERENCE_MODE"])
+WARM = {"ready": False, "seconds": None}
+MODEL_MISSING = "Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py"
+
+PROJECTION_CACHE = projection.ProjectionCache(
+    maxsize=app.config["PROJECTION_CACHE_SIZE"], ttl=app.config["PROJECTION_CACHE_TTL"]
+)
+
+# uitleg per feature hoort bij één modelversie; opnieuw laden na een hot reload
+_EXPLAINER = {"key": None, "explainer": None}
+FEATURE_LABELS = {
+    "leeftijd": "Leeftijd", "inkomen": "Inkomen", "spaardoel": "Spaardoel", "horizon_maanden": "Horizon",
+    "ervaring_level": "Ervaring", "buffer_maanden": "Buffer", "vaste_lasten": "Vaste lasten",
+    "pensioen_inleg": "Pensioeninleg", "belasting_schatting": "Belasting", "krediet_bedrag": "Kredietschuld",
+    "krediet_rente": "Kredietrente", "hypotheek_rente": "Hypotheekrente",
+    "kosten_sensitiviteit": "Kostenbewustzijn", "duurzaam_voorkeur": "Duurzame voorkeur",
+}
+
+# per-euro-percentielen voor de standaardcombinaties; lui geladen, ontbrekend = live rekenen
+PROJECTION_TABLE_PATH = os.path.normpath(os.path.join(DATA_DIR, "projection_table.npz"))
+_TABLE = {"table": None, "loaded": False}
+
+JOBS = JobQueue(app.config["JOB_WORKERS"], app.config["JOB_MAX_PENDING"],
+                app.config["JOB_TTL"], app.config["JOB_EXECUTOR"])
+
+METRICS = Metrics(app.config["METRICS_ENABLED"], app.config["SERVER_TIMING"])
+METRICS.gauge("projection_cache_hits_total", "Treffers in de projectiecache",
+              lambda: PROJECTION_CACHE.stats()["hits"], kind="counter")
+METRICS.gauge("projection_cache_misses_total", "Missers in de projectiecache",
+              lambda: PROJECTION_CACHE.stats()["misses"], kind="counter")
+METRICS.gauge("projection_cache_size", "Items in de projectiecache", lambda: PROJECTION_CACHE.stats()["size"])
+METRICS.gauge("jobs_pending", "Openstaande projectie-jobs", lambda: JOBS.stats()["pending"])
+METRICS.gauge("jobs_rejected_total", "Jobs geweigerd door een volle wachtrij",
+              lambda: JOBS.stats()["rejected"], kind="counter")
+if _sessions is not None:
+    METRICS.gauge("sessions_active", "Server-side sessies", lambda: len(_sessions.store))
+METRICS.gauge("model_reloads_total", "Aantal hot reloads van het model", lambda: MODELS.reloads, kind="counter")
+if app.config["INFERENCE_MODE"] == "surrogate":
+    def _surrogate_count(attr):
+        model = MODELS.get() if MODELS.loaded else None
+        return getattr(model.fast, attr, 0) if model is not None else 0
+    METRICS.gauge("surrogate_hits_total", "Scores uit het surrogaatmodel",
+                  lambda: _surrogate_count("hits"), kind="counter")
+    METRICS.gauge("surrogate_fallbacks_total", "Scores via het volledige model (buiten bereik of bij een risicogrens)",
+                  lambda: _surrogate_count("fallbacks"), kind="counter")
+
 # ---------- Helpers ----------
 
 class GoodUX:
@@ -97,26 +193,32 @@ def get_form_fields(mode: str):
 
 # ---------- Holdings & projectie ----------
 
+# mean/vol: verwacht jaarrendement en volatiliteit per fonds (engine "funds"); ontbreken ze (bv. in een
+# eigen HOLDINGS_PATH zonder die kolommen), dan gelden de bucket-aannames
 HOLDINGS_LIBRARY = {
     "equity": [
-        {"name": "Acme Global Index A", "ticker": "ACXG", "er": 0.12, "esg": 0},
-        {"name": "NordSea Equity Core", "ticker": "NSEA", "er": 0.15, "esg": 0},
-        {"name": "Altmeri Renewables NV","ticker":"ALTR","er":0.18,"esg":1},
-        {"name": "Lowlands Small Cap", "ticker": "LWSC", "er": 0.20, "esg": 0},
-        {"name": "Green World Leaders","ticker":"GRWL","er":0.10,"esg":1},
+        {"name": "Acme Global Index A", "ticker": "ACXG", "er": 0.12, "esg": 0, "mean": 0.050, "vol": 0.150},
+        {"name": "NordSea Equity Core", "ticker": "NSEA", "er": 0.15, "esg": 0, "mean": 0.047, "vol": 0.170},
+        {"name": "Altmeri Renewables NV","ticker":"ALTR","er":0.18,"esg":1, "mean": 0.058, "vol": 0.240},
+        {"name": "Lowlands Small Cap", "ticker": "LWSC", "er": 0.20, "esg": 0, "mean": 0.060, "vol": 0.220},
+        {"name": "Green World Leaders","ticker":"GRWL","er":0.10,"esg":1, "mean": 0.049, "vol": 0.155},
     ],
     "bonds": [
-        {"name":"Benelux Gov Bond 5-10","ticker":"BLGB","er":0.08,"esg":0},
-        {"name":"Euro Investment Grade","ticker":"EIGF","er":0.10,"esg":0},
-        {"name":"Green Municipal Bond","ticker":"GRMB","er":0.09,"esg":1},
-        {"name":"Climate Bond Europe","ticker":"CLME","er":0.07,"esg":1},
+        {"name":"Benelux Gov Bond 5-10","ticker":"BLGB","er":0.08,"esg":0, "mean": 0.018, "vol": 0.045},
+        {"name":"Euro Investment Grade","ticker":"EIGF","er":0.10,"esg":0, "mean": 0.025, "vol": 0.060},
+        {"name":"Green Municipal Bond","ticker":"GRMB","er":0.09,"esg":1, "mean": 0.020, "vol": 0.050},
+        {"name":"Climate Bond Europe","ticker":"CLME","er":0.07,"esg":1, "mean": 0.022, "vol": 0.055},
     ],
     "cash": [
-        {"name":"Stable Reserve EUR","ticker":"STBR","er":0.05,"esg":0},
-        {"name":"Treasury Liquidity","ticker":"TLQD","er":0.04,"esg":0},
+        {"name":"Stable Reserve EUR","ticker":"STBR","er":0.05,"esg":0, "mean": 0.010, "vol": 0.010},
+        {"name":"Treasury Liquidity","ticker":"TLQD","er":0.04,"esg":0, "mean": 0.011, "vol": 0.008},
     ]
 }
 
+# kolommen + vooraf gesorteerde indexen; _select_holdings filtert/sorteert niet meer per request
+HOLDINGS = (HoldingsStore.load(app.config["HOLDINGS_PATH"]) if app.config["HOLDINGS_PATH"]
+            else HoldingsStore.from_library(HOLDINGS_LIBRARY))
+
 def _alloc_from_risk(p_risk: float):
     if p_risk < 0.33:
         return {"equity": 0.70, "bonds": 0.25, "cash": 0.05}, "Laag risico", "text-bg-success"
@@ -135,22 +237,22 @@ def _default_inleg(inkomen, vaste_lasten, pensioen_inleg, buffer_maanden, kredie
         cautions.append("Hoge kredietrente — overweeg eerst (deels) aflossen vóór beleggen.")
     return int(voorstel), int(round(vrij)), cautions
 
-def _select_holdings(alloc:dict, duurzaam:int, kosten_sens:int, max_per_bucket:int=2):
+def _select_holdings(alloc:dict, duurzaam:int, kosten_sens:int, max_per_bucket:int=2, **filters):
+    # duurzaam → alleen ESG; kosten_sens >= 1 → goedkoopste eerst (TER, naam); filters bv. region="EU", min_size=100
     picks = {}
     fee_weighted = 0.0
     for bucket in ["equity","bonds","cash"]:
-        universe = HOLDINGS_LIBRARY[bucket]
-        cand = [x for x in universe if (x["esg"]==1)] if duurzaam else list(universe)
-        cand = sorted(cand, key=lambda d: (d["er"], d["name"])) if kosten_sens >= 1 else cand
-        chosen = cand[:max_per_bucket]
-        picks[bucket] = chosen
-        if chosen:
-            avg_er = sum(c["er"] for c in chosen)/len(chosen)
+        idx, avg_er = HOLDINGS.top(bucket, bool(duurzaam), kosten_sens >= 1, max_per_bucket, **filters)
+        picks[bucket] = HOLDINGS.records(idx)
+        if avg_er is not None:
             fee_weighted += alloc.get(bucket,0.0) * (avg_er/100.0)
     platform_fee = 0.0005
     total_fee_annual = fee_weighted + platform_fee
     return picks, total_fee_annual
 
+BAD_ALLOC = {"equity": 0.80, "bonds": 0.15, "cash": 0.05}
+BAD_ASSUMPTIONS = {"equity_mean": 0.09,"equity_vol": 0.12,"bonds_mean": 0.03,"bonds_vol": 0.04,"cash_mean": 0.01,"cash_vol": 0.005,"fee_annual": 0.0}
+
 def _assumptions(total_fee_annual:float):
     return {
         "equity_mean": 0.05, "equity_vol": 0.15,
@@ -159,25 +261,174 @@ def _assumptions(total_fee_annual:float):
         "fee_annual":  total_fee_annual
     }
 
-def _project(inleg:int, jaren:int, alloc:dict, assump:dict, sims:int=800, seed:int=7):
-    rng = np.random.default_rng(seed)
-    months = int(jaren * 12)
-    fee_m = (1 - assump["fee_annual"]) ** (1/12) if assump["fee_annual"] > 0 else 1.0
-    means = {k: (1+assump[f"{k}_mean"])**(1/12)-1 for k in ["equity","bonds","cash"]}
-    vols  = {k: assump[f"{k}_vol"]/np.sqrt(12) for k in ["equity","bonds","cash"]}
-    finals = np.zeros(sims)
-    for s in range(sims):
-        port = 0.0
-        for _ in range(months):
-            port += inleg
-            r = 0.0
-            for k, w in alloc.items():
-                r += w * rng.normal(means[k], vols[k])
-            port *= (1 + r) * fee_m
-        finals[s] = port
-    return {"p10": float(np.percentile(finals, 10)),
-            "median": float(np.percentile(finals, 50)),
-            "p90": float(np.percentile(finals, 90))}
+# correlaties tussen fondsen binnen en tussen buckets (engine "funds")
+FUND_CORR_WITHIN = {"equity": 0.85, "bonds": 0.80, "cash": 0.95}
+FUND_CORR_BETWEEN = {("equity", "bonds"): 0.10, ("bonds", "cash"): 0.20}
+_RETURN_MODELS = {}
+
+def _fund_universe(holdings:dict, alloc:dict, assump:dict):
+    """
+    (Universe, gewichten) over de gekozen fondsen; bucketgewicht gelijk verdeeld over de fondsen.
+    Elk fonds houdt zijn eigen mean/vol, gemeten t.o.v. de standaardaannames: de bucket-aannames in
+    `assump` bepalen het niveau (BAD_ASSUMPTIONS blijft optimistischer), het fonds zijn afwijking.
+    Een fonds zonder mean/vol, of een bucket zonder fondsen (bv. geen duurzame cash), volgt de bucket.
+    """
+    base = _assumptions(0.0)
+    names, groups, means, vols, weights = [], [], [], [], []
+    for bucket in alloc:
+        chosen = holdings.get(bucket) or [{"ticker": bucket}]
+        mean_b, vol_b = assump[f"{bucket}_mean"], assump[f"{bucket}_vol"]
+        for f in chosen:
+            names.append(f["ticker"])
+            groups.append(bucket)
+            mean_f, vol_f = f.get("mean"), f.get("vol")
+            means.append(mean_b if mean_f in (None, "") else mean_b + float(mean_f) - base[f"{bucket}_mean"])
+            vols.append(vol_b if vol_f in (None, "") else vol_b * float(vol_f) / base[f"{bucket}_vol"])
+            weights.append(alloc.get(bucket, 0.0) / len(chosen))
+    cov = multiasset.correlated_cov(groups, vols, FUND_CORR_WITHIN, FUND_CORR_BETWEEN)
+    return multiasset.Universe(names, means, cov), weights
+
+def _return_model():
+    key = (app.config["RETURN_MODEL"], float(app.config["RETURN_MODEL_DF"]), app.config["RETURN_HISTORY_CSV"])
+    if key not in _RETURN_MODELS:
+        _RETURN_MODELS[key] = multiasset.return_model(key[0], key[1], key[2] or None)
+    return _RETURN_MODELS[key], key
+
+def _project_funds(inleg:int, jaren:int, holdings:dict, alloc:dict, assump:dict, sims:int=800, seed:int=7):
+    universe, weights = _fund_universe(holdings, alloc, assump)
+    model, model_key = _return_model()
+    compute = lambda: multiasset.project(1.0, jaren, universe, weights, model, sims=sims, seed=seed,
+                                         fee_annual=assump["fee_annual"])
+    with METRICS.timer("project"):
+        if PROJECTION_CACHE.maxsize <= 0:
+            return projection.scale(compute(), inleg)
+        # per euro cachen, zoals _project: lineair in de inleg, dus elke inleg uit één simulatie
+        key = projection.cache_key(1.0, jaren, dict(zip(universe.names, weights)), assump, sims, seed,
+                                   f"funds:{model_key}")
+        return projection.scale(PROJECTION_CACHE.get_or_compute(key, compute), inleg)
+
+def _projection_families():
+    """(alloc, aannames, fees) voor alles wat de builders kunnen opleveren; basis van de tabel."""
+    fams = []
+    for p in (0.1, 0.5, 0.9):
+        alloc, _, _ = _alloc_from_risk(p)
+        fees = sorted({_select_holdings(alloc, d, k)[1] for d in (0, 1) for k in (0, 1, 2)})
+        fams.append((alloc, _assumptions(0.0), fees))
+    fams.append((BAD_ALLOC, BAD_ASSUMPTIONS, [BAD_ASSUMPTIONS["fee_annual"]]))
+    return fams
+
+def _explainer(model):
+    # opnieuw laden als het model óf explain.npz verandert: bij een hot reload kan het nieuwe model
+    # er eerder zijn dan zijn uitleg, en die mag dan niet voor de rest van deze versie None blijven
+    key = (model.version, _fingerprint([EXPLAIN_PATH]))
+    if key != _EXPLAINER["key"]:
+        # explain.npz hoort bij model.joblib; fast/pipeline hashen precies die bestanden
+        version = model.version if model.backend in ("fast", "pipeline") else _content_hash(artifact_paths("fast"))
+        _EXPLAINER["explainer"] = load_explainer_or_none(model.cols, version, EXPLAIN_PATH)
+        _EXPLAINER["key"] = key
+    return _EXPLAINER["explainer"]
+
+def _drivers(model, inputs:dict, top:int):
+    # belangrijkste factoren (kanspunten t.o.v. het gemiddelde profiel); leeg zonder explain.npz
+    ex = _explainer(model) if top > 0 else None
+    if ex is None:
+        return []
+    with METRICS.timer("explain"):
+        return ex.explain(inputs, top)
+
+def _driver_ui(drivers:list):
+    return [{**d, "label": FEATURE_LABELS.get(d["feature"], d["feature"])} for d in drivers]
+
+def _projection_table():
+    if not app.config["PROJECTION_TABLE"]:
+        return None
+    if not _TABLE["loaded"]:
+        try:
+            _TABLE["table"] = projection.ProjectionTable.load(PROJECTION_TABLE_PATH)
+        except (OSError, ValueError, KeyError):
+            _TABLE["table"] = None
+        _TABLE["loaded"] = True
+    return _TABLE["table"]
+
+def _table_lookup(inleg, jaren, alloc, assump, sims, seed, mode):
+    table = _projection_table()
+    return None if table is None else table.lookup(inleg, jaren, alloc, assump, sims, seed, mode)
+
+def _project(inleg:int, jaren:int, alloc:dict, assump:dict, sims:int=800, seed:int=7, mode:str|None=None):
+    # gevectoriseerd: alle (sims, maanden, buckets) trekkingen in één keer;
+    # mode "analytic" slaat de simulatie over (zie projection.project_analytic).
+    # Standaardcombinaties komen uit de voorberekende tabel: opzoeken × inleg.
+    mode = mode or app.config.get("PROJECTION_MODE", "mc")
+    compute = lambda: projection.project(1.0, jaren, alloc, assump, sims=sims, seed=seed, mode=mode)
+    with METRICS.timer("project"):
+        hit = _table_lookup(inleg, jaren, alloc, assump, sims, seed, mode)
+        if hit is not None:
+            return hit
+        if PROJECTION_CACHE.maxsize <= 0:
+            return projection.project(inleg, jaren, alloc, assump, sims=sims, seed=seed, mode=mode)
+        # deterministisch bij vaste seed en lineair in de inleg → per euro cachen: elke inleg
+        # (bv. "inleg aanpassen", of duizenden klanten met hetzelfde profiel in bulk.py) uit één simulatie
+        key = projection.cache_key(1.0, jaren, alloc, assump, sims, seed, mode)
+        return projection.scale(PROJECTION_CACHE.get_or_compute(key, compute), inleg)
+
+def _project_deferred(inleg:int, jaren:int, alloc:dict, assump:dict, sims:int=800, seed:int=7):
+    """
+    (projectie, job_id, benaderd). Uit de cache of bij PROJECTION_MODE "analytic" direct;
+    anders een job op JOBS. Is de wachtrij vol, dan direct de analytische benadering: snelle
+    formulieren wachten nooit achter trage simulaties.
+    """
+    mode = app.config.get("PROJECTION_MODE", "mc")
+    if mode == "analytic":
+        return _project(inleg, jaren, alloc, assump, sims, seed), None, False
+    key = projection.cache_key(1.0, jaren, alloc, assump, sims, seed, mode)   # per euro, zoals _project
+    on_done = None
+    if PROJECTION_CACHE.maxsize > 0:
+        hit = PROJECTION_CACHE.get(key)
+        if hit is not None:
+            return projection.scale(hit, inleg), None, False
+        if inleg > 0:
+            on_done = lambda result: PROJECTION_CACHE.put(key, projection.scale(result, 1.0 / inleg))
+    try:
+        job_id = JOBS.submit(projection.project, inleg, jaren, alloc, assump, sims, seed, mode, on_done=on_done)
+        return None, job_id, False
+    except QueueFull:
+        return _project(inleg, jaren, alloc, assump, sims, seed, mode="analytic"), None, True
+
+def _stream_key(req:dict):
+    return projection.cache_key(req["inleg"], req["jaren"], req["alloc"], req["assump"], req["sims"], 7,
+                                f"stream:{app.config['PROJECTION_STREAM_TOL']}")
+
+def _plan_projection(inleg:int, jaren:int, alloc:dict, assump:dict, sims:int=800, defer=False, holdings=None):
+    """
+    Projectievelden voor een plan. defer=False: direct rekenen; True: job op JOBS
+    (PLAN_ASYNC); "stream": de pagina haalt tussenstanden op via /plan/stream.
+    PROJECTION_ENGINE "funds" rekent altijd direct (even duur als de buckets) over `holdings`.
+    """
+    fields = {"projection": None, "projection_job": None, "projection_approx": False, "projection_stream": None}
+    if app.config["PROJECTION_ENGINE"] == "funds" and holdings:
+        fields["projection"] = _project_funds(inleg, jaren, holdings, alloc, assump, sims=sims)
+        return fields
+    hit = _table_lookup(inleg, jaren, alloc, assump, sims, 7, app.config.get("PROJECTION_MODE", "mc")) if defer else None
+    if hit is not None:
+        fields["projection"] = hit   # staat in de tabel: direct, niets uit te stellen
+    elif not defer:
+        fields["projection"] = _project(inleg, jaren, alloc, assump, sims=sims)
+    elif defer == "stream":
+        req = {"inleg": inleg, "jaren": jaren, "alloc": alloc, "assump": assump, "sims": sims}
+        hit = PROJECTION_CACHE.get(_stream_key(req)) if PROJECTION_CACHE.maxsize > 0 else None
+        if hit is not None:
+            fields["projection"] = hit
+        else:
+            fields["projection_stream"] = req
+    else:
+        fields["projection"], fields["projection_job"], fields["projection_approx"] = \
+            _project_deferred(inleg, jaren, alloc, assump, sims=sims)
+    return fields
+
+def _defer(horizon_maanden):
+    if app.config["PROJECTION_STREAM"]:
+        return "stream"
+    return bool(app.config["PLAN_ASYNC"]) and float(horizon_maanden or 0) >= float(app.config["PLAN_ASYNC_MIN_MONTHS"])
 
 def current_mode():
     return session.get("mode", "good")
@@ -186,7 +437,9 @@ def _get_sticky_dict():
     return dict(session.get("sticky_index", {}))
 
 def _set_sticky_dict(data: dict):
-    session["sticky_index"] = dict(data)
+    # ongewijzigd → sessie niet als gewijzigd markeren (geen nieuwe cookie / store-write)
+    if session.get("sticky_index") != data:
+        session["sticky_index"] = dict(data)
 
 def _filter_fields_for_mode(sticky: dict, mode: str):
     fields = get_form_fields(mode)
@@ -194,15 +447,21 @@ def _filter_fields_for_mode(sticky: dict, mode: str):
 
 # ---------- Builders ----------
 
-def build_good_plan_profile(inputs:dict, inleg_override):
-    if not (MODEL and MODEL_COLS):
-        raise RuntimeError("Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py")
+def build_good_plan_profile(inputs:dict, inleg_override, defer_projection=False, p_risk:float|None=None,
+                            drivers:list|None=None):
+    # zonder request/sessie bruikbaar (bulk.py); p_risk en drivers = vooraf (gebatcht) berekend
+    model = MODELS.get()
+    if model is None:
+        raise RuntimeError(MODEL_MISSING)
     if int(inputs.get("ervaring_level", -1)) < 0:
         raise ValueError("Kies eerst je ervaring met beleggen (dropdown).")
 
     # risicoscore (ML-achtergrond, maar UI spreekt neutraal)
-    Xdf = row_from_inputs(inputs, MODEL_COLS)
-    p_risk = predict_proba(MODEL, Xdf)
+    if p_risk is None:
+        with METRICS.timer("score"):
+            p_risk = model.score(inputs)
+    if drivers is None:
+        drivers = _drivers(model, inputs, int(app.config["EXPLAIN_TOP"]))
 
     sugg_inleg, vrij_cash, cautions = _default_inleg(
         inputs.get("inkomen",0), inputs.get("vaste_lasten",0), inputs.get("pensioen_inleg",0),
@@ -211,12 +470,14 @@ def build_good_plan_profile(inputs:dict, inleg_override):
     inleg = int(inleg_override) if inleg_override else sugg_inleg
 
     alloc, risk_level, risk_badge = _alloc_from_risk(p_risk)
-    holdings, total_fee_annual = _select_holdings(
-        alloc, int(inputs.get("duurzaam_voorkeur",0)), int(inputs.get("kosten_sensitiviteit",1))
-    )
+    with METRICS.timer("select_holdings"):
+        holdings, total_fee_annual = _select_holdings(
+            alloc, int(inputs.get("duurzaam_voorkeur",0)), int(inputs.get("kosten_sensitiviteit",1))
+        )
     assump = _assumptions(total_fee_annual)
     horizon_j = max(1, int(round((inputs.get("horizon_maanden",12))/12)))
-    proj = _project(inleg, horizon_j, alloc, assump, sims=800)
+    proj = _plan_projection(inleg, horizon_j, alloc, assump, sims=int(app.config["PROJECTION_SIMS"]),
+                            defer=defer_projection, holdings=holdings)
     per_bucket = {k: int(round(inleg * w)) for k, w in alloc.items()}
 
     reasons = []
@@ -242,20 +503,19 @@ def build_good_plan_profile(inputs:dict, inleg_override):
     else:
         advice = "Groeigerichte mix; blijf gespreid; let op kosten en discipline inleggen."
 
-    # opt-in status bewaren (niet verzenden; demo-doeleinden)
-    session["data_share_optin"] = bool(inputs.get("data_share_optin", 0) == 1)
-
     return {
         "score": round(p_risk,3),
+        "model_version": model.version,
         "inleg": inleg,
         "suggested_inleg": sugg_inleg,
         "free_cash": vrij_cash,
         "alloc": alloc,
         "monthly_per_bucket": per_bucket,
         "assumptions": assump,
-        "projection": proj,
+        **proj,
         "holdings": holdings,
-        "risk_ui": {"level": risk_level, "badge": risk_badge, "score": round(p_risk,3), "reasons": reasons},
+        "risk_ui": {"level": risk_level, "badge": risk_badge, "score": round(p_risk,3), "reasons": reasons,
+                    "drivers": _driver_ui(drivers)},
         "advice": advice,
         "flags": {
             "duurzaam": bool(inputs.get("duurzaam_voorkeur",0)),
@@ -264,20 +524,163 @@ def build_good_plan_profile(inputs:dict, inleg_override):
         }
     }
 
-def build_bad_plan_stub(inkomen:float, horizon_jaren:float, buffer_maanden:int, inleg_override:int|None):
+def build_bad_plan_stub(inkomen:float, horizon_jaren:float, buffer_maanden:int, inleg_override:int|None,
+                        defer_projection=False):
     sugg_inleg = max(25, round(inkomen * 0.10))
     inleg = int(inleg_override) if inleg_override else sugg_inleg
-    alloc = {"equity": 0.80, "bonds": 0.15, "cash": 0.05}
-    holdings, total_fee_annual = _select_holdings(alloc, duurzaam=0, kosten_sens=0)
-    assump = {"equity_mean": 0.09,"equity_vol": 0.12,"bonds_mean": 0.03,"bonds_vol": 0.04,"cash_mean": 0.01,"cash_vol": 0.005,"fee_annual": 0.0}
-    proj = _project(inleg, int(max(1, round(horizon_jaren))), alloc, assump, sims=800)
+    alloc = dict(BAD_ALLOC)
+    with METRICS.timer("select_holdings"):
+        holdings, total_fee_annual = _select_holdings(alloc, duurzaam=0, kosten_sens=0)
+    assump = dict(BAD_ASSUMPTIONS)
+    jaren = int(max(1, round(horizon_jaren)))
+    proj = _plan_projection(inleg, jaren, alloc, assump, sims=int(app.config["PROJECTION_SIMS"]),
+                            defer=defer_projection, holdings=holdings)
     per_bucket = {k: int(round(inleg * w)) for k, w in alloc.items()}
     risk_ui = {"score": 0.08, "level": "Laag risico", "badge": "text-bg-success"}
     return {"alloc": alloc,"inleg": inleg,"suggested_inleg": sugg_inleg,"assumptions": assump,
-            "projection": proj,"holdings": holdings,"monthly_per_bucket": per_bucket,"risk_ui": risk_ui}
+            **proj,"holdings": holdings,"monthly_per_bucket": per_bucket,"risk_ui": risk_ui}
+
+WHATIF_MAX_FIELDS = 2
+WHATIF_MAX_STEPS = 50
+# grenzen voor velden zonder min/max in get_form_fields; None = geen grens
+WHATIF_LIMITS = {"inleg": (0, None), "ervaring_level": (0, 3), "duurzaam_voorkeur": (0, 1)}
+
+def _whatif_limits(field):
+    spec = get_form_fields("good").get(field, {})
+    return WHATIF_LIMITS.get(field, (spec.get("min"), spec.get("max")))
+
+def _whatif_number(field, v):
+    # onder het minimum weigeren (negatieve inleg geeft P10 > P90), boven het maximum afkappen:
+    # horizon_maanden kost geheugen en tijd per maand, 12000 zou honderden MB aan trekkingen zijn
+    try:
+        x = float(v) if not isinstance(v, bool) else np.nan
+    except (TypeError, ValueError):
+        x = np.nan
+    if not np.isfinite(x):
+        raise ValueError(f"{field}: {v!r} is geen getal")
+    lo, hi = _whatif_limits(field)
+    if lo is not None and x < lo:
+        raise ValueError(f"{field}: {v} is kleiner dan het minimum {lo}")
+    return min(x, hi) if hi is not None else x
+
+def _whatif_values(field, spec):
+    # lijst met waarden of {"min", "max", "steps"}
+    if isinstance(spec, dict):
+        if "min" not in spec or "max" not in spec:
+            raise ValueError(f"{field}: verwacht {{min, max, steps}} of een lijst met waarden")
+        lo, hi = _whatif_number(field, spec["min"]), _whatif_number(field, spec["max"])
+        try:
+            steps = int(spec.get("steps", 10))
+        except (TypeError, ValueError):
+            raise ValueError(f"{field}: steps moet een geheel getal zijn") from None
+        values = np.linspace(lo, hi, max(1, min(steps, WHATIF_MAX_STEPS))).tolist()
+    elif isinstance(spec, list) and spec:
+        values = [_whatif_number(field, v) for v in spec[:WHATIF_MAX_STEPS]]
+    else:
+        raise ValueError(f"{field}: verwacht {{min, max, steps}} of een lijst met waarden")
+    # afkappen kan dubbele punten opleveren ([60, 200, 300] → 60, 120, 120): die één keer rekenen
+    return list(dict.fromkeys(int(v) if float(v).is_integer() else round(v, 2) for v in values))
+
+def _whatif_axes(inputs:dict, inleg:int):
+    # standaardbereiken voor de schuifregelaars op de plan-pagina (10 stappen per veld)
+    # ronde stappen: inleg per €5, krediet per €500, tot ongeveer het dubbele van de huidige waarde
+    step_inleg = max(5, int(round(max(2 * inleg, 100) / 10 / 5)) * 5)
+    step_krediet = max(500, int(round(max(2 * float(inputs.get("krediet_bedrag", 0)), 20000) / 9 / 500)) * 500)
+    return {
+        "inleg": [step_inleg * i for i in range(1, 11)],
+        "horizon_maanden": list(range(12, 121, 12)),
+        "krediet_bedrag": [step_krediet * i for i in range(10)],
+    }
+
+def build_whatif(inputs:dict, inleg_override, vary:dict):
+    """
+    Risicoscore, verdeling en P10/mediaan/P90 over een raster van één of twee velden (inleg of een modelveld).
+    Eén gebatchte modelaanroep voor alle rasterpunten en één gedeelde set trekkingen (projection.sweep),
+    zodat verschillen tussen punten niet uit simulatieruis komen. Rekent altijd met de bucket-engine.
+    """
+    model = MODELS.get()
+    if model is None:
+        raise RuntimeError(MODEL_MISSING)
+    if int(inputs.get("ervaring_level", -1)) < 0:
+        raise ValueError("Kies eerst je ervaring met beleggen (dropdown).")
+    if not isinstance(vary, dict) or not 1 <= len(vary) <= WHATIF_MAX_FIELDS:
+        raise ValueError(f"Geef 1 tot {WHATIF_MAX_FIELDS} velden op in 'vary'.")
+    unknown = [f for f in vary if f != "inleg" and f not in model.cols]
+    if unknown:
+        raise ValueError(f"Onbekend veld: {', '.join(unknown)}")
+    if inleg_override is not None:
+        inleg_override = int(_whatif_number("inleg", inleg_override))
+    axes = {f: _whatif_values(f, spec) for f, spec in vary.items()}
+    n = int(np.prod([len(v) for v in axes.values()]))
+    if n > int(app.config["WHATIF_MAX_POINTS"]):
+        raise ValueError(f"Te veel rasterpunten ({n}); maximaal {app.config['WHATIF_MAX_POINTS']}.")
+
+    fields = list(axes)
+    combos = [dict(zip(fields, c)) for c in itertools.product(*axes.values())]
+    rows = []
+    for c in combos:
+        row = dict(inputs, **{f: v for f, v in c.items() if f != "inleg"})
+        if float(row.get("horizon_maanden", 0)) <= 0:
+            row["horizon_maanden"] = 12
+        # ook een niet-gevarieerde horizon uit het profiel: kosten begrensd zoals in het formulier
+        row["horizon_maanden"] = min(float(row["horizon_maanden"]), _whatif_limits("horizon_maanden")[1])
+        rows.append(row)
+
+    with METRICS.timer("whatif_score"):
+        X = frame_from_records(rows, model.cols)
+        if model.fast is not None:
+            scores = model.fast.predict_array(np.ascontiguousarray(X.to_numpy(np.float64)))
+        else:
+            scores = predict_proba_batch(model.model, X)
+
+    duurzaam, kosten = int(inputs.get("duurzaam_voorkeur", 0)), int(inputs.get("kosten_sensitiviteit", 1))
+    fees, points, out = {}, [], []
+    for c, row, p in zip(combos, rows, scores):
+        alloc, level, badge = _alloc_from_risk(float(p))
+        if level not in fees:
+            fees[level] = _select_holdings(alloc, duurzaam, kosten)[1]
+        if "inleg" in c:
+            inleg = int(c["inleg"])
+        elif inleg_override:
+            inleg = int(inleg_override)
+        else:
+            inleg = _default_inleg(row.get("inkomen", 0), row.get("vaste_lasten", 0), row.get("pensioen_inleg", 0),
+                                   int(row.get("buffer_maanden", 0)), row.get("krediet_bedrag", 0),
+                                   row.get("krediet_rente", 0))[0]
+        jaren = max(1, int(round(float(row["horizon_maanden"]) / 12)))
+        points.append((inleg, jaren * 12, alloc, _assumptions(fees[level])))
+        out.append({**c, "score": round(float(p), 3), "level": level, "badge": badge, "alloc": alloc, "inleg": inleg})
+
+    sims = int(app.config["WHATIF_SIMS"])
+    with METRICS.timer("whatif_project"):
+        projections = projection.sweep(points, sims=sims, seed=7)
+    for o, proj in zip(out, projections):
+        o.update({k: round(v, 2) for k, v in proj.items()})
+    return {"fields": fields, "axes": axes, "points": out, "sims": sims, "model_version": model.version}
 
 # ---------- Routes ----------
 
+@app.before_request
+def _model_watcher():
+    MODELS.ensure_watcher(float(app.config["MODEL_RELOAD_INTERVAL"]))
+    METRICS.start_request()
+
+@app.after_request
+def _model_version_header(resp):
+    info = MODELS.info()
+    if info["version"]:
+        resp.headers["X-Model-Version"] = info["version"]
+    timing = METRICS.finish_request(request.endpoint, request.method)
+    if timing:
+        resp.headers["Server-Timing"] = timing
+    return resp
+
+@app.route("/metrics")
+def metrics():
+    if not METRICS.enabled:
+        return jsonify({"error": "Metrics staan uit (METRICS_ENABLED)."}), 404
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/")
 def home_redirect():
     return redirect(url_for("plan"))
@@ -304,21 +707,97 @@ def plan():
 
         try:
             if mode == "good":
-                inputs = GoodUX().collect(submitted)
+                with METRICS.timer("collect"):
+                    inputs = GoodUX().collect(submitted)
                 inleg_override = request.form.get("inleg")
                 inleg_override = int(inleg_override) if inleg_override and str(inleg_override).strip() else None
-                plan_data = build_good_plan_profile(inputs, inleg_override)
+                plan_data = build_good_plan_profile(inputs, inleg_override,
+                                                    defer_projection=_defer(inputs.get("horizon_maanden")))
+                # opt-in status bewaren (niet verzenden; demo-doeleinden)
+                session["data_share_optin"] = plan_data["flags"]["data_share_optin"]
+                plan_data["whatif"] = _whatif_axes(inputs, plan_data["inleg"])
             else:
                 inkomen = float(submitted.get("inkomen") or 0)
                 horizon_jaren = max(1.0, round(float(submitted.get("horizon_maanden") or 12)/12, 2))
                 buffer_maanden = int(submitted.get("buffer_maanden") or 0)
                 inleg_override = request.form.get("inleg")
                 inleg_override = int(inleg_override) if inleg_override and str(inleg_override).strip() else None
-                plan_data = build_bad_plan_stub(inkomen, horizon_jaren, buffer_maanden, inleg_override)
+                plan_data = build_bad_plan_stub(inkomen, horizon_jaren, buffer_maanden, inleg_override,
+                                                defer_projection=_defer(submitted.get("horizon_maanden") or 12))
         except Exception as e:
             errors.append(str(e))
-
-    return render_template("plan.html", mode=mode, errors=errors, fields=fields, sticky=sticky, plan=plan_data)
+        if plan_data and plan_data.get("projection_stream"):
+            # /plan/stream leest de invoer uit de (ondertekende) sessie, niet uit de URL
+            session["projection_stream"] = plan_data["projection_stream"]
+
+    with METRICS.timer("render"):
+        return render_template("plan.html", mode=mode, errors=errors, fields=fields, sticky=sticky, plan=plan_data)
+
+@app.route("/plan/job/<job_id>")
+def plan_job(job_id):
+    # opgevraagd door static/js/plan_job.js zolang de projectie nog loopt
+    job = JOBS.status(job_id)
+    if job is None:
+        return jsonify({"error": "Onbekende of verlopen job. Genereer het plan opnieuw."}), 404
+    body = {"status": job["status"], "seconds": job["seconds"]}
+    if job["status"] == "done":
+        body["projection"] = job["result"]
+    elif job["status"] == "error":
+        body["error"] = job["error"]
+    return jsonify(body)
+
+@app.route("/plan/stream")
+def plan_stream():
+    """Server-sent events: 'progress' per batch simulaties, 'done' met de eindstand."""
+    req = session.get("projection_stream")
+    if not req:
+        return jsonify({"error": "Geen projectie om te streamen. Genereer eerst een plan."}), 404
+    # de sessie-JSON sorteert sleutels; de volgorde van de buckets bepaalt de random-trekkingen
+    req = dict(req, alloc={k: req["alloc"][k] for k in projection.BUCKETS if k in req["alloc"]})
+    batch = int(app.config["PROJECTION_STREAM_BATCH"])
+    tol = float(app.config["PROJECTION_STREAM_TOL"])
+    key = _stream_key(req)
+
+    def gen():
+        est = None
+        for est in projection.progressive(req["inleg"], req["jaren"], req["alloc"], req["assump"],
+                                          sims=req["sims"], batch=batch, tol=tol):
+            yield f"event: progress\ndata: {json.dumps(est)}\n\n"
+        if est is not None and PROJECTION_CACHE.maxsize > 0:
+            PROJECTION_CACHE.put(key, {k: est[k] for k in projection.PERCENTILES})
+        yield f"event: done\ndata: {json.dumps(est)}\n\n"
+
+    return Response(stream_with_context(gen()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/whatif", methods=["POST"])
+def api_whatif():
+    """
+    Wat-als-raster in één aanroep. JSON: {"vary": {veld: [waarden] | {"min","max","steps"}}, "profile": {...}, "inleg": n}.
+    Zonder "profile" (plan-pagina) geldt het laatst ingevulde formulier uit de sessie.
+    Punten staan in rij-volgorde: het laatste veld varieert het snelst.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "Verwacht een JSON-object met 'vary'."}), 400
+    profile = body.get("profile")
+    if profile is None:
+        sticky = _get_sticky_dict()
+        inputs = GoodUX().collect(sticky)
+        inleg = sticky.get("inleg")
+    elif isinstance(profile, dict):
+        inputs = {k: _to_float(v) for k, v in profile.items()}
+        inputs.setdefault("ervaring_level", -1)
+        inleg = body.get("inleg")
+    else:
+        return jsonify({"error": "'profile' moet een object zijn."}), 400
+    try:
+        # ruwe waarde: build_whatif valideert (ook "inf" en 1e30) via _whatif_number
+        return jsonify(build_whatif(inputs, inleg if inleg not in (None, "") else None, body.get("vary")))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route("/managed/start", methods=["POST"])
 def managed_start():
@@ -342,5 +821,201 @@ def download_demo_data():
     mem = io.BytesIO(output.getvalue().encode("utf-8"))
     return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="demo_data.csv")
 
+@app.route("/api/score", methods=["POST"])
+def api_score():
+    """
+    Batch-scoring. Invoer in de kolomindeling van data/columns.json:
+      - JSON-array van objecten (application/json)      → JSON {"scores": [...]}
+      - JSON Lines, één object per regel (application/x-ndjson) → JSON
+      - CSV als upload ('file') of als body (text/csv)   → CSV row,score
+    Alle drie worden incrementeel uit de request-stream gelezen (ook de JSON-array, object voor object):
+    geheugen per chunk, niet per upload. Chunks worden na elkaar gescoord en direct teruggestreamd. Een fout in de eerste chunk geeft 400;
+    daarna is de status al verstuurd en eindigt de body met een expliciete fout: JSON {"scores": [...],
+    "error": "...", "scored": n}, CSV een laatste regel error,"...".
+    """
+    model = MODELS.get()
+    if model is None:
+        return jsonify({"error": MODEL_MISSING}), 503
+    chunk_rows = int(app.config["SCORE_CHUNK_ROWS"])
+    ctype = (request.mimetype or "").lower()
+
+    if "file" in request.files or ctype in ("text/csv", "application/csv"):
+        stream = request.files["file"].stream if "file" in request.files else request.stream
+        try:
+            chunks = iter_csv_chunks(stream, chunk_rows)
+            first = next(chunks, None)
+        except Exception as e:
+            return jsonify({"error": f"CSV onleesbaar: {e}"}), 400
+
+        def gen_csv():
+            yield "row,score\n"
+            i = 0
+            if first is None:
+                return
+            try:
+                for scores in score_chunks(model.model, _prepend(first, chunks), model.cols):
+                    yield "".join(f"{i + j},{p:.6f}\n" for j, p in enumerate(scores))
+                    i += len(scores)
+            except (ValueError, TypeError) as e:
+                msg = str(e).replace('"', "'").replace("\n", " ")
+                yield f'error,"CSV onleesbaar na rij {i}: {msg}"\n'
+        return Response(stream_with_context(gen_csv()), mimetype="text/csv")
+
+    if ctype in ("application/x-ndjson", "application/jsonl"):
+        chunks = iter_chunks(_ndjson_records(request.stream), chunk_rows)
+    else:
+        chunks = iter_chunks(_json_array_records(request.stream), chunk_rows)
+    try:
+        # eerste chunk vooraf: fouten daarin worden nog een gewone 400
+        first = next(chunks, None)
+        first_scores = next(score_chunks(model.model, [first], model.cols)) if first is not None else None
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    def gen_json():
+        yield '{"scores": ['
+        if first_scores is None:
+            yield "]}"
+            return
+        sep, n = "", 0
+        try:
+            for scores in _prepend(first_scores, score_chunks(model.model, chunks, model.cols)):
+                if len(scores):
+                    yield sep + ", ".join(f"{p:.6f}" for p in scores)
+                    sep = ", "
+                    n += len(scores)
+        except (ValueError, TypeError) as e:
+            yield "], " + json.dumps({"error": str(e), "scored": n})[1:]
+            return
+        yield "]}"
+    return Response(stream_with_context(gen_json()), mimetype="application/json")
+
+def _ndjson_records(stream):
+    for n, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Regel {n}: geen geldige JSON ({e})") from None
+        if not isinstance(rec, dict):
+            raise ValueError(f"Regel {n}: verwacht een JSON-object")
+        yield rec
+
+def _json_array_records(stream, block=1 << 16):
+    """
+    Objecten uit een JSON-array, incrementeel gedecodeerd: de buffer bevat hooguit het huidige object
+    plus één blok, dus een upload van gigabytes kost niet meer geheugen dan één van kilobytes.
+    """
+    decoder, text = json.JSONDecoder(), codecs.getincrementaldecoder("utf-8")()
+    state = {"buf": "", "pos": 0, "eof": False}
+
+    def more():
+        data = stream.read(block)
+        state["eof"] = not data
+        state["buf"] = state["buf"][state["pos"]:] + text.decode(data or b"", final=state["eof"])
+        state["pos"] = 0
+
+    def peek():
+        # volgende niet-witruimte (of "" aan het eind)
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf) or state["eof"]:
+                return buf[pos:pos + 1]
+            more()
+
+    if peek() != "[":
+        raise ValueError("Verwacht een JSON-array van objecten, JSON Lines of CSV.")
+    state["pos"] += 1
+    if peek() == "]":
+        return
+    n = 0
+    while True:
+        while True:
+            try:
+                rec, state["pos"] = decoder.raw_decode(state["buf"], state["pos"])
+                break
+            except ValueError as e:
+                if state["eof"]:
+                    raise ValueError(f"Object {n + 1} in de JSON-array: geen geldige JSON ({e})") from None
+                more()   # object loopt door in het volgende blok
+        n += 1
+        if not isinstance(rec, dict):
+            raise ValueError(f"Object {n} in de JSON-array: verwacht een JSON-object")
+        yield rec
+        sep = peek()
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"JSON-array onleesbaar na object {n}: ',' of ']' verwacht")
+        state["pos"] += 1
+        peek()
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+# ---------- Warmup & readiness ----------
+
+WARMUP_PROFILE = {
+    "leeftijd": 35, "inkomen": 3000, "spaardoel": 2000, "horizon_maanden": 60,
+    "ervaring_level": 1, "buffer_maanden": 3, "vaste_lasten": 1300, "pensioen_inleg": 100,
+    "belasting_schatting": 30, "krediet_bedrag": 0, "krediet_rente": 0, "hypotheek_rente": 3,
+    "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0, "data_share_optin": 0,
+}
+
+def warmup():
+    """
+    Laad het model en doe een dummy-voorspelling + projectie. Roep aan in het
+    master-proces vóór het forken (bv. gunicorn --preload wsgi:app), zodat workers
+    het geladen model copy-on-write delen en direct warm zijn.
+    """
+    t0 = time.perf_counter()
+    model = MODELS.get()
+    _projection_table()
+    if model is not None:
+        model.score(WARMUP_PROFILE)
+        for p in (0.1, 0.5, 0.9):
+            alloc, _, _ = _alloc_from_risk(p)
+            _, fee = _select_holdings(alloc, 0, 1)
+            _project(100, 5, alloc, _assumptions(fee), sims=int(app.config["PROJECTION_SIMS"]))
+    WARM.update(ready=model is not None, seconds=round(time.perf_counter() - t0, 3))
+    return WARM["ready"]
+
+@app.cli.command("build-projection-table")
+@click.option("--sims", type=int, default=None, help="Paden per projectie (standaard PROJECTION_SIMS)")
+@click.option("--mode", default=None, help="Projectiemodus (standaard PROJECTION_MODE)")
+@click.option("--out", default=PROJECTION_TABLE_PATH)
+def build_projection_table(sims, mode, out):
+    """Bereken de per-euro-percentielen voor alle standaardcombinaties (flask --app app build-projection-table)."""
+    sims = int(sims or app.config["PROJECTION_SIMS"])
+    mode = mode or app.config["PROJECTION_MODE"]
+    t0 = time.perf_counter()
+    table = projection.ProjectionTable.build(_projection_families(), sims=sims, seed=7, mode=mode)
+    table.save(out)
+    _TABLE.update(table=None, loaded=False)
+    n = sum(len(fees) for _, _, fees, _ in table.families)
+    click.echo(f"[OK] {len(table.families)} families, {n} fee-niveaus × {len(table.horizons)} horizonnen ({mode}, {sims} paden) in "
+               f"{time.perf_counter() - t0:.2f}s -> {out} ({os.path.getsize(out) / 1024:.0f} kB)")
+
+@app.route("/model/version")
+def model_version():
+    return jsonify(MODELS.info())
+
+@app.route("/healthz/ready")
+def ready():
+    # verkeer pas toelaten als warmup() gedraaid heeft en het model geladen is; zonder wsgi.py
+    # (flask run) warmt de eerste probe op, en een later getraind model wordt alsnog opgepikt
+    if not WARM["ready"]:
+        warmup()
+    status = 200 if WARM["ready"] else 503
+    return jsonify({"ready": WARM["ready"], "warmup_seconds": WARM["seconds"],
+                    "backend": MODELS.backend, "model_loaded": MODELS.loaded,
+                    "model_version": MODELS.info()["version"]}), status
+
 if __name__ == "__main__":
+    warmup()
     app.run(debug=True)
@@ -0,0 +1,239 @@
+# bench.py
+# Benchmark-suite voor de hete paden van de app: formulier → score → holdings → projectie → /plan.
+#
+#   python bench.py                          # alles draaien, resultaten naar bench_results.json
+#   python bench.py --save-baseline          # huidige resultaten als baseline bewaren
+#   python bench.py --baseline bench_baseline.json --threshold 0.25
+#                                            # exit 1 als een case >25% trager is dan de baseline
+import os, sys, json, time, argparse, platform
+from contextlib import contextmanager
+import numpy as np
+
+import app as app_module
+from app import app, GoodUX, MODELS, _project, _select_holdings, _assumptions, _alloc_from_risk, build_good_plan_profile
+from ml.model_runtime import row_from_inputs, predict_proba, load_backend
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_OUT = os.path.join(ROOT, "bench_results.json")
+BASELINE = os.path.join(ROOT, "bench_baseline.json")
+
+PROFILE = {
+    "leeftijd": 34, "inkomen": 3100, "spaardoel": 2500, "horizon_maanden": 48,
+    "ervaring_level": 1, "buffer_maanden": 3, "vaste_lasten": 1400, "pensioen_inleg": 150,
+    "belasting_schatting": 30, "krediet_bedrag": 8000, "krediet_rente": 6.5,
+    "hypotheek_rente": 3.4, "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0, "data_share_optin": 0,
+}
+# zoals de browser het formulier post (strings, dropdown i.p.v. ervaring_level)
+FORM = {**{k: str(v) for k, v in PROFILE.items() if k not in ("ervaring_level", "duurzaam_voorkeur", "data_share_optin")},
+        "ervaring_select": "licht", "inleg": ""}
+
+HORIZONS = (1, 5, 10, 30)
+SIMS = (800, 5000)
+
+CASES = {}  # naam → setup(); setup geeft de te meten functie terug (of None = overslaan)
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+@contextmanager
+def no_projection_cache():
+    # cache én voorberekende tabel uit: anders meten de project_*-cases een opzoeking i.p.v. de simulatie
+    cache = app_module.PROJECTION_CACHE
+    size, table = cache.maxsize, app.config["PROJECTION_TABLE"]
+    cache.maxsize = 0
+    app.config["PROJECTION_TABLE"] = False
+    try:
+        yield
+    finally:
+        cache.maxsize = size
+        app.config["PROJECTION_TABLE"] = table
+
+
+@case("goodux_collect")
+def _():
+    ux = GoodUX()
+    return lambda: ux.collect(FORM)
+
+
+@case("score_pipeline")
+def _():
+    # het oorspronkelijke pad: DataFrame-rij + sklearn-pipeline
+    model = MODELS.get()
+    if model is None:
+        return None
+    return lambda: predict_proba(model.model, row_from_inputs(PROFILE, model.cols))
+
+
+@case("score_backend")
+def _():
+    # wat de app echt gebruikt (INFERENCE_MODE)
+    model = MODELS.get()
+    return None if model is None else (lambda: model.score(PROFILE))
+
+
+@case("score_surrogate")
+def _():
+    # INFERENCE_MODE "surrogate" (ml/surrogate.py), inclusief bewaking en terugval
+    model = load_backend("surrogate")
+    return None if model is None or not hasattr(model.fast, "surrogate") else (lambda: model.score(PROFILE))
+
+
+for _jaren in HORIZONS:
+    for _sims in SIMS:
+        @case(f"project_{_jaren}y_{_sims}sims")
+        def _(jaren=_jaren, sims=_sims):
+            alloc, _, _ = _alloc_from_risk(0.5)
+            _, fee = _select_holdings(alloc, 0, 1)
+            assump = _assumptions(fee)
+            def run():
+                with no_projection_cache():
+                    return _project(100, jaren, alloc, assump, sims=sims)
+            return run
+
+
+@case("project_funds_10y_800sims")
+def _():
+    # engine "funds": gecorreleerde simulatie over de gekozen fondsen
+    alloc, _, _ = _alloc_from_risk(0.5)
+    holdings, fee = _select_holdings(alloc, 0, 1)
+    universe, weights = app_module._fund_universe(holdings, alloc, _assumptions(fee))
+    return lambda: app_module.multiasset.project(100, 10, universe, weights, sims=800, fee_annual=fee)
+
+
+@case("select_holdings")
+def _():
+    alloc, _, _ = _alloc_from_risk(0.5)
+    combos = [(d, k) for d in (0, 1) for k in (0, 1, 2)]
+    return lambda: [_select_holdings(alloc, d, k) for d, k in combos]
+
+
+@case("build_good_plan_profile")
+def _():
+    if MODELS.get() is None:
+        return None
+    def run():
+        with app.test_request_context():
+            return build_good_plan_profile(PROFILE, None)
+    return run
+
+
+@case("whatif_10x10")
+def _():
+    # /api/whatif-raster: 100 punten, één modelaanroep, één gedeelde trekking
+    if MODELS.get() is None:
+        return None
+    vary = {"inleg": list(range(25, 275, 25)), "horizon_maanden": list(range(12, 121, 12))}
+    return lambda: app_module.build_whatif(PROFILE, None, vary)
+
+
+@case("plan_post")
+def _():
+    if MODELS.get() is None:
+        return None
+    client = app.test_client()
+    client.get("/mode/good")
+    def run():
+        resp = client.post("/plan", data=FORM)
+        assert resp.status_code == 200
+    return run
+
+
+def measure(fn, n, warmup=3, min_seconds=0.0):
+    for _ in range(warmup):
+        fn()
+    times = []
+    t_start = time.perf_counter()
+    while len(times) < n or time.perf_counter() - t_start < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    t = np.array(times)
+    return {"n": len(t), "p50_ms": float(np.percentile(t, 50) * 1e3), "p99_ms": float(np.percentile(t, 99) * 1e3),
+            "mean_ms": float(t.mean() * 1e3), "ops_per_sec": float(len(t) / t.sum())}
+
+
+def compare(results, baseline, threshold=0.25, metric="p50_ms", min_delta_ms=0.05):
+    """Lijst van regressies: cases die > threshold (relatief) én > min_delta_ms trager zijn dan de baseline."""
+    out = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b or metric not in b:
+            continue
+        cur, ref = r[metric], b[metric]
+        if cur > ref * (1 + threshold) and cur - ref > min_delta_ms:
+            out.append({"case": name, "metric": metric, "baseline": ref, "current": cur, "ratio": cur / ref})
+    return out
+
+
+def run(names, n, min_seconds=0.0, verbose=True):
+    results = {}
+    for name in names:
+        fn = CASES[name]()
+        if fn is None:
+            if verbose:
+                print(f"{name:<28} overgeslagen (geen model)")
+            continue
+        r = results[name] = measure(fn, n, min_seconds=min_seconds)
+        if verbose:
+            print(f"{name:<28} p50={r['p50_ms']:9.3f} ms  p99={r['p99_ms']:9.3f} ms  {r['ops_per_sec']:10.1f} ops/s")
+    return results
+
+
+def _meta():
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count(), "inference_mode": app.config["INFERENCE_MODE"],
+            "projection_mode": app.config["PROJECTION_MODE"], "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def _write(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(), "results": results}, f, indent=2)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks voor de hete paden (p50/p99/throughput).")
+    ap.add_argument("--n", type=int, default=50, help="Minimaal aantal metingen per case")
+    ap.add_argument("--min-seconds", type=float, default=0.0, help="Meet per case minstens zo lang")
+    ap.add_argument("-k", "--filter", default="", help="Alleen cases waarvan de naam dit bevat")
+    ap.add_argument("--out", default=RESULTS_OUT)
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="Schrijf de resultaten ook naar --baseline")
+    ap.add_argument("--threshold", type=float, default=0.25, help="Toegestane vertraging (0.25 = 25%%)")
+    ap.add_argument("--metric", choices=["p50_ms", "p99_ms", "mean_ms"], default="p50_ms")
+    ap.add_argument("--min-delta-ms", type=float, default=0.05, help="Kleinere verschillen gelden als ruis")
+    ap.add_argument("--list", action="store_true")
+    args = ap.parse_args(argv)
+
+    names = [n for n in CASES if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = run(names, args.n, args.min_seconds)
+    _write(args.out, results)
+    print(f"[OK] Resultaten -> {args.out}")
+    if args.save_baseline:
+        _write(args.baseline, results)
+        print(f"[OK] Baseline -> {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Geen baseline ({args.baseline}); maak er een met --save-baseline.")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold, args.metric, args.min_delta_ms)
+    for r in regressions:
+        print(f"[REGRESSIE] {r['case']}: {r['metric']} {r['baseline']:.3f} → {r['current']:.3f} ms (×{r['ratio']:.2f})")
+    if not regressions:
+        print(f"[OK] Geen regressies t.o.v. {args.baseline} (drempel {args.threshold:.0%} op {args.metric})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# bulk.py
+# Plannen voor een heel klantenbestand in één (nachtelijke) run, buiten Flask-requests en sessies om.
+#
+#   python bulk.py profielen.csv --out plannen.jsonl                  # CSV of JSONL in, JSON Lines uit
+#   python bulk.py profielen.jsonl --out plannen --format parquet     # map met part-*.parquet (vereist pyarrow)
+#   python bulk.py profielen.csv --out plannen.jsonl --resume         # verder na de laatste voltooide chunk
+#
+# Invoer: de kolommen van data/columns.json (zoals /api/score), optioneel `id` en `inleg`.
+# Per chunk één gebatchte modelaanroep voor alle risicoscores (en één voor de uitleg), daarna build_good_plan_profile per rij met
+# die score. Projecties komen uit de voorberekende tabel of de per-euro-cache (lineair in de inleg), dus
+# klanten met hetzelfde profiel delen één simulatie. Chunks gaan over een procespool; de uitvoer blijft
+# in invoervolgorde en na elke chunk wordt de voortgang vastgelegd (<out>.progress.json).
+import os, sys, json, time, argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 2000
+ID_COLS = ("id", "klant_id", "customer_id")
+
+
+def read_profiles(path: str, chunk_rows: int = CHUNK_ROWS):
+    """DataFrame-chunks uit een CSV of JSON Lines-bestand."""
+    if path.endswith((".jsonl", ".ndjson")):
+        with pd.read_json(path, lines=True, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def _missing(v) -> bool:
+    return v is None or (isinstance(v, float) and np.isnan(v)) or (isinstance(v, str) and not v.strip())
+
+
+def _inleg(v) -> int:
+    # "abc" → ValueError, "inf" → OverflowError: beide worden een foutregel, geen afgebroken run
+    try:
+        return int(float(v))
+    except ValueError:
+        raise ValueError(f"Ongeldige inleg: {v!r}") from None
+    except OverflowError:
+        raise OverflowError(f"Ongeldige inleg: {v!r}") from None
+
+
+def _inputs(rec: dict, row: dict) -> dict:
+    # zelfde vorm als GoodUX.collect: getallen, horizon 0 → 12, ervaring ontbreekt → -1 (fout)
+    data = {k: int(v) if float(v).is_integer() else float(v) for k, v in row.items()}
+    if data.get("horizon_maanden", 0) <= 0:
+        data["horizon_maanden"] = 12
+    if _missing(rec.get("ervaring_level")):
+        data["ervaring_level"] = -1
+    return data
+
+
+def _json_default(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    raise TypeError(f"Niet serialiseerbaar: {type(v).__name__}")
+
+
+def _summary(rid, plan: dict | None, error: str | None = None) -> dict:
+    # platte rij voor Parquet; het volledige plan als JSON-string
+    row = {"id": rid, "error": error, "score": None, "model_version": None, "inleg": None, "suggested_inleg": None,
+           "alloc_equity": None, "alloc_bonds": None, "alloc_cash": None, "fee_annual": None,
+           "p10": None, "median": None, "p90": None, "risk_level": None, "plan": None}
+    if plan is not None:
+        proj = plan.get("projection") or {}
+        row.update(score=plan["score"], model_version=plan["model_version"], inleg=plan["inleg"],
+                   suggested_inleg=plan["suggested_inleg"], fee_annual=plan["assumptions"]["fee_annual"],
+                   risk_level=plan["risk_ui"]["level"], plan=json.dumps(plan, ensure_ascii=False, default=_json_default),
+                   **{f"alloc_{k}": w for k, w in plan["alloc"].items()}, **{k: proj.get(k) for k in ("p10", "median", "p90")})
+    return row
+
+
+def plan_chunk(records: list, start: int = 0, fmt: str = "jsonl"):
+    """
+    Plannen voor één chunk profielen (dicts). Geeft JSON-regels (fmt "jsonl") of platte rijen ("parquet").
+    Ongeldige profielen leveren {"id", "error"} op in plaats van de run te stoppen.
+    """
+    import app as app_module
+    from ml.model_runtime import frame_from_records, predict_proba_batch
+
+    model = app_module.MODELS.get()
+    if model is None:
+        raise RuntimeError(app_module.MODEL_MISSING)
+    X = frame_from_records(records, model.cols)
+    if model.fast is not None:
+        scores = model.fast.predict_array(np.ascontiguousarray(X.to_numpy(np.float64)))
+    else:
+        scores = predict_proba_batch(model.model, X)
+    top = int(app_module.app.config["EXPLAIN_TOP"])
+    ex = app_module._explainer(model) if top > 0 else None
+    # uitleg voor de hele chunk in één keer (per kolom geïnterpoleerd)
+    drivers = ex.explain_batch(X.to_numpy(np.float64), top) if ex is not None else [[]] * len(records)
+
+    out = []
+    for i, (rec, row, p, d) in enumerate(zip(records, X.to_dict("records"), scores, drivers)):
+        rid = next((rec[c] for c in ID_COLS if c in rec and not _missing(rec[c])), start + i)
+        plan, error = None, None
+        try:
+            inleg = None if _missing(rec.get("inleg")) else _inleg(rec["inleg"])
+            plan = app_module.build_good_plan_profile(_inputs(rec, row), inleg, p_risk=float(p), drivers=d)
+        except (ValueError, OverflowError) as e:
+            error = str(e)
+        if fmt == "parquet":
+            out.append(_summary(rid, plan, error))
+        else:
+            body = {"id": rid, **plan} if plan is not None else {"id": rid, "error": error}
+            out.append(json.dumps(body, ensure_ascii=False, default=_json_default))
+    return out
+
+
+def _init_worker():
+    # model één keer per proces laden (niet per chunk)
+    import app as app_module
+    app_module.MODELS.get()
+
+
+class _Progress:
+    """Voortgang na elke voltooide chunk, atomair weggeschreven; basis voor --resume."""
+
+    def __init__(self, out: str, path: str, chunk_rows: int, fmt: str, resume: bool):
+        self.path = out + ".progress.json"
+        key = {"input": os.path.abspath(path), "chunk_rows": int(chunk_rows), "format": fmt}
+        self.state = {**key, "chunks": 0, "rows": 0, "bytes": 0, "done": False}
+        if resume and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                prev = json.load(f)
+            if {k: prev.get(k) for k in key} != key:
+                raise SystemExit(f"--resume: {self.path} hoort bij een andere invoer, chunkgrootte of format")
+            self.state = prev
+
+    def save(self, **update):
+        self.state.update(update)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+class _JsonlSink:
+    def __init__(self, out: str, offset: int):
+        # na een crash kan er een half geschreven chunk achter de laatste voltooide staan: afkappen
+        self.f = open(out, "r+b" if offset and os.path.exists(out) else "wb")
+        self.f.truncate(offset)
+        self.f.seek(offset)
+
+    def write(self, chunk_idx: int, lines: list) -> int:
+        if lines:
+            self.f.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, out: str, first_chunk: int):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("--format parquet vereist pyarrow (pip install pyarrow); gebruik anders jsonl") from None
+        self.dir = out
+        os.makedirs(out, exist_ok=True)
+        for name in os.listdir(out):
+            # alles vanaf de eerste nog niet voltooide chunk opnieuw
+            if name.startswith("part-") and name.endswith(".parquet") and int(name[5:10]) >= first_chunk:
+                os.remove(os.path.join(out, name))
+
+    def write(self, chunk_idx: int, rows: list) -> int:
+        path = os.path.join(self.dir, f"part-{chunk_idx:05d}.parquet")
+        pd.DataFrame(rows).to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        return 0
+
+    def close(self):
+        pass
+
+
+def generate(path: str, out: str, fmt: str = "jsonl", chunk_rows: int = CHUNK_ROWS, workers: int | None = None,
+             resume: bool = False, verbose: bool = True):
+    """Alle profielen in `path` → plannen in `out`. Geeft {"rows", "chunks", "seconds", "rows_per_sec"}."""
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Onbekend format: {fmt!r}")
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    progress = _Progress(out, path, chunk_rows, fmt, resume)
+    done_chunks, done_rows = progress.state["chunks"], progress.state["rows"]
+    if progress.state["done"]:
+        if verbose:
+            print(f"[bulk] {out} is al compleet ({done_rows:,} rijen)")
+        return {"rows": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    if verbose and done_chunks:
+        print(f"[bulk] hervat na chunk {done_chunks} ({done_rows:,} rijen)")
+    sink = _JsonlSink(out, progress.state["bytes"]) if fmt == "jsonl" else _ParquetSink(out, done_chunks)
+
+    tasks = ((i, i * chunk_rows, df.to_dict("records"))
+             for i, df in enumerate(read_profiles(path, chunk_rows)) if i >= done_chunks)
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker) if workers > 1 else None
+    t0 = time.perf_counter()
+    rows = chunks = 0
+    try:
+        pending = deque()
+        def submit(task):
+            i, start, records = task
+            run = pool.submit(plan_chunk, records, start, fmt).result if pool else (lambda: plan_chunk(records, start, fmt))
+            pending.append((i, len(records), run))
+        for task in tasks:
+            submit(task)
+            # hooguit 2 chunks per worker vooruit: geheugen blijft ~ workers × chunk_rows
+            while len(pending) >= (2 * workers if pool else 1):
+                rows, chunks = _drain(pending, sink, progress, rows, chunks, t0, verbose)
+        while pending:
+            rows, chunks = _drain(pending, sink, progress, rows, chunks, t0, verbose)
+        progress.save(done=True)
+    finally:
+        sink.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    seconds = time.perf_counter() - t0
+    stats = {"rows": rows, "chunks": chunks, "seconds": round(seconds, 3), "rows_per_sec": rows / seconds if seconds else 0.0}
+    if verbose:
+        print(f"[OK] {rows:,} plannen in {seconds:.1f}s ({stats['rows_per_sec']:,.0f} rijen/s) -> {out}")
+    return stats
+
+
+def _drain(pending, sink, progress, rows, chunks, t0, verbose):
+    # oudste chunk afronden: uitvoer blijft in invoervolgorde
+    i, n, result = pending.popleft()
+    offset = sink.write(i, result())
+    rows, chunks = rows + n, chunks + 1
+    progress.save(chunks=i + 1, rows=progress.state["rows"] + n, bytes=offset)
+    if verbose:
+        rate = rows / max(time.perf_counter() - t0, 1e-9)
+        print(f"[bulk] chunk {i}: {progress.state['rows']:,} rijen klaar ({rate:,.0f} rijen/s)")
+    return rows, chunks
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Plannen in bulk voor een bestand met klantprofielen.")
+    ap.add_argument("input", help="CSV of JSON Lines met profielen (kolommen als data/columns.json)")
+    ap.add_argument("--out", required=True, help="Uitvoerbestand (.jsonl) of -map (parquet)")
+    ap.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    ap.add_argument("--workers", type=int, default=None, help="Processen (standaard: aantal CPU's)")
+    ap.add_argument("--resume", action="store_true", help="Verder na de laatste voltooide chunk")
+    args = ap.parse_args(argv)
+    generate(args.input, args.out, args.format, args.chunk_rows, args.workers, args.resume)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
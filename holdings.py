@@ -0,0 +1,126 @@
+# holdings.py
+# Fondsenuniversum als kolommen (numpy) met vooraf berekende selecties.
+#
+# Per (bucket, alleen-ESG) liggen twee volgordes klaar: de oorspronkelijke en gesorteerd op (TER, naam),
+# elk met prefixsommen van de TER. Top-k en de gemiddelde TER van die top-k zijn dan een slice en één
+# deling, zonder filteren of sorteren per request. Extra kenmerken (regio, domicilie, omvang, ...) zijn
+# ook kolommen; een filter daarop is één vectorvergelijking op de vooraf gesorteerde indexen.
+import csv, json, os, threading
+from collections import OrderedDict
+
+import numpy as np
+
+BUCKETS = ("equity", "bonds", "cash")
+BASE_FIELDS = ("name", "ticker", "er", "esg")
+
+
+class HoldingsStore:
+    def __init__(self, records, buckets=BUCKETS):
+        # records: dicts met bucket, name, ticker, er (TER in %), esg (0/1) en evt. extra kenmerken
+        self.rows = [{k: v for k, v in r.items() if k != "bucket"} for r in records]
+        self.buckets = tuple(buckets)
+        n = len(self.rows)
+        bucket_of = [r.get("bucket") for r in records]
+        unknown = sorted({b for b in bucket_of if b not in self.buckets}, key=str)
+        if unknown:
+            raise ValueError(f"Onbekende bucket(s) in holdings: {', '.join(map(str, unknown))}")
+        self.bucket = np.array([self.buckets.index(b) for b in bucket_of], dtype=np.int8)
+        self.er = np.array([float(r["er"]) for r in self.rows], dtype=np.float64)
+        self.esg = np.array([int(r.get("esg", 0)) for r in self.rows], dtype=np.int8)
+        self.names = np.array([str(r["name"]) for r in self.rows], dtype=object)
+        extra = sorted({k for r in self.rows for k in r} - set(BASE_FIELDS))
+        self.columns = {k: self._column([r.get(k) for r in self.rows]) for k in extra}
+        self.columns.update(er=self.er, esg=self.esg, name=self.names,
+                            ticker=np.array([str(r["ticker"]) for r in self.rows], dtype=object))
+
+        orders = {False: np.arange(n, dtype=np.intp),
+                  True: np.array(sorted(range(n), key=lambda i: (self.er[i], self.names[i])), dtype=np.intp)}
+        self.index = {}
+        for b in range(len(self.buckets)):
+            for esg_only in (False, True):
+                keep = (self.bucket == b) & ((self.esg == 1) if esg_only else True)
+                for cost_sorted, order in orders.items():
+                    idx = order[keep[order]]
+                    prefix = np.concatenate([[0.0], np.cumsum(self.er[idx])])
+                    # ook als lijsten: zonder filter is top-k dan een pure slice (geen numpy-overhead per request)
+                    self.index[(self.buckets[b], esg_only, cost_sorted)] = (idx, idx.tolist(), prefix.tolist())
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _column(values):
+        if all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values if v is not None):
+            return np.array([np.nan if v is None else float(v) for v in values])
+        return np.array(["" if v is None else str(v) for v in values], dtype=object)
+
+    # ---------- laden ----------
+
+    @classmethod
+    def from_library(cls, library: dict):
+        """Het HOLDINGS_LIBRARY-formaat: {bucket: [{name, ticker, er, esg, ...}]}."""
+        return cls([{**r, "bucket": b} for b, rows in library.items() for r in rows])
+
+    @classmethod
+    def load(cls, path: str):
+        """CSV (kolommen bucket,name,ticker,er,esg + extra) of JSON (lijst met records of het library-formaat)."""
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls.from_library(data) if isinstance(data, dict) else cls(data)
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        missing = [c for c in ("bucket",) + BASE_FIELDS if rows and c not in rows[0]]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)}: kolommen ontbreken: {', '.join(missing)}")
+        for r in rows:
+            r["er"] = float(r["er"])
+            r["esg"] = int(r.get("esg") or 0)
+            for k, v in r.items():
+                if k not in ("bucket",) + BASE_FIELDS and v not in (None, ""):
+                    try:
+                        r[k] = float(v)
+                    except ValueError:
+                        pass
+        return cls(rows)
+
+    # ---------- selecteren ----------
+
+    def mask(self, **filters):
+        """
+        Booleaans masker voor kenmerkfilters: kolom=waarde, kolom=[waarden], min_kolom=x, max_kolom=x.
+        Maskers worden per filtercombinatie gecachet.
+        """
+        key = tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple, set)) else v) for k, v in filters.items()))
+        m = self._masks.get(key)
+        if m is not None:
+            return m
+        m = np.ones(len(self.rows), dtype=bool)
+        for k, v in filters.items():
+            if k.startswith(("min_", "max_")) and k[4:] in self.columns:
+                col = self.columns[k[4:]]
+                m &= (col >= v) if k.startswith("min_") else (col <= v)
+            elif k in self.columns:
+                col = self.columns[k]
+                m &= np.isin(col, list(v)) if isinstance(v, (list, tuple, set)) else (col == v)
+            else:
+                raise ValueError(f"Onbekend holdings-kenmerk: {k}")
+        with self._lock:
+            self._masks[key] = m
+            if len(self._masks) > 256:
+                self._masks.popitem(last=False)
+        return m
+
+    def top(self, bucket: str, esg_only: bool, cost_sorted: bool, k: int, **filters):
+        """(indexen van de eerste k fondsen, gemiddelde TER in % of None als er geen zijn)."""
+        idx, idx_list, prefix = self.index[(bucket, bool(esg_only), bool(cost_sorted))]
+        if not filters:
+            k = min(k, len(idx_list))
+            return idx_list[:k], (prefix[k] / k if k else None)
+        idx = idx[self.mask(**filters)[idx]][:k]
+        return idx, (sum(self.er[idx].tolist()) / len(idx) if len(idx) else None)
+
+    def records(self, idx):
+        return [self.rows[i] for i in idx]
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,94 @@
+# jobs.py
+# Begrensde achtergrondwachtrij voor zware projecties (PLAN_ASYNC).
+# Vast aantal workers + maximum aantal openstaande jobs: een vol systeem weigert nieuw werk
+# (QueueFull) i.p.v. request-threads te laten wachten op trage simulaties.
+import os, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class JobQueue:
+    """
+    submit(fn, *args) → job-id; status(job_id) → dict of None (onbekend/verlopen).
+    kind="process" draait fn in een apart proces (fn en args moeten picklebaar zijn).
+    Jobs leven in het geheugen van dit proces; afgeronde jobs verlopen na `ttl` seconden.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, ttl: float = 600.0, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Onbekend executor-type: {kind!r}")
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl = float(ttl)
+        self.kind = kind
+        self.jobs = {}
+        self.pending = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        # lui aanmaken (en opnieuw na een fork): gunicorn --preload mag geen threads/processen erven
+        if self._executor is None or self._pid != os.getpid():
+            cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = cls(max_workers=self.workers)
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, fn, *args, on_done=None) -> str:
+        with self.lock:
+            self._expire()
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"Wachtrij vol ({self.pending}/{self.max_pending})")
+            self.pending += 1
+            job_id = uuid.uuid4().hex
+            job = self.jobs[job_id] = {"id": job_id, "submitted": time.time(), "finished": None,
+                                       "result": None, "error": None, "future": None}
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            with self.lock:
+                self.pending -= 1
+                del self.jobs[job_id]
+            raise
+        job["future"] = future
+        future.add_done_callback(lambda f: self._finish(job, f, on_done))
+        return job_id
+
+    def _finish(self, job, future, on_done):
+        try:
+            job["result"] = future.result()
+            if on_done is not None:
+                on_done(job["result"])
+        except Exception as e:
+            job["error"] = str(e) or e.__class__.__name__
+        with self.lock:
+            job["finished"] = time.time()
+            self.pending -= 1
+
+    def _expire(self):
+        now = time.time()
+        for jid in [j["id"] for j in self.jobs.values() if j["finished"] and now - j["finished"] > self.ttl]:
+            del self.jobs[jid]
+
+    def status(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        f = job["future"]
+        if job["finished"] is None:
+            state = "running" if f is not None and f.running() else "queued"
+        else:
+            state = "error" if job["error"] else "done"
+        return {"id": job_id, "status": state, "result": job["result"], "error": job["error"],
+                "seconds": round((job["finished"] or time.time()) - job["submitted"], 3)}
+
+    def stats(self):
+        with self.lock:
+            return {"pending": self.pending, "max_pending": self.max_pending, "workers": self.workers,
+                    "kind": self.kind, "rejected": self.rejected}
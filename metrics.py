@@ -0,0 +1,152 @@
+# metrics.py
+# Lichte instrumentatie: timers per stap → in-process histogrammen → Prometheus-tekstformaat.
+# Uitgeschakeld is timer() een gedeelde no-op context (één attribuut-check per aanroep).
+import threading, time
+from bisect import bisect_left
+
+# seconden; fijn aan de onderkant want formulier/holdings zitten in de µs
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # laatste = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, v: float):
+        i = bisect_left(self.buckets, v)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += v
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cum, acc = [], 0
+        for c in counts:
+            acc += c
+            cum.append(acc)
+        return cum, total, n
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL = _Null()
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "t0")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class Metrics:
+    """
+    Histogrammen per stap (hcaid_stage_seconds{stage=...}) en per endpoint
+    (hcaid_request_seconds{endpoint=...,method=...}). Met server_timing worden de stappen van het
+    lopende request per thread verzameld voor een Server-Timing-header.
+    """
+
+    def __init__(self, enabled=False, server_timing=False, prefix="hcaid"):
+        self.enabled = bool(enabled)
+        self.server_timing = bool(server_timing) and self.enabled
+        self.prefix = prefix
+        self.stages = {}
+        self.requests = {}
+        self.gauges = {}   # naam → (help, type, callable die een getal of {labels-tuple: waarde} geeft)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _hist(self, table, key):
+        h = table.get(key)
+        if h is None:
+            with self.lock:
+                h = table.setdefault(key, Histogram())
+        return h
+
+    def timer(self, stage: str):
+        return _Timer(self, stage) if self.enabled else NULL
+
+    def observe(self, stage: str, seconds: float):
+        self._hist(self.stages, stage).observe(seconds)
+        spans = getattr(self.local, "spans", None)
+        if spans is not None:
+            spans.append((stage, seconds))
+
+    # ---- per request ----
+    def start_request(self):
+        if not self.enabled:
+            return
+        self.local.t0 = time.perf_counter()
+        self.local.spans = [] if self.server_timing else None
+
+    def finish_request(self, endpoint: str, method: str):
+        """Registreert de duur van het request; geeft de Server-Timing-waarde terug (of None)."""
+        t0 = getattr(self.local, "t0", None)
+        if not self.enabled or t0 is None:
+            return None
+        dt = time.perf_counter() - t0
+        self._hist(self.requests, (endpoint or "unknown", method)).observe(dt)
+        spans, self.local.spans, self.local.t0 = self.local.spans, None, None
+        if spans is None:
+            return None
+        parts = [f"{name};dur={secs * 1e3:.2f}" for name, secs in spans]
+        parts.append(f"total;dur={dt * 1e3:.2f}")
+        return ", ".join(parts)
+
+    def gauge(self, name: str, help: str, fn, kind: str = "gauge"):
+        # kind "counter" voor oplopende tellers uit andere modules (cache-hits, reloads)
+        self.gauges[name] = (help, kind, fn)
+
+    # ---- export ----
+    def render(self) -> str:
+        out = []
+        self._render_hist(out, f"{self.prefix}_stage_seconds", "Tijd per stap in het request-pad",
+                          {(("stage", k),): h for k, h in self.stages.items()})
+        self._render_hist(out, f"{self.prefix}_request_seconds", "Tijd per request",
+                          {(("endpoint", e), ("method", m)): h for (e, m), h in self.requests.items()})
+        for name, (help, kind, fn) in sorted(self.gauges.items()):
+            full = f"{self.prefix}_{name}"
+            out += [f"# HELP {full} {help}", f"# TYPE {full} {kind}"]
+            val = fn()
+            items = val.items() if isinstance(val, dict) else [((), val)]
+            for labels, v in items:
+                out.append(f"{full}{_labels(labels)} {float(v):g}")
+        return "\n".join(out) + "\n"
+
+    @staticmethod
+    def _render_hist(out, name, help, hists):
+        out += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+        for labels, h in sorted(hists.items()):
+            cum, total, n = h.snapshot()
+            for le, c in zip([*(f"{b:g}" for b in h.buckets), "+Inf"], cum):
+                out.append(f"{name}_bucket{_labels(labels + (('le', le),))} {c}")
+            out.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            out.append(f"{name}_count{_labels(labels)} {n}")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
@@ -0,0 +1,45 @@
+# ml/bench_inference.py
+# Micro-benchmark: enkele-rij-inferentie via pandas-pipeline vs. FastModel.
+import os, sys, time, argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.model_runtime import load_model_or_none, row_from_inputs, predict_proba, FastModel
+
+SAMPLE = {
+    "leeftijd": 34, "inkomen": 3100, "spaardoel": 2500, "horizon_maanden": 48,
+    "ervaring_level": 1, "buffer_maanden": 3, "vaste_lasten": 1400, "pensioen_inleg": 150,
+    "belasting_schatting": 30, "krediet_bedrag": 8000, "krediet_rente": 6.5,
+    "hypotheek_rente": 3.4, "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0,
+}
+
+def bench(fn, n):
+    fn()  # warm
+    times = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t0
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=500, help="Aantal herhalingen per variant")
+    args = ap.parse_args()
+
+    model, cols = load_model_or_none()
+    if model is None:
+        sys.exit("Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py")
+    fast = FastModel(model, cols)
+
+    ref = predict_proba(model, row_from_inputs(SAMPLE, cols))
+    got = fast.predict_one(SAMPLE)
+    print(f"proba pipeline={ref:.6f} fast={got:.6f} |diff|={abs(ref - got):.2e}")
+
+    for name, fn in [("pipeline", lambda: predict_proba(model, row_from_inputs(SAMPLE, cols))),
+                     ("fast", lambda: fast.predict_one(SAMPLE))]:
+        p50, p99 = bench(fn, args.n)
+        print(f"{name:<9} p50={p50:.3f} ms  p99={p99:.3f} ms")
+
+if __name__ == "__main__":
+    main()
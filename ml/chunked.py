@@ -0,0 +1,118 @@
+# ml/chunked.py
+# Gedeelde helpers voor blokgewijze (streaming) generatie van synthetische datasets.
+#
+# De data wordt opgebouwd uit blokken van vast BLOCK_ROWS rijen; elk blok krijgt een eigen,
+# afgeleide seed (SeedSequence(seed, spawn_key=(stream, blok))). Chunks zijn gehele veelvouden
+# van blokken, dus de uitvoer is bit-voor-bit gelijk ongeacht --chunk-rows of --workers.
+import os, gzip, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from ml.columnar import ColumnarWriter, dtype_for
+
+BLOCK_ROWS = 4096
+
+
+def block_rng(seed: int, stream: int, block: int):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, block)))
+
+
+def generate_rows(block_fn, seed: int, stream: int, start: int, n: int) -> pd.DataFrame:
+    """Rijen [start, start+n) als DataFrame; start moet een veelvoud van BLOCK_ROWS zijn."""
+    assert start % BLOCK_ROWS == 0
+    frames = []
+    block, done = start // BLOCK_ROWS, 0
+    while done < n:
+        size = min(BLOCK_ROWS, n - done)
+        frames.append(block_fn(size, block_rng(seed, stream, block)))
+        block += 1
+        done += size
+    return pd.concat(frames, ignore_index=True)
+
+
+def _render_csv(block_fn, seed, stream, label, compress, job):
+    idx, start, n = job
+    df = generate_rows(block_fn, seed, stream, start, n)
+    payload = df.to_csv(index=False, header=(idx == 0)).encode("utf-8")
+    if compress:
+        # losse gzip-members achter elkaar vormen samen een geldig .gz-bestand
+        payload = gzip.compress(payload, compresslevel=6)
+    label_sum = float(df[label].sum()) if label else 0.0
+    return payload, len(df), label_sum
+
+
+def _render_frame(block_fn, seed, stream, dtypes, job):
+    _, start, n = job
+    df = generate_rows(block_fn, seed, stream, start, n)
+    # al in de worker naar de compacte dtypes: minder data terug over de pipe
+    return start, df.astype(dtypes, copy=False)
+
+
+def chunk_jobs(n_rows: int, chunk_rows: int):
+    chunk_rows = max(BLOCK_ROWS, (int(chunk_rows) // BLOCK_ROWS) * BLOCK_ROWS)
+    return [(i, start, min(chunk_rows, n_rows - start))
+            for i, start in enumerate(range(0, n_rows, chunk_rows))]
+
+
+def ordered_map(fn, jobs, workers: int):
+    """
+    Als map(fn, jobs), in volgorde, met hooguit 2*workers chunks tegelijk onderweg:
+    het geheugen blijft begrensd, ook als schrijven trager is dan genereren.
+    """
+    if workers <= 1:
+        yield from map(fn, jobs)
+        return
+    window = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        it = iter(jobs)
+        for job in it:
+            pending.append(ex.submit(fn, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_csv(path: str, block_fn, n_rows: int, seed: int, stream: int = 0, chunk_rows: int = 100_000,
+              workers: int = 1, label: str | None = None, compress: bool | None = None):
+    """Schrijft de dataset chunk voor chunk naar path (.csv of .csv.gz). Geeft een samenvatting terug."""
+    if compress is None:
+        compress = path.endswith(".gz")
+    fn = partial(_render_csv, block_fn, seed, stream, label, compress)
+    t0 = time.perf_counter()
+    rows, label_sum = 0, 0.0
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        for payload, n, s in ordered_map(fn, chunk_jobs(n_rows, chunk_rows), workers):
+            f.write(payload)
+            rows += n
+            label_sum += s
+    os.replace(tmp, path)
+    secs = time.perf_counter() - t0
+    return {"rows": rows, "seconds": secs, "rows_per_sec": rows / secs if secs else 0.0,
+            "label_mean": label_sum / rows if (label and rows) else None}
+
+
+def write_npy(path: str, block_fn, n_rows: int, seed: int, stream: int = 0, chunk_rows: int = 100_000,
+              workers: int = 1, label: str | None = None):
+    """Als write_csv, maar naar een kolommap (ml/columnar.py); zelfde rijen, binair en met vaste dtypes."""
+    probe = block_fn(1, np.random.default_rng(0))
+    dtypes = {c: dtype_for(c, probe[c]) for c in probe.columns}
+    fn = partial(_render_frame, block_fn, seed, stream, dtypes)
+    t0 = time.perf_counter()
+    rows, label_sum = 0, 0.0
+    w = ColumnarWriter(path, n_rows, dtypes)
+    for start, df in ordered_map(fn, chunk_jobs(n_rows, chunk_rows), workers):
+        w.write(start, df)
+        rows += len(df)
+        if label:
+            label_sum += float(df[label].sum())
+    w.close()
+    secs = time.perf_counter() - t0
+    return {"rows": rows, "seconds": secs, "rows_per_sec": rows / secs if secs else 0.0,
+            "label_mean": label_sum / rows if (label and rows) else None}
@@ -0,0 +1,118 @@
+# ml/columnar.py
+# Kolomgewijs binair datasetformaat: een map met één .npy per kolom + meta.json.
+# Geen extra dependencies; kolommen zijn los te memory-mappen (np.load(mmap_mode="r")),
+# dus inlezen is O(gevraagde kolommen) en zonder tekst-parsing.
+import os, json, shutil
+import numpy as np
+import pandas as pd
+
+FORMAT = "npy-columns"
+VERSION = 1
+SUFFIX = ".cols"
+
+# expliciete dtypes; onbekende kolommen: float32 voor floats, int32 voor ints
+DTYPES = {
+    "leeftijd": "int16",
+    "horizon_maanden": "int16",
+    "buffer_maanden": "int8",
+    "ervaring_level": "int8",
+    "kosten_sensitiviteit": "int8",
+    "duurzaam_voorkeur": "int8",
+    "label": "int8",
+    # make_dataset.py
+    "risico_houding": "int8",
+    "ervaring": "int8",
+    "y_risico": "int8",
+    # geldbedragen en percentages
+    "inkomen": "float32",
+    "spaardoel": "float32",
+    "vaste_lasten": "float32",
+    "pensioen_inleg": "float32",
+    "belasting_schatting": "float32",
+    "krediet_bedrag": "float32",
+    "krediet_rente": "float32",
+    "hypotheek_rente": "float32",
+}
+
+
+def dtype_for(name: str, values) -> np.dtype:
+    if name in DTYPES:
+        return np.dtype(DTYPES[name])
+    kind = np.asarray(values).dtype.kind
+    return np.dtype("int32") if kind in "iub" else np.dtype("float32")
+
+
+def is_columnar(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+
+class ColumnarWriter:
+    """
+    Schrijft n_rows rijen in willekeurige slices (bv. per chunk) naar voorgealloceerde .npy-bestanden.
+    Schrijft eerst naar <path>.part en hernoemt bij close(), zodat lezers nooit een halve map zien.
+    """
+
+    def __init__(self, path: str, n_rows: int, dtypes: dict):
+        self.path = path
+        self.tmp = path + ".part"
+        self.n_rows = int(n_rows)
+        self.dtypes = {c: np.dtype(d) for c, d in dtypes.items()}
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.arrays = {
+            c: np.lib.format.open_memmap(os.path.join(self.tmp, f"{c}.npy"), mode="w+", dtype=d, shape=(self.n_rows,))
+            for c, d in self.dtypes.items()
+        }
+
+    def write(self, start: int, df: pd.DataFrame):
+        for c, arr in self.arrays.items():
+            arr[start:start + len(df)] = df[c].to_numpy()
+
+    def close(self):
+        for arr in self.arrays.values():
+            arr.flush()
+        self.arrays = {}
+        meta = {"format": FORMAT, "version": VERSION, "rows": self.n_rows,
+                "columns": {c: d.str for c, d in self.dtypes.items()}}
+        with open(os.path.join(self.tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp, self.path)
+
+
+def write_columnar(df: pd.DataFrame, path: str):
+    w = ColumnarWriter(path, len(df), {c: dtype_for(c, df[c]) for c in df.columns})
+    w.write(0, df)
+    w.close()
+    return path
+
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"{path} is geen {FORMAT}-dataset")
+    return meta
+
+
+def open_columns(path: str, columns=None, mmap: bool = True) -> dict:
+    """Dict kolom → array; met mmap=True worden alleen de aangeraakte pagina's gelezen."""
+    meta = read_meta(path)
+    names = list(meta["columns"]) if columns is None else list(columns)
+    missing = [c for c in names if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Onbekende kolommen in {path}: {missing}")
+    mode = "r" if mmap else None
+    return {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode=mode) for c in names}
+
+
+def read_columnar(path: str, columns=None, mmap: bool = True) -> pd.DataFrame:
+    # DataFrame met de compacte dtypes (int8/float32); kolomprojectie via `columns`
+    return pd.DataFrame(open_columns(path, columns, mmap), copy=False)
+
+
+def read_table(path: str, columns=None) -> pd.DataFrame:
+    """CSV (.csv/.csv.gz) of kolommap, met optionele kolomprojectie."""
+    if is_columnar(path):
+        return read_columnar(path, columns)
+    return pd.read_csv(path, usecols=columns)
@@ -0,0 +1,210 @@
+# ml/compact_model.py
+# Compact, array-gebaseerd model-artefact (data/model.npz) + evaluator zonder scikit-learn.
+# Alleen numpy nodig: snelle cold start. De arrays worden read-only ge-mmapt uit het (ongecomprimeerde)
+# npz-bestand, dus alle workers delen dezelfde pagina's uit de page cache, ook zonder --preload.
+import os, sys, struct, zipfile, argparse
+import numpy as np
+from numpy.lib import format as npy_format
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "..", "data")
+COMPACT_PATH = os.path.join(DATA_DIR, "model.npz")
+FORMAT_VERSION = 1
+
+
+def export_compact(model, cols: list[str], path: str = COMPACT_PATH) -> str:
+    """
+    Vlakt een CalibratedClassifierCV(Pipeline(ColumnTransformer(StandardScaler), HGB), isotonic)
+    af naar platte arrays. Leest alleen attributen van het gefitte model; importeert geen sklearn.
+    """
+    means, scales, baselines = [], [], []
+    iso_x, iso_y, iso_off = [], [], [0]
+    feature, threshold, left, right, miss_left, value = [], [], [], [], [], []
+    roots, tree_fold = [], []
+    max_depth, offset = 0, 0
+
+    for f, cc in enumerate(model.calibrated_classifiers_):
+        pipe = cc.estimator
+        _, scaler, tcols = pipe.named_steps["pre"].transformers_[0]
+        if list(tcols) != list(cols):
+            raise ValueError("Kolomvolgorde van het model wijkt af van columns.json")
+        clf = pipe.named_steps["clf"]
+        means.append(scaler.mean_)
+        scales.append(scaler.scale_)
+        baselines.append(float(np.ravel(clf._baseline_prediction)[0]))
+        iso = cc.calibrators[0]
+        iso_x.append(iso.X_thresholds_)
+        iso_y.append(iso.y_thresholds_)
+        iso_off.append(iso_off[-1] + len(iso.X_thresholds_))
+
+        for preds in clf._predictors:
+            nodes = preds[0].nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Categorische splitsingen worden niet ondersteund")
+            n = len(nodes)
+            idx = np.arange(n) + offset
+            leaf = nodes["is_leaf"].astype(bool)
+            # bladeren wijzen naar zichzelf: traverseren kan dan een vast aantal stappen
+            left.append(np.where(leaf, idx, nodes["left"].astype(np.int64) + offset))
+            right.append(np.where(leaf, idx, nodes["right"].astype(np.int64) + offset))
+            feature.append(np.where(leaf, 0, nodes["feature_idx"]))
+            threshold.append(nodes["num_threshold"])
+            miss_left.append(nodes["missing_go_to_left"].astype(bool))
+            value.append(np.where(leaf, nodes["value"], 0.0))
+            roots.append(offset)
+            tree_fold.append(f)
+            max_depth = max(max_depth, int(nodes["depth"].max()))
+            offset += n
+
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "columns": np.array(list(cols)),
+        "scaler_mean": np.vstack(means), "scaler_scale": np.vstack(scales),
+        "baseline": np.array(baselines),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "missing_left": np.concatenate(miss_left),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32), "tree_fold": np.array(tree_fold, dtype=np.int32),
+        "max_depth": np.array(max_depth),
+        "iso_x": np.concatenate(iso_x), "iso_y": np.concatenate(iso_y),
+        "iso_offsets": np.array(iso_off, dtype=np.int64),
+    }
+    # ongecomprimeerd: laden is dan één read per array; via tmp + rename zodat
+    # een draaiende app (hot reload) nooit een half geschreven bestand ziet
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def mmap_npz(path: str) -> dict:
+    """
+    Arrays uit een ongecomprimeerd .npz (np.savez) als read-only np.memmap i.p.v. kopieën.
+    np.load negeert mmap_mode voor .npz; elk lid is echter een gewone .npy op een vaste offset.
+    """
+    out = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{os.path.basename(path)}: '{key}' is gecomprimeerd; mmap vereist np.savez")
+            # lokale header: 30 bytes, daarna naam en extra veld (lengtes op offset 26/28)
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = npy_format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = npy_format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = npy_format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{os.path.basename(path)}: '{key}' bevat Python-objecten")
+            if shape == () or 0 in shape:
+                # scalars/leeg: klein, gewoon inlezen
+                n = int(np.prod(shape))
+                out[key] = np.frombuffer(f.read(n * dtype.itemsize), dtype=dtype, count=n).reshape(shape)
+            else:
+                out[key] = np.memmap(path, dtype=dtype, mode="r", shape=shape, order="F" if fortran else "C",
+                                     offset=f.tell())
+    return out
+
+
+class CompactModel:
+    """Evaluator voor model.npz: schalen → alle bomen tegelijk doorlopen → isotone calibratie."""
+
+    def __init__(self, arrays):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError("Onbekende versie van het compacte model")
+        self.cols = [str(c) for c in arrays["columns"]]
+        for k in ("scaler_mean", "scaler_scale", "baseline", "feature", "threshold", "left", "right",
+                  "missing_left", "value", "roots", "tree_fold", "iso_x", "iso_y", "iso_offsets"):
+            arr = np.asarray(arrays[k])
+            arr.setflags(write=False)
+            setattr(self, k, arr)
+        self.max_depth = int(arrays["max_depth"])
+        self.n_folds = len(self.baseline)
+        self._fold_onehot = (self.tree_fold[:, None] == np.arange(self.n_folds)[None, :]).astype(np.float64)
+
+    @classmethod
+    def load(cls, path: str = COMPACT_PATH, mmap: bool = True):
+        if mmap:
+            return cls(mmap_npz(path))
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        """Ruwe HGB-score per fold, vorm (n, n_folds)."""
+        X = np.asarray(X, dtype=np.float64)
+        n, n_feat = X.shape
+        n_trees = len(self.roots)
+        # zelfde bewerking als StandardScaler.transform, per fold: (n_folds, n, n_features) plat
+        Xs = ((X[None, :, :] - self.scaler_mean[:, None, :]) / self.scaler_scale[:, None, :]).ravel()
+        # (rij, boom)-paren; offset wijst naar de geschaalde rij van de fold van die boom
+        offset = (self.tree_fold[None, :] * (n * n_feat) + (np.arange(n) * n_feat)[:, None]).ravel()
+        idx = np.tile(self.roots, n).astype(np.int64)
+        active = np.arange(n * n_trees)
+        for _ in range(self.max_depth):
+            cur = idx[active]
+            v = Xs[offset[active] + self.feature[cur]]
+            go_left = np.where(np.isnan(v), self.missing_left[cur], v <= self.threshold[cur])
+            nxt = np.where(go_left, self.left[cur], self.right[cur])
+            moved = nxt != cur
+            idx[active] = nxt
+            # paren die in een blad staan vallen af
+            active = active[moved]
+            if active.size == 0:
+                break
+        return self.baseline + self.value[idx].reshape(n, n_trees) @ self._fold_onehot
+
+    def predict_array(self, X: np.ndarray) -> np.ndarray:
+        raw = self.raw_predict(X)
+        p = np.zeros(raw.shape[0])
+        for f in range(self.n_folds):
+            a, b = self.iso_offsets[f], self.iso_offsets[f + 1]
+            p += np.interp(raw[:, f], self.iso_x[a:b], self.iso_y[a:b])
+        return p / self.n_folds
+
+    def predict_proba(self, X) -> np.ndarray:
+        # zelfde vorm als sklearn (n, 2), zodat batch-scoring beide modellen accepteert
+        p = self.predict_array(np.asarray(X, dtype=np.float64))
+        return np.column_stack([1.0 - p, p])
+
+    def predict_one(self, inputs: dict) -> float:
+        row = np.empty((1, len(self.cols)))
+        for i, c in enumerate(self.cols):
+            row[0, i] = _to_float(inputs.get(c, 0))
+        return float(self.predict_array(row)[0])
+
+
+def _to_float(v) -> float:
+    if isinstance(v, str):
+        vl = v.strip().lower()
+        if vl in ("true", "on", "1", "yes"):
+            return 1.0
+        if vl == "":
+            return 0.0
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def main():
+    # Exporteer een bestaand model.joblib zonder opnieuw te trainen
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default=COMPACT_PATH)
+    args = ap.parse_args()
+    sys.path.insert(0, os.path.dirname(ROOT))
+    from ml.model_runtime import load_model_or_none
+    model, cols = load_model_or_none()
+    if model is None:
+        sys.exit("Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py")
+    path = export_compact(model, cols, args.out)
+    print(f"[OK] Compact model -> {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
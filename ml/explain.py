@@ -0,0 +1,155 @@
+# ml/explain.py
+# Uitleg per feature voor het gekalibreerde model via een vooraf berekend partial-dependence-raster
+# (data/explain.npz, naast model.joblib; geschreven door ml/train.py of achteraf: python ml/explain.py).
+#
+# Per feature f en kwantielpunt g: de gemiddelde gekalibreerde kans over een vaste achtergrondsteekproef B
+# waarin alleen x_f door g vervangen is:   PD_f(g) = mean_{b in B} p(b | x_f = g)
+# Bijdrage van f aan een score = PD_f(x_f) - mean_{b in B} p(b), in kanspunten. Per request is dat één
+# interpolatie per feature; de batchvariant doet hetzelfde per kolom voor duizenden rijen tegelijk.
+# De som van de bijdragen benadert p - basis; interacties tussen features vallen erbuiten.
+import os, sys, argparse
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.compact_model import _to_float
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "..", "data")
+EXPLAIN_PATH = os.path.join(DATA_DIR, "explain.npz")
+FORMAT_VERSION = 1
+GRID = 24              # kwantielpunten per feature
+BACKGROUND_ROWS = 400  # achtergrondsteekproef (grid × rows × features voorspellingen bij het bouwen)
+
+
+def _predict(model, cols, X: np.ndarray, batch=50_000) -> np.ndarray:
+    out = []
+    for s in range(0, len(X), batch):
+        out.append(model.predict_proba(pd.DataFrame(X[s:s + batch], columns=cols))[:, 1])
+    return np.concatenate(out) if out else np.zeros(0)
+
+
+def build_explainer(model, cols: list[str], background, grid: int = GRID, rows: int = BACKGROUND_ROWS, seed: int = 17,
+                    model_version: str = ""):
+    """
+    Arrays voor explain.npz: per feature een kwantielraster en de gemiddelde kans op elk punt.
+    model_version = inhoudshash van model.joblib + columns.json, zoals bij surrogate.npz.
+    """
+    X = background[cols].to_numpy() if isinstance(background, pd.DataFrame) else np.asarray(background)
+    if len(X) > rows:
+        # eerst de steekproef, dan pas float64 (een float32-trainingsset wordt niet volledig gekopieerd)
+        X = X[np.random.default_rng(seed).choice(len(X), rows, replace=False)]
+    X = X.astype(np.float64)
+    n, n_feat = X.shape
+    grids = np.empty((n_feat, grid))
+    pd_vals = np.empty((n_feat, grid))
+    for f in range(n_feat):
+        g = np.unique(np.quantile(X[:, f], np.linspace(0, 1, grid)))
+        big = np.tile(X, (len(g), 1))
+        big[:, f] = np.repeat(g, n)
+        p = _predict(model, cols, big).reshape(len(g), n).mean(axis=1)
+        # minder unieke waarden (bv. 0/1-vlaggen) → opvullen met het laatste punt; interp blijft correct
+        grids[f] = np.pad(g, (0, grid - len(g)), mode="edge")
+        pd_vals[f] = np.pad(p, (0, grid - len(g)), mode="edge")
+    return {"format_version": np.array(FORMAT_VERSION), "columns": np.array(list(cols)),
+            "grid": grids, "pd": pd_vals, "base": np.array(float(_predict(model, cols, X).mean())),
+            "background_rows": np.array(n), "model_version": np.array(model_version)}
+
+
+def export_explainer(model, cols: list[str], background, path: str = EXPLAIN_PATH, **kw) -> str:
+    arrays = build_explainer(model, cols, background, **kw)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+class Explainer:
+    def __init__(self, arrays):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Onbekende explain-versie {int(arrays['format_version'])}")
+        self.cols = [str(c) for c in arrays["columns"]]
+        self.grid = np.asarray(arrays["grid"], dtype=np.float64)
+        self.pd = np.asarray(arrays["pd"], dtype=np.float64)
+        self.base = float(arrays["base"])
+        self.model_version = str(arrays["model_version"]) if "model_version" in arrays else ""
+        # enkele rij: bisect op lijsten is ~10× sneller dan np.interp per feature
+        self._g = self.grid.tolist()
+        self._p = self.pd.tolist()
+
+    @classmethod
+    def load(cls, path: str = EXPLAIN_PATH):
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        """(n, features) bijdragen in kanspunten voor een matrix in self.cols-volgorde."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        out = np.empty(X.shape)
+        for f in range(X.shape[1]):
+            out[:, f] = np.interp(X[:, f], self.grid[f], self.pd[f])
+        return out - self.base
+
+    def top(self, values, contrib, k: int = 3):
+        """De k features met de grootste |bijdrage| voor één rij."""
+        order = np.argsort(-np.abs(contrib), kind="stable")[:k]
+        return [{"feature": self.cols[i], "value": float(values[i]), "contribution": float(contrib[i])} for i in order]
+
+    def _interp(self, f: int, x: float) -> float:
+        g, p = self._g[f], self._p[f]
+        if x <= g[0]:
+            return p[0]
+        if x >= g[-1]:
+            return p[-1]
+        j = bisect_right(g, x)
+        return p[j - 1] + (p[j] - p[j - 1]) * (x - g[j - 1]) / (g[j] - g[j - 1])
+
+    def explain(self, inputs: dict, k: int = 3):
+        values = [_to_float(inputs.get(c, 0)) for c in self.cols]
+        contrib = [self._interp(f, x) - self.base for f, x in enumerate(values)]
+        order = sorted(range(len(contrib)), key=lambda i: -abs(contrib[i]))[:k]
+        return [{"feature": self.cols[i], "value": values[i], "contribution": contrib[i]} for i in order]
+
+    def explain_batch(self, X: np.ndarray, k: int = 3):
+        X = np.asarray(X, dtype=np.float64)
+        contrib = self.contributions(X)
+        return [self.top(x, c, k) for x, c in zip(X, contrib)]
+
+
+def load_explainer_or_none(cols: list[str] | None = None, model_version: str | None = None, path: str = EXPLAIN_PATH):
+    """
+    None als explain.npz ontbreekt, onleesbaar is of bij een ander model hoort: andere kolommen, of
+    (met model_version) van een ander model.joblib gemaakt, bv. een hertraind model met dezelfde kolommen.
+    """
+    try:
+        ex = Explainer.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if cols is not None and ex.cols != list(cols):
+        return None
+    return ex if model_version is None or ex.model_version == model_version else None
+
+
+def main():
+    # explain.npz maken voor een bestaand model.joblib zonder opnieuw te trainen
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(DATA_DIR, "synth_train.csv"),
+                    help="Achtergronddata (CSV of kolommap), bv. de trainingsset")
+    ap.add_argument("--rows", type=int, default=BACKGROUND_ROWS)
+    ap.add_argument("--grid", type=int, default=GRID)
+    ap.add_argument("--out", default=EXPLAIN_PATH)
+    args = ap.parse_args()
+    from ml.model_runtime import load_model_or_none, artifact_paths, _content_hash
+    from ml.columnar import read_table
+    model, cols = load_model_or_none()
+    if model is None:
+        sys.exit("Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py")
+    background = read_table(args.data, cols)
+    path = export_explainer(model, cols, background, args.out, grid=args.grid, rows=args.rows,
+                            model_version=_content_hash(artifact_paths("fast")))
+    print(f"[OK] Uitleg -> {path} ({os.path.getsize(path) / 1024:.0f} KB, {min(len(background), args.rows)} achtergrondrijen)")
+
+
+if __name__ == "__main__":
+    main()
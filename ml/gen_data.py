@@ -1,8 +1,12 @@
 # ml/gen_data.py
-import os, json
+import os, sys, json, argparse
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.chunked import write_csv, write_npy
+from ml.columnar import SUFFIX, write_columnar
+
 ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(ROOT, "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -14,84 +18,121 @@ os.makedirs(DATA_DIR, exist_ok=True)
 #  - lage buffer, korte horizon, lage ervaring, hoge lastendruk => meer risico
 # ===========================================================
 
-def generate(n_train=30000, n_valid=6000, seed=42):
-    rng = np.random.default_rng(seed)
+def make_block(n, rng):
+    leeftijd = rng.integers(18, 70, size=n)               # 18..69
+    inkomen = rng.normal(3200, 1000, size=n).clip(900, 12000)   # netto p/m
+    vaste_lasten = (inkomen * rng.normal(0.45, 0.10, size=n)).clip(300, 8000)
+    pensioen_inleg = (inkomen * rng.normal(0.05, 0.02, size=n)).clip(0, 1200)
+    spaardoel = rng.normal(3000, 4000, size=n).clip(0, 40000)
+    horizon_maanden = rng.integers(6, 121, size=n)        # 6..120 (0.5–10 jaar)
+    ervaring_level = rng.choice([0,1,2,3], size=n, p=[0.3,0.35,0.25,0.10])
+    buffer_maanden = rng.integers(0, 13, size=n)
+    belasting_schatting = rng.normal(28, 6, size=n).clip(0, 55)  # %
+    # >>> KREDIET: laat breed variëren en soms flink hoog tov inkomen
+    krediet_bedrag = (rng.lognormal(mean=8.5, sigma=1.0, size=n)).clip(0, 150000)  # ~ewm: 5k–100k
+    # iets afhankelijk van inkomen (meer inkomen => gemiddeld iets meer krediet)
+    krediet_bedrag *= rng.uniform(0.6, 1.4, size=n)
+    krediet_rente = rng.normal(7.5, 3.0, size=n).clip(0, 25)     # %
+    hypotheek_rente = rng.normal(3.5, 1.0, size=n).clip(0, 8)
+    kosten_sensitiviteit = rng.integers(0, 3, size=n)            # 0/1/2
+    duurzaam_voorkeur = rng.integers(0, 2, size=n)               # 0/1
+
+    # ---------- Risico-score bouwen ----------
+    # Basis: ratio's
+    lastendruk = (vaste_lasten + pensioen_inleg) / np.maximum(inkomen, 1)
+    krediet_ratio = krediet_bedrag / np.maximum(12*inkomen, 1)    # schuld tov 1 jaar netto
+    krediet_ratio = np.clip(krediet_ratio, 0, 3.0)
 
-    def make_split(n):
-        leeftijd = rng.integers(18, 70, size=n)               # 18..69
-        inkomen = rng.normal(3200, 1000, size=n).clip(900, 12000)   # netto p/m
-        vaste_lasten = (inkomen * rng.normal(0.45, 0.10, size=n)).clip(300, 8000)
-        pensioen_inleg = (inkomen * rng.normal(0.05, 0.02, size=n)).clip(0, 1200)
-        spaardoel = rng.normal(3000, 4000, size=n).clip(0, 40000)
-        horizon_maanden = rng.integers(6, 121, size=n)        # 6..120 (0.5–10 jaar)
-        ervaring_level = rng.choice([0,1,2,3], size=n, p=[0.3,0.35,0.25,0.10])
-        buffer_maanden = rng.integers(0, 13, size=n)
-        belasting_schatting = rng.normal(28, 6, size=n).clip(0, 55)  # %
-        # >>> KREDIET: laat breed variëren en soms flink hoog tov inkomen
-        krediet_bedrag = (rng.lognormal(mean=8.5, sigma=1.0, size=n)).clip(0, 150000)  # ~ewm: 5k–100k
-        # iets afhankelijk van inkomen (meer inkomen => gemiddeld iets meer krediet)
-        krediet_bedrag *= rng.uniform(0.6, 1.4, size=n)
-        krediet_rente = rng.normal(7.5, 3.0, size=n).clip(0, 25)     # %
-        hypotheek_rente = rng.normal(3.5, 1.0, size=n).clip(0, 8)
-        kosten_sensitiviteit = rng.integers(0, 3, size=n)            # 0/1/2
-        duurzaam_voorkeur = rng.integers(0, 2, size=n)               # 0/1
+    # z-score-achtige transformaties
+    z_leeftijd = (leeftijd - 40) / 12.0
+    z_horizon = (horizon_maanden - 36) / 18.0
+    z_buffer = (buffer_maanden - 3) / 2.0
+    z_lasten = (lastendruk - 0.5) / 0.15
+    z_ervaring = (ervaring_level - 1.5) / 1.2
+    z_krediet_rente = (krediet_rente - 7) / 5.0
 
-        # ---------- Risico-score bouwen ----------
-        # Basis: ratio's
-        lastendruk = (vaste_lasten + pensioen_inleg) / np.maximum(inkomen, 1)
-        krediet_ratio = krediet_bedrag / np.maximum(12*inkomen, 1)    # schuld tov 1 jaar netto
-        krediet_ratio = np.clip(krediet_ratio, 0, 3.0)
+    # Score: positieve coefs = MEER risico
+    s = (
+        2.5 * krediet_ratio +           # <<< STERK effect van hoogte krediet
+        1.2 * z_krediet_rente +         # hogere rente => meer risico
+        1.0 * (-z_horizon) +            # korte horizon => meer risico
+        1.0 * (-z_buffer) +             # lage buffer => meer risico
+        0.8 * z_lasten +                # hoge lastendruk => meer risico
+        0.5 * (-z_ervaring) +           # lage ervaring => meer risico
+        0.2 * z_leeftijd +              # iets hogere leeftijd => iets meer risico
+        rng.normal(0, 0.8, size=n)      # ruis
+    )
 
-        # z-score-achtige transformaties
-        z_leeftijd = (leeftijd - 40) / 12.0
-        z_horizon = (horizon_maanden - 36) / 18.0
-        z_buffer = (buffer_maanden - 3) / 2.0
-        z_lasten = (lastendruk - 0.5) / 0.15
-        z_ervaring = (ervaring_level - 1.5) / 1.2
-        z_krediet_rente = (krediet_rente - 7) / 5.0
+    # Sigmoid
+    p = 1 / (1 + np.exp(-s))
+    y = (rng.uniform(0,1,size=n) < p).astype(int)
 
-        # Score: positieve coefs = MEER risico
-        s = (
-            2.5 * krediet_ratio +           # <<< STERK effect van hoogte krediet
-            1.2 * z_krediet_rente +         # hogere rente => meer risico
-            1.0 * (-z_horizon) +            # korte horizon => meer risico
-            1.0 * (-z_buffer) +             # lage buffer => meer risico
-            0.8 * z_lasten +                # hoge lastendruk => meer risico
-            0.5 * (-z_ervaring) +           # lage ervaring => meer risico
-            0.2 * z_leeftijd +              # iets hogere leeftijd => iets meer risico
-            rng.normal(0, 0.8, size=n)      # ruis
-        )
+    df = pd.DataFrame({
+        "leeftijd": leeftijd,
+        "inkomen": inkomen.round(2),
+        "spaardoel": spaardoel.round(2),
+        "horizon_maanden": horizon_maanden,
+        "ervaring_level": ervaring_level,
+        "buffer_maanden": buffer_maanden,
+        "vaste_lasten": vaste_lasten.round(2),
+        "pensioen_inleg": pensioen_inleg.round(2),
+        "belasting_schatting": belasting_schatting.round(2),
+        "krediet_bedrag": krediet_bedrag.round(2),
+        "krediet_rente": krediet_rente.round(2),
+        "hypotheek_rente": hypotheek_rente.round(2),
+        "kosten_sensitiviteit": kosten_sensitiviteit,
+        "duurzaam_voorkeur": duurzaam_voorkeur,
+        "label": y
+    })
+    return df
 
-        # Sigmoid
-        p = 1 / (1 + np.exp(-s))
-        y = (rng.uniform(0,1,size=n) < p).astype(int)
+def out_name(split, fmt="csv"):
+    # csv: synth_train.csv; npy: kolommap synth_train.cols/ (ml/columnar.py)
+    return f"synth_{split}" + (SUFFIX if fmt == "npy" else ".csv")
+
+def generate(n_train=30000, n_valid=6000, seed=42, fmt="csv"):
+    rng = np.random.default_rng(seed)
 
-        df = pd.DataFrame({
-            "leeftijd": leeftijd,
-            "inkomen": inkomen.round(2),
-            "spaardoel": spaardoel.round(2),
-            "horizon_maanden": horizon_maanden,
-            "ervaring_level": ervaring_level,
-            "buffer_maanden": buffer_maanden,
-            "vaste_lasten": vaste_lasten.round(2),
-            "pensioen_inleg": pensioen_inleg.round(2),
-            "belasting_schatting": belasting_schatting.round(2),
-            "krediet_bedrag": krediet_bedrag.round(2),
-            "krediet_rente": krediet_rente.round(2),
-            "hypotheek_rente": hypotheek_rente.round(2),
-            "kosten_sensitiviteit": kosten_sensitiviteit,
-            "duurzaam_voorkeur": duurzaam_voorkeur,
-            "label": y
-        })
-        return df
+    train = make_block(n_train, rng)
+    valid = make_block(n_valid, rng)
 
-    train = make_split(n_train)
-    valid = make_split(n_valid)
+    for split, df in (("train", train), ("valid", valid)):
+        name = out_name(split, fmt)
+        if fmt == "npy":
+            write_columnar(df, os.path.join(DATA_DIR, name))
+        else:
+            df.to_csv(os.path.join(DATA_DIR, name), index=False)
+        print(f"[OK] {name} -> {len(df)} rows")
 
-    train.to_csv(os.path.join(DATA_DIR, "synth_train.csv"), index=False)
-    valid.to_csv(os.path.join(DATA_DIR, "synth_valid.csv"), index=False)
-    print(f"[OK] synth_train.csv -> {len(train)} rows")
-    print(f"[OK] synth_valid.csv -> {len(valid)} rows")
+def generate_chunked(n_train=30000, n_valid=6000, seed=42, chunk_rows=100_000, workers=1, out_dir=DATA_DIR,
+                     fmt="csv"):
+    """
+    Zelfde verdeling als generate(), maar in blokken met afgeleide seeds (ml/chunked.py):
+    geheugen ~ workers × chunk_rows, en de uitvoer hangt niet af van chunk_rows/workers.
+    (Andere random-stroom dan generate(), dus niet rij-voor-rij gelijk daaraan.)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    write = write_npy if fmt == "npy" else write_csv
+    for split, n, stream in (("train", n_train, 0), ("valid", n_valid, 1)):
+        name = out_name(split, fmt)
+        stats = write(os.path.join(out_dir, name), make_block, n, seed, stream=stream,
+                      chunk_rows=chunk_rows, workers=workers, label="label")
+        print(f"[OK] {name} -> {stats['rows']} rows ({stats['rows_per_sec']:,.0f} rows/s)")
 
 if __name__ == "__main__":
-    generate()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n-train", type=int, default=30000)
+    ap.add_argument("--n-valid", type=int, default=6000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--chunked", action="store_true", help="Blokgewijs genereren en streamend wegschrijven")
+    ap.add_argument("--chunk-rows", type=int, default=100_000, help="Rijen per chunk (afgerond op blokken)")
+    ap.add_argument("--workers", type=int, default=1, help="Processen voor parallelle generatie (--chunked)")
+    ap.add_argument("--out-dir", default=DATA_DIR)
+    ap.add_argument("--format", choices=["csv", "npy"], default="csv",
+                    help="npy = kolommap met één .npy per kolom (snel en memory-mapped inlezen)")
+    args = ap.parse_args()
+    if args.chunked or args.workers > 1:
+        generate_chunked(args.n_train, args.n_valid, args.seed, args.chunk_rows, args.workers, args.out_dir,
+                         args.format)
+    else:
+        generate(args.n_train, args.n_valid, args.seed, args.format)
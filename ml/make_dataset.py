@@ -1,12 +1,18 @@
 # ml/make_dataset.py
-import os, argparse, json
+import os, sys, argparse, json
+from functools import partial
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.chunked import write_csv, write_npy
+from ml.columnar import SUFFIX, write_columnar
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 OUT_CSV = os.path.join(DATA_DIR, "synthetic_microinvest.csv.gz")
+OUT_COLS = os.path.join(DATA_DIR, "synthetic_microinvest" + SUFFIX)
 OUT_META = os.path.join(DATA_DIR, "synthetic_meta.json")
 
 def generate_synthetic(n=100_000, seed=42, skew=0.0, noise=0.0):
@@ -16,8 +22,9 @@ def generate_synthetic(n=100_000, seed=42, skew=0.0, noise=0.0):
     skew: additieve verschuiving op de logit -> >0 maakt label gemiddeld 'risicovoller'
     noise: gaussische ruis op de logit (0..1 typisch)
     """
-    rng = np.random.default_rng(seed)
+    return synthetic_block(n, np.random.default_rng(seed), skew=skew, noise=noise)
 
+def synthetic_block(n, rng, skew=0.0, noise=0.0):
     leeftijd = rng.integers(18, 75, n)
     inkomen = rng.normal(3200, 900, n).clip(800, 10000)
     spaardoel = rng.normal(3000, 2500, n).clip(0, 20000)
@@ -63,24 +70,46 @@ def main():
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--skew", type=float, default=0.0, help="Logit shift: >0 meer 1'jes, <0 meer 0'en")
     ap.add_argument("--noise", type=float, default=0.0, help="Gauss-ruis op logit (typisch 0..0.5)")
+    ap.add_argument("--chunked", action="store_true",
+                    help="Blokgewijs genereren met afgeleide seeds en streamend wegschrijven (begrensd geheugen)")
+    ap.add_argument("--chunk-rows", type=int, default=250_000, help="Rijen per chunk (afgerond op blokken)")
+    ap.add_argument("--workers", type=int, default=1, help="Processen voor parallelle generatie (--chunked)")
+    ap.add_argument("--format", choices=["csv", "npy"], default="csv",
+                    help="npy = kolommap met één .npy per kolom i.p.v. .csv.gz")
     args = ap.parse_args()
+    out_path = OUT_COLS if args.format == "npy" else OUT_CSV
 
-    df = generate_synthetic(n=args.rows, seed=args.seed, skew=args.skew, noise=args.noise)
-    df.to_csv(OUT_CSV, index=False, compression="gzip")
+    if args.chunked or args.workers > 1:
+        block_fn = partial(synthetic_block, skew=args.skew, noise=args.noise)
+        write = write_npy if args.format == "npy" else write_csv
+        stats = write(out_path, block_fn, args.rows, args.seed, chunk_rows=args.chunk_rows,
+                      workers=args.workers, label="y_risico")
+        frac_1 = stats["label_mean"]
+        n_rows = stats["rows"]
+        print(f"⏱️  {stats['rows_per_sec']:,.0f} rows/s met {args.workers} worker(s)")
+    else:
+        df = generate_synthetic(n=args.rows, seed=args.seed, skew=args.skew, noise=args.noise)
+        if args.format == "npy":
+            write_columnar(df, out_path)
+        else:
+            df.to_csv(out_path, index=False, compression="gzip")
+        frac_1 = float(df["y_risico"].mean())
+        n_rows = len(df)
 
     meta = {
         "rows": int(args.rows),
         "seed": int(args.seed),
         "skew": float(args.skew),
         "noise": float(args.noise),
-        "path": OUT_CSV
+        "chunked": bool(args.chunked or args.workers > 1),
+        "format": args.format,
+        "path": out_path
     }
     with open(OUT_META, "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
     # Kleine samenvatting
-    frac_1 = float(df["y_risico"].mean())
-    print(f"✅ Dataset opgeslagen: {OUT_CSV}  |  rows={len(df)}  |  y_risico mean={frac_1:.3f}")
+    print(f"✅ Dataset opgeslagen: {out_path}  |  rows={n_rows}  |  y_risico mean={frac_1:.3f}")
     print(f"ℹ️  Meta: {OUT_META}")
 
 if __name__ == "__main__":
@@ -1,8 +1,13 @@
 # ml/model.py
-import os, json, joblib
+import os, sys, json, joblib
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.explain import load_explainer_or_none
+from ml.model_runtime import _content_hash
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 MODEL_PATH = os.path.join(DATA_DIR, "model.joblib")
 COLS_PATH = os.path.join(DATA_DIR, "columns.json")
@@ -12,41 +17,23 @@ def load_model():
         raise RuntimeError("Modelbestand ontbreekt. Voer eerst: python ml/train.py")
     return joblib.load(MODEL_PATH)
 
+@lru_cache(maxsize=1)
 def _load_columns():
+    # één keer per proces; columns.json verandert alleen bij een nieuw model
     with open(COLS_PATH, "r") as f:
-        cols = json.load(f)
-    return cols["numeric"], cols["categorical"]
-
-def _align_columns(df: pd.DataFrame, num_cols, cat_cols):
-    # Voeg missende kolommen toe
-    for c in num_cols:
-        if c not in df.columns:
-            df[c] = 0.0
-    for c in cat_cols:
-        if c not in df.columns:
-            df[c] = ""
-    # Hou alleen bekende kolommen in juiste volgorde
-    return df[num_cols + cat_cols].copy()
+        return list(json.load(f)["columns"])
 
-def predict_with_explain(model, X: pd.DataFrame):
-    num_cols, cat_cols = _load_columns()
-    X2 = _align_columns(X.copy(), num_cols, cat_cols)
+@lru_cache(maxsize=1)
+def _explainer():
+    # alleen een explain.npz die van dit model.joblib gemaakt is
+    return load_explainer_or_none(_load_columns(), _content_hash([MODEL_PATH, COLS_PATH]))
 
+def predict_with_explain(model, X: pd.DataFrame, top: int = 8):
+    """(kans, voorspelling, top-bijdragen) voor de eerste rij van X; bijdragen in kanspunten (ml/explain.py)."""
+    cols = _load_columns()
+    X2 = X.reindex(columns=cols, fill_value=0.0)
     proba = float(model.predict_proba(X2)[:, 1][0])
     pred = int(proba >= 0.5)
-
-    # Snelle, lichte pseudo-uitleg:
-    # Schat top-variabele numerieke kolommen via z-score (hoe “extreem” tov trainings-mean=0 na RobustScaler)
-    # NB: Omdat we scaler in pipeline hebben, kunnen we input approx z-scored inschatten door een ad-hoc schaal:
-    # Hier simpelweg absolute waarde vs robust schaal (fallback = 1.0). Dit is indicatief.
-    contrib = []
-    row = X2.iloc[0]
-    for c in num_cols:
-        val = row[c]
-        # ruwe “impact score” ~ |val| geschaald
-        score = float(abs(val))  # we hebben geen directe scaler stats; indicatief
-        contrib.append({"feature": c, "value": float(val), "contribution": score})
-
-    # sorteer top 8
-    contrib = sorted(contrib, key=lambda d: d["contribution"], reverse=True)[:8]
+    ex = _explainer()
+    contrib = ex.explain_batch(X2.iloc[:1].to_numpy(np.float64), top)[0] if ex is not None else []
     return proba, pred, contrib
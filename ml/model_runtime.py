@@ -1,8 +1,12 @@
 # ml/model_runtime.py
-import os, json
+import os, json, time, hashlib, threading
+import numpy as np
 import pandas as pd
 from joblib import load
 
+from ml.compact_model import CompactModel, COMPACT_PATH, _to_float
+from ml.surrogate import Surrogate, SURROGATE_PATH
+
 ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(ROOT, "..", "data")
 
@@ -22,6 +26,15 @@ def load_model_or_none():
     except Exception:
         return None, None
 
+def load_compact_or_none(path: str = COMPACT_PATH):
+    # numpy-only evaluator (ml/compact_model.py); geen scikit-learn nodig
+    if not os.path.exists(path):
+        return None
+    try:
+        return CompactModel.load(path)
+    except Exception:
+        return None
+
 # Zorg dat ALLE verwachte kolommen aanwezig zijn en op de goede VOLGORDE staan
 def row_from_inputs(inputs: dict, model_cols: list[str]) -> pd.DataFrame:
     row = {}
@@ -39,3 +52,339 @@ def predict_proba(model, Xdf: pd.DataFrame) -> float:
     # model is Pipeline met scaler + HGB + calibratie → direct proba
     proba = model.predict_proba(Xdf)[:, 1]
     return float(proba[0])
+
+# ---------- Batch ----------
+
+TRUTHY = ("true", "on", "1", "yes")
+
+def frame_from_records(records, model_cols: list[str]) -> pd.DataFrame:
+    """Zelfde normalisatie als row_from_inputs, maar voor veel rijen tegelijk."""
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(list(records))
+    df = df.reindex(columns=model_cols)
+    for c in model_cols:
+        col = df[c]
+        if col.dtype == object:
+            s = col.astype(str).str.strip().str.lower()
+            col = pd.to_numeric(col.where(~s.isin(TRUTHY), 1), errors="coerce")
+        df[c] = col.fillna(0)
+    return df
+
+def predict_proba_batch(model, Xdf: pd.DataFrame) -> np.ndarray:
+    # één predict_proba-aanroep voor alle rijen
+    if len(Xdf) == 0:
+        return np.zeros(0)
+    return model.predict_proba(Xdf)[:, 1]
+
+def iter_chunks(records, chunk_rows: int):
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_csv_chunks(stream, chunk_rows: int):
+    # pandas leest de upload blok voor blok; geheugen blijft ~ chunk_rows
+    yield from pd.read_csv(stream, chunksize=chunk_rows)
+
+def score_chunks(model, chunks, model_cols: list[str]):
+    """Generator: per chunk (records of DataFrame) een array met risicokansen."""
+    for chunk in chunks:
+        yield predict_proba_batch(model, frame_from_records(chunk, model_cols))
+
+# ---------- Snelle enkele-rij-inferentie ----------
+
+class FastModel:
+    """
+    Uitgeklede variant van de gekalibreerde pipeline (ColumnTransformer+StandardScaler
+    → HGB → isotone calibratie, per CV-fold): de schaalstap en calibratie gebeuren
+    met numpy op een voorgealloceerde rij in MODEL_COLS-volgorde, zonder pandas.
+    Geeft dezelfde kansen als predict_proba(model, row_from_inputs(...)).
+    """
+
+    def __init__(self, model, model_cols: list[str]):
+        self.cols = list(model_cols)
+        self.folds = []
+        for cc in model.calibrated_classifiers_:
+            pipe = cc.estimator
+            name, scaler, cols = pipe.named_steps["pre"].transformers_[0]
+            if list(cols) != self.cols:
+                raise ValueError("Kolomvolgorde van het model wijkt af van columns.json")
+            iso = cc.calibrators[0]
+            self.folds.append((scaler.mean_, scaler.scale_, pipe.named_steps["clf"],
+                               iso.X_thresholds_, iso.y_thresholds_))
+        self._local = threading.local()
+
+    def _buffer(self, n: int = 1) -> np.ndarray:
+        # per thread één contigue buffer, zodat gelijktijdige requests elkaar niet raken
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] != n:
+            buf = self._local.buf = np.empty((n, len(self.cols)), dtype=np.float64)
+        return buf
+
+    def predict_array(self, X: np.ndarray) -> np.ndarray:
+        p = np.zeros(X.shape[0])
+        for mean, scale, clf, iso_x, iso_y in self.folds:
+            raw = clf._raw_predict((X - mean) / scale).ravel()
+            p += np.interp(raw, iso_x, iso_y)
+        return p / len(self.folds)
+
+    def predict_one(self, inputs: dict) -> float:
+        row = self._buffer()
+        for i, c in enumerate(self.cols):
+            row[0, i] = _to_float(inputs.get(c, 0))
+        return float(self.predict_array(row)[0])
+
+class GuardedSurrogate:
+    """
+    Surrogaat (ml/surrogate.py) met terugval: rijen buiten het gedekte bereik, of met een risicogrens
+    binnen de gemeten foutgrens, gaan naar het volledige model. `hits`/`fallbacks` tellen (bij benadering) mee.
+    """
+
+    def __init__(self, surrogate: Surrogate, fallback):
+        self.surrogate = surrogate
+        self.fallback = fallback
+        self.cols = fallback.cols
+        self.hits = 0
+        self.fallbacks = 0
+
+    def predict_array(self, X: np.ndarray) -> np.ndarray:
+        q = self.surrogate.predict_array(X)
+        back = ~self.surrogate.covers(X) | self.surrogate.near_boundary(q)
+        if back.any():
+            q[back] = self.fallback.predict_array(X[back])
+        self.fallbacks += int(back.sum())
+        self.hits += len(q) - int(back.sum())
+        return q
+
+    def predict_one(self, inputs: dict) -> float:
+        p = self.surrogate.predict_row([_to_float(inputs.get(c, 0)) for c in self.cols])
+        if p is None:
+            self.fallbacks += 1
+            return self.fallback.predict_one(inputs)
+        self.hits += 1
+        return p
+
+def load_surrogate_or_none(cols: list[str], model_version: str, path: str = SURROGATE_PATH):
+    # alleen een surrogaat dat van precies dit model gedistilleerd is
+    if not os.path.exists(path):
+        return None
+    try:
+        sur = Surrogate.load(path)
+    except Exception:
+        return None
+    return sur if sur.cols == list(cols) and sur.model_version == model_version else None
+
+# ---------- Lui laden ----------
+
+class LoadedModel:
+    """Geladen model + kolommen, met de enkele-rij-scorer die bij de backend hoort."""
+
+    def __init__(self, model, cols: list[str], backend: str, fast=None, version=None):
+        self.model = model      # alles met predict_proba(X) → (n, 2)
+        self.cols = cols
+        self.backend = backend
+        self.fast = fast
+        self.version = version
+        self.loaded_at = time.time()
+
+    def score(self, inputs: dict) -> float:
+        if self.fast is not None:
+            return self.fast.predict_one(inputs)
+        return predict_proba(self.model, row_from_inputs(inputs, self.cols))
+
+def load_backend(backend: str = "fast") -> LoadedModel | None:
+    """
+    backend: "compact" → alleen data/model.npz (geen scikit-learn),
+             "fast"    → model.joblib + FastModel, "pipeline" → model.joblib via pandas,
+             "surrogate" → data/surrogate.npz met FastModel als terugval (zonder geldig surrogaat: "fast").
+    """
+    if backend == "compact":
+        compact = load_compact_or_none()
+        return LoadedModel(compact, compact.cols, backend, fast=compact) if compact else None
+    model, cols = load_model_or_none()
+    if model is None:
+        return None
+    fast = None
+    if backend in ("fast", "surrogate"):
+        try:
+            fast = FastModel(model, cols)
+        except (AttributeError, ValueError, IndexError):
+            fast = None  # onbekende pipeline-vorm → via predict_proba
+    if backend == "surrogate" and fast is not None:
+        sur = load_surrogate_or_none(cols, _content_hash(artifact_paths("fast")))
+        if sur is not None:
+            fast = GuardedSurrogate(sur, fast)
+    return LoadedModel(model, cols, backend, fast=fast)
+
+class ModelProvider:
+    """
+    Thread-safe, lui geladen model. Laadt pas bij de eerste get() (of bij warmup()
+    in het master-proces van een pre-fork server, zodat workers het geheugen delen).
+    Ontbreekt het model, dan wordt dat niet onthouden: na retry_interval seconden probeert
+    get() het opnieuw, zodat een model dat na het starten getraind wordt alsnog verschijnt.
+    """
+
+    def __init__(self, backend: str = "fast", loader=load_backend, retry_interval: float = 5.0):
+        self.backend = backend
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._handle = None
+        self.retry_interval = float(retry_interval)
+        self._retry_at = 0.0
+
+    def get(self) -> LoadedModel | None:
+        if self._loaded:
+            return self._handle
+        if time.monotonic() < self._retry_at:
+            return None
+        with self._lock:
+            if not self._loaded and time.monotonic() >= self._retry_at:
+                handle = self._load()
+                if handle is None:
+                    self._retry_at = time.monotonic() + self.retry_interval
+                else:
+                    self._handle, self._loaded = handle, True
+        return self._handle
+
+    def _load(self) -> LoadedModel | None:
+        return self._loader(self.backend)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+# ---------- Hot reload ----------
+
+MODEL_PATH = os.path.join(DATA_DIR, "model.joblib")
+COLS_PATH = os.path.join(DATA_DIR, "columns.json")
+
+def artifact_paths(backend: str) -> list[str]:
+    if backend == "compact":
+        return [COMPACT_PATH, COLS_PATH]
+    return [MODEL_PATH, COLS_PATH, SURROGATE_PATH] if backend == "surrogate" else [MODEL_PATH, COLS_PATH]
+
+def _fingerprint(paths):
+    # goedkoop: mtime + grootte; de inhoudshash volgt pas bij het laden
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+def _content_hash(paths) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        if os.path.exists(p):
+            with open(p, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()[:12]
+
+def _read_columns(path: str = COLS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        cols_obj = json.load(f)
+    return cols_obj.get("columns") or cols_obj.get("feature_names") or []
+
+def validate(handle: LoadedModel, probe: dict | None = None):
+    """Kolommen moeten overeenkomen met columns.json en een proefvoorspelling moet een kans geven."""
+    if os.path.exists(COLS_PATH) and list(handle.cols) != list(_read_columns()):
+        raise ValueError("Modelkolommen wijken af van columns.json")
+    p = handle.score(probe or {})
+    if not (0.0 <= p <= 1.0):
+        raise ValueError(f"Proefvoorspelling buiten [0, 1]: {p}")
+
+class ModelRegistry(ModelProvider):
+    """
+    ModelProvider die de artefacten in de gaten houdt (mtime/grootte, daarna inhoudshash),
+    een nieuw model op de achtergrond laadt en valideert, en het daarna atomair inwisselt.
+    Lopende requests houden hun eigen referentie naar het oude model en worden nooit geblokkeerd.
+    """
+
+    def __init__(self, backend: str = "fast", loader=load_backend, probe: dict | None = None):
+        super().__init__(backend, loader)
+        self.paths = artifact_paths(backend)
+        self.probe = probe
+        self.reloads = 0
+        self.last_error = None
+        self._fp = None
+        self._pending = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _load_versioned(self):
+        fp = _fingerprint(self.paths)
+        handle = self._loader(self.backend)
+        if handle is not None:
+            handle.version = _content_hash(self.paths)
+        return fp, handle
+
+    def _load(self) -> LoadedModel | None:
+        self._fp, handle = self._load_versioned()
+        return handle
+
+    def check_for_update(self) -> bool:
+        """Eén poll-ronde. Geeft True als er een nieuw model is ingewisseld."""
+        fp = _fingerprint(self.paths)
+        if fp == self._fp:
+            self._pending = None
+            return False
+        if fp != self._pending:
+            # pas laden als de bestanden een ronde niet meer veranderd zijn (train.py kan nog schrijven)
+            self._pending = fp
+            return False
+        try:
+            new_fp, handle = self._load_versioned()
+            if handle is None:
+                raise RuntimeError("Model kon niet geladen worden")
+            validate(handle, self.probe)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._fp = fp  # niet elke ronde opnieuw proberen; wacht op de volgende wijziging
+            return False
+        with self._lock:
+            self._handle, self._fp, self._loaded = handle, new_fp, True
+        self._pending = None
+        self.last_error = None
+        self.reloads += 1
+        return True
+
+    def ensure_watcher(self, interval: float):
+        # threads overleven een fork niet: per proces (worker) één watcher starten
+        if interval <= 0:
+            return
+        if self._watcher is not None and self._watcher[0] == os.getpid() and self._watcher[1].is_alive():
+            return
+        with self._lock:
+            if self._watcher is not None and self._watcher[0] == os.getpid() and self._watcher[1].is_alive():
+                return
+            t = threading.Thread(target=self._watch, args=(interval,), name="model-watcher", daemon=True)
+            self._watcher = (os.getpid(), t)
+            t.start()
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.check_for_update()
+            except Exception as e:  # watcher mag nooit sterven
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> dict:
+        h = self._handle
+        return {
+            "backend": self.backend,
+            "loaded": self._loaded and h is not None,
+            "version": h.version if h else None,
+            "loaded_at": h.loaded_at if h else None,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,239 @@
+# ml/out_of_core.py
+# Trainen op datasets die niet in het geheugen passen (python ml/train.py --out-of-core).
+#
+# Pass 1: data streamen in chunks → StandardScaler.partial_fit, reservoir-steekproef voor de
+#         bin-grenzen (zoals HGB die zelf uit 200k rijen bepaalt) en een calibratie-steekproef.
+# Pass 2: opnieuw streamen → schalen + binnen naar uint8-codes in een memmap op schijf.
+# Fit:    HGB leert niet incrementeel; hij fit op een gestratificeerde steekproef van de codes
+#         (1 byte per waarde i.p.v. 8; de missing-bin weer als NaN) en de split-drempels worden daarna teruggezet naar de
+#         bin-grenzen in geschaalde ruimte. Het resultaat is een gewone Pipeline, dus predict,
+#         FastModel en export_compact werken ongewijzigd.
+import os, sys, shutil, tempfile
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble._hist_gradient_boosting.binning import _BinMapper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.columnar import is_columnar, open_columns, read_meta
+from ml.search import _stratified_subsample
+
+CHUNK_ROWS = 200_000
+SAMPLE_ROWS = 200_000     # rijen voor de bin-grenzen
+CALIB_FRAC = 0.05         # aandeel rijen dat alleen voor calibratie gebruikt wordt
+CALIB_ROWS = 200_000
+FIT_ROWS = 1_000_000      # max. rijen waarop HGB daadwerkelijk fit
+MAX_BINS = 255
+
+TRAIN, CALIB, VALID = 0, 1, 2
+
+
+def table_columns(path):
+    if is_columnar(path):
+        return list(read_meta(path)["columns"])
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_table(path, chunk_rows=CHUNK_ROWS, columns=None):
+    """DataFrame-chunks uit een CSV of kolommap; float32 wordt float64 (zelfde splits als bij CSV)."""
+    if is_columnar(path):
+        arrays = open_columns(path, columns)
+        n = len(next(iter(arrays.values())))
+        chunks = (pd.DataFrame({c: a[s:s + chunk_rows] for c, a in arrays.items()})
+                  for s in range(0, n, chunk_rows))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+    for df in chunks:
+        yield df.astype({c: "float64" for c in df.columns if df[c].dtype == np.float32})
+
+
+def chunk_roles(seed, chunk_idx, n, calib_frac, valid_frac=0.0):
+    # deterministisch per chunk: pass 1, pass 2 en de evaluatie zien dezelfde indeling
+    u = np.random.default_rng([seed, chunk_idx]).random(n)
+    return np.where(u < calib_frac, CALIB, np.where(u < calib_frac + valid_frac, VALID, TRAIN))
+
+
+class Reservoir:
+    """Uniforme steekproef van max. k rijen uit een stroom (de k kleinste random sleutels)."""
+
+    def __init__(self, k, seed):
+        self.k = int(k)
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.X = None
+        self.y = None
+
+    def add(self, X, y):
+        keys = self.rng.random(len(X))
+        if self.X is not None:
+            keys = np.concatenate([self.keys, keys])
+            X = np.concatenate([self.X, X])
+            y = np.concatenate([self.y, y])
+        if len(keys) > self.k:
+            keep = np.argpartition(keys, self.k)[:self.k]
+            keys, X, y = keys[keep], X[keep], y[keep]
+        self.keys, self.X, self.y = keys, X, y
+
+
+class BinnedStore:
+    """uint8-codes + labels op schijf, met de scaler en bin-grenzen waarmee ze gemaakt zijn."""
+
+    def __init__(self, work_dir, features, scaler, bin_mapper, n_rows, calib_X, calib_y):
+        self.work_dir = work_dir
+        self.features = features
+        self.scaler = scaler
+        self.bin_mapper = bin_mapper
+        self.n_rows = n_rows
+        self.codes = np.memmap(os.path.join(work_dir, "codes.u8"), dtype=np.uint8, mode="r",
+                               shape=(n_rows, len(features)))
+        self.y = np.memmap(os.path.join(work_dir, "label.i8"), dtype=np.int8, mode="r", shape=(n_rows,))
+        self.calib_X = pd.DataFrame(calib_X, columns=features)
+        self.calib_y = calib_y.astype(int)
+
+    @property
+    def edges(self):
+        """(n_features, MAX_BINS) met bin-grenzen; opgevuld met +inf."""
+        out = np.full((len(self.features), MAX_BINS), np.inf)
+        for f, thr in enumerate(self.bin_mapper.bin_thresholds_):
+            out[f, :len(thr)] = thr
+        return out
+
+    def subsample(self, n, seed):
+        idx = _stratified_subsample(np.asarray(self.y), n, seed)
+        return fit_codes(np.asarray(self.codes[idx]), self.bin_mapper.missing_values_bin_idx_), \
+            np.asarray(self.y[idx]).astype(int)
+
+    def close(self):
+        self.codes = self.y = None
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def build_binned_store(path, features, label="label", chunk_rows=CHUNK_ROWS, sample_rows=SAMPLE_ROWS,
+                       calib_frac=CALIB_FRAC, calib_rows=CALIB_ROWS, valid_frac=0.0, seed=17,
+                       work_dir=None, verbose=True):
+    cols = features + [label]
+    scaler = StandardScaler()
+    edge_sample = Reservoir(sample_rows, seed)
+    calib_sample = Reservoir(calib_rows, seed + 1)
+
+    # pass 1: schaalstatistieken + steekproeven
+    for i, df in enumerate(iter_table(path, chunk_rows, cols)):
+        X, y = df[features].to_numpy(np.float64), df[label].to_numpy()
+        role = chunk_roles(seed, i, len(df), calib_frac, valid_frac)
+        tr = role == TRAIN
+        scaler.partial_fit(X[tr])
+        edge_sample.add(X[tr], y[tr])
+        calib_sample.add(X[role == CALIB], y[role == CALIB])
+    if edge_sample.X is None or not len(calib_sample.y):
+        raise ValueError(f"Te weinig rijen in {path} voor out-of-core training")
+    bin_mapper = _BinMapper(n_bins=MAX_BINS + 1, subsample=None, random_state=seed)
+    bin_mapper.fit(scaler.transform(edge_sample.X))
+    if verbose:
+        print(f"[ooc] pass 1: {int(np.max(scaler.n_samples_seen_)):,} trainrijen, "
+              f"{len(calib_sample.y):,} calibratierijen")
+
+    # pass 2: schalen + binnen naar schijf
+    work_dir = work_dir or tempfile.mkdtemp(prefix="ooc_")
+    os.makedirs(work_dir, exist_ok=True)
+    n_rows = 0
+    with open(os.path.join(work_dir, "codes.u8"), "wb") as fc, open(os.path.join(work_dir, "label.i8"), "wb") as fy:
+        for i, df in enumerate(iter_table(path, chunk_rows, cols)):
+            tr = chunk_roles(seed, i, len(df), calib_frac, valid_frac) == TRAIN
+            X = df[features].to_numpy(np.float64)[tr]
+            codes = bin_mapper.transform(scaler.transform(X))
+            fc.write(np.ascontiguousarray(codes, dtype=np.uint8).tobytes())
+            fy.write(df[label].to_numpy()[tr].astype(np.int8).tobytes())
+            n_rows += int(tr.sum())
+    if verbose:
+        print(f"[ooc] pass 2: {n_rows:,} rijen gebind → {work_dir} ({n_rows * len(features) / 1e6:,.0f} MB)")
+    return BinnedStore(work_dir, features, scaler, bin_mapper, n_rows, calib_sample.X, calib_sample.y)
+
+
+def fit_codes(codes, missing_bin=MAX_BINS):
+    """
+    uint8-codes → float32 voor de HGB-fit. De missing-bin (255, net buiten edges) wordt weer NaN:
+    HGB leert dan zelf per split waar NaN heen gaat (missing_go_to_left), net als op de ruwe floats.
+    """
+    X = codes.astype(np.float32)
+    X[codes == missing_bin] = np.nan
+    return X
+
+
+def remap_thresholds(clf, edges):
+    """
+    Zet drempels van een HGB die op bin-codes gefit is om naar geschaalde waarden:
+    code <= t  ⇔  code <= floor(t)  ⇔  x <= edges[f, floor(t)].
+    Een split "alle waarden links, NaN rechts" heeft drempel +inf; die blijft staan.
+    """
+    for preds in clf._predictors:
+        for p in preds:
+            nodes = p.nodes
+            split = ~nodes["is_leaf"].astype(bool)
+            f = nodes["feature_idx"][split].astype(np.intp)
+            t = nodes["num_threshold"][split]
+            finite = np.isfinite(t)
+            k = np.floor(np.where(finite, t, 0)).astype(np.intp)
+            nodes["num_threshold"][split] = np.where(finite, edges[f, k], t)
+    return clf
+
+
+def apply_scaler(pre, scaler):
+    """Zet de gestreamde statistieken in de (op een steekproef gefitte) ColumnTransformer."""
+    fitted = pre.named_transformers_["num"]
+    for attr in ("mean_", "var_", "scale_", "n_samples_seen_"):
+        setattr(fitted, attr, getattr(scaler, attr))
+    return pre
+
+
+class StreamingMetrics:
+    """AUC/AP via histogrammen van p per klasse (exact op binbreedte na); F1, logloss en Brier exact."""
+
+    def __init__(self, bins=10_000):
+        self.bins = bins
+        self.pos = np.zeros(bins)
+        self.neg = np.zeros(bins)
+        self.tp = self.fp = self.fn = 0
+        self.logloss = self.brier = 0.0
+        self.n = 0
+
+    def update(self, y, p):
+        y = np.asarray(y).astype(bool)
+        p = np.asarray(p, dtype=np.float64)
+        b = np.minimum((p * self.bins).astype(int), self.bins - 1)
+        self.pos += np.bincount(b[y], minlength=self.bins)
+        self.neg += np.bincount(b[~y], minlength=self.bins)
+        hit = p > 0.5
+        self.tp += int((hit & y).sum())
+        self.fp += int((hit & ~y).sum())
+        self.fn += int((~hit & y).sum())
+        q = np.clip(p, 1e-15, 1 - 1e-15)
+        self.logloss -= float(np.sum(np.where(y, np.log(q), np.log(1 - q))))
+        self.brier += float(np.sum((p - y) ** 2))
+        self.n += len(y)
+
+    def result(self):
+        P, N = self.pos.sum(), self.neg.sum()
+        neg_below = np.cumsum(self.neg) - self.neg
+        auc = float(np.sum(self.pos * (neg_below + 0.5 * self.neg)) / (P * N)) if P and N else float("nan")
+        tp_cum = np.cumsum(self.pos[::-1])
+        fp_cum = np.cumsum(self.neg[::-1])
+        prec = np.divide(tp_cum, tp_cum + fp_cum, out=np.zeros_like(tp_cum), where=(tp_cum + fp_cum) > 0)
+        ap = float(np.sum(self.pos[::-1] / P * prec)) if P else float("nan")
+        f1 = 2 * self.tp / (2 * self.tp + self.fp + self.fn) if self.tp else 0.0
+        return {"n": self.n, "auc": auc, "ap": ap, "f1": f1,
+                "logloss": self.logloss / max(self.n, 1), "brier": self.brier / max(self.n, 1)}
+
+
+def evaluate_streaming(model, path, features, label="label", chunk_rows=CHUNK_ROWS, roles=None):
+    """
+    Metrics over een CSV/kolommap zonder alles in te lezen. roles=(seed, calib_frac, valid_frac)
+    beperkt de evaluatie tot de VALID-rijen die build_binned_store buiten training hield.
+    """
+    m = StreamingMetrics()
+    for i, df in enumerate(iter_table(path, chunk_rows, features + [label])):
+        if roles is not None:
+            df = df[chunk_roles(roles[0], i, len(df), roles[1], roles[2]) == VALID]
+            if not len(df):
+                continue
+        m.update(df[label].to_numpy(), model.predict_proba(df[features])[:, 1])
+    return m.result()
@@ -0,0 +1,138 @@
+# ml/search.py
+# Hervatbare successive halving / Hyperband over dezelfde param_space als train.py.
+# Elke (bracket, ronde, kandidaat)-score wordt direct naar een checkpoint (JSON) geschreven;
+# een onderbroken run slaat bij herstart alles over wat al gescoord is.
+import os, json, math, hashlib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, cross_val_score
+
+
+def _stratified_subsample(y, n, seed):
+    """Deterministische gestratificeerde steekproef van n indices (alle rijen als n >= len(y))."""
+    if n >= len(y):
+        return np.arange(len(y))
+    rng = np.random.default_rng(seed)
+    idx = []
+    for cls in np.unique(y):
+        cls_idx = np.flatnonzero(y == cls)
+        k = max(1, int(round(n * len(cls_idx) / len(y))))
+        idx.append(rng.choice(cls_idx, size=min(k, len(cls_idx)), replace=False))
+    return np.sort(np.concatenate(idx))
+
+
+def _score_candidate(c, estimator, params, X, y, cv_folds, seed):
+    est = clone(estimator).set_params(**params)
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed)
+    return c, float(np.mean(cross_val_score(est, X, y, cv=cv, scoring="roc_auc", n_jobs=1)))
+
+
+def hyperband_brackets(n_candidates, factor, min_resources, max_resources, strategy):
+    """
+    Lijst van brackets (n_start, r_start, n_rungs). Successive halving = één bracket
+    (halveren tot ~1 kandidaat, laatste ronde op alle rijen); Hyperband spreidt het
+    budget over brackets van agressief (veel kandidaten, weinig rijen) tot behoudend.
+    """
+    s_max = max(0, int(math.floor(math.log(max_resources / min_resources, factor) + 1e-9)))
+    if strategy == "halving":
+        n_rungs = min(s_max + 1, 1 + int(math.floor(math.log(max(n_candidates, 1), factor) + 1e-9)))
+        return [(n_candidates, max_resources / factor ** (n_rungs - 1), n_rungs)]
+    out = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil(n_candidates * (s_max + 1) / (s + 1) * float(factor) ** (s - s_max)))
+        out.append((max(1, n), max_resources / factor ** s, s + 1))
+    return out
+
+
+def data_signature(X, y, sample_rows=256):
+    """
+    Goedkope identiteit van de trainingsdata voor het checkpoint: vorm, featurenamen, een hash van y en
+    van een vaste steekproef rijen uit X. Een hergegenereerde dataset met evenveel rijen, een andere
+    --columns of bin-codes i.p.v. floats (out-of-core) hervat dan niet op oude scores.
+    """
+    y = np.asarray(y)
+    idx = np.unique(np.linspace(0, len(y) - 1, min(sample_rows, len(y))).astype(np.intp)) if len(y) else []
+    rows = X.iloc[idx].to_numpy(np.float64) if hasattr(X, "iloc") else np.asarray(X[idx], dtype=np.float64)
+    return {"rows": int(len(y)), "features": int(X.shape[1]),
+            "columns": [str(c) for c in X.columns] if hasattr(X, "columns") else None,
+            "y": hashlib.sha256(np.ascontiguousarray(y, dtype=np.int64).tobytes()).hexdigest()[:16],
+            "X_sample": hashlib.sha256(np.ascontiguousarray(rows).tobytes()).hexdigest()[:16]}
+
+
+class CheckpointMismatch(ValueError):
+    """Het checkpointbestand hoort bij een zoektocht met andere instellingen."""
+
+
+class Checkpoint:
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("signature") != signature:
+                raise CheckpointMismatch(f"Checkpoint {path} hoort bij andere instellingen")
+            self.results = state.get("results", {})
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "results": self.results}, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def run_search(estimator, param_space, X, y, strategy="halving", n_candidates=60, factor=3,
+               min_resources=1000, cv_folds=5, n_jobs=-1, seed=17, checkpoint_path=None, verbose=1):
+    """
+    Geeft (best_params, best_score, history). Resource = aantal trainingsrijen per ronde;
+    na elke ronde gaat de beste 1/factor van de kandidaten door.
+    """
+    y = np.asarray(y)
+    max_resources = len(y)
+    min_resources = min(int(min_resources), max_resources)
+    signature = {"strategy": strategy, "n_candidates": n_candidates, "factor": factor,
+                 "min_resources": min_resources, "max_resources": max_resources,
+                 "cv_folds": cv_folds, "seed": seed, "param_space": {k: list(v) for k, v in param_space.items()},
+                 "data": data_signature(X, y)}
+    ckpt = Checkpoint(checkpoint_path, signature)
+    if verbose and ckpt.results:
+        print(f"[search] hervat: {len(ckpt.results)} evaluaties uit {checkpoint_path}")
+
+    history = []
+    for b, (n_start, r_start, n_rungs) in enumerate(
+            hyperband_brackets(n_candidates, factor, min_resources, max_resources, strategy)):
+        candidates = list(ParameterSampler(param_space, n_iter=n_start, random_state=seed + b))
+        alive = list(range(len(candidates)))
+        for rung in range(n_rungs):
+            n_res = int(min(max_resources, round(r_start * factor ** rung)))
+            idx = _stratified_subsample(y, n_res, seed + 1000 * b + rung)
+            Xr = X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+            yr = y[idx]
+            keys = {c: f"b{b}:r{rung}:c{c}" for c in alive}
+            todo = [c for c in alive if keys[c] not in ckpt.results]
+            if verbose:
+                print(f"[search] bracket {b} ronde {rung}: {len(alive)} kandidaten × {n_res} rijen "
+                      f"({len(alive) - len(todo)} uit checkpoint)")
+            if todo:
+                jobs = (delayed(_score_candidate)(c, estimator, candidates[c], Xr, yr, cv_folds, seed)
+                        for c in todo)
+                # elke afgeronde kandidaat meteen wegschrijven: onderbreken kost hooguit lopende fits
+                for c, score in Parallel(n_jobs=n_jobs, return_as="generator_unordered")(jobs):
+                    ckpt.results[keys[c]] = score
+                    ckpt.save()
+            scores = {c: ckpt.results[keys[c]] for c in alive}
+            for c in alive:
+                history.append({"bracket": b, "rung": rung, "resources": n_res,
+                                "params": candidates[c], "score": scores[c]})
+            if rung < n_rungs - 1:
+                keep = max(1, len(alive) // factor)
+                alive = sorted(alive, key=lambda c: scores[c], reverse=True)[:keep]
+
+    # beste kandidaat = hoogste score op de grootste resource die bereikt is
+    top_res = max(h["resources"] for h in history)
+    best = max((h for h in history if h["resources"] == top_res), key=lambda h: h["score"])
+    return best["params"], best["score"], history
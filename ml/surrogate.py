@@ -0,0 +1,289 @@
+# ml/surrogate.py
+# Gedistilleerd surrogaatmodel (data/surrogate.npz) voor scoren in microseconden: INFERENCE_MODE = "surrogate".
+#
+# GAM in logit-ruimte: logit p ≈ b + Σ_f s_f(x_f), met per feature een stuksgewijs lineaire functie op
+# kwantielknopen, plus dezelfde verhoudingen waarop het risico in de data gebouwd is (lastendruk,
+# krediet t.o.v. jaarinkomen). Gefit met gewogen kleinste kwadraten op de kansen van het gekalibreerde
+# model (niet op de labels), gewicht p(1-p) zodat de fout in kanspunten telt.
+#
+# Bewaking (GuardedSurrogate in ml/model_runtime.py): buiten het gedekte bereik (1e–99e percentiel van de
+# fitdata per feature of verhouding; in de dunne staarten mist de fit het vaakst) scoort het volledige model,
+# en ook als een risicogrens binnen de lokale foutgrens ligt: de grootste gemeten |q - p| in de kansbin van q
+# (en de buurbins), plus `margin`. Die grenzen komen uit de fitrijen + de helft van de validatierijen; het
+# rapport (in het artefact; python ml/surrogate.py print het) gaat over de andere helft. Geeft het bewaakte
+# surrogaat daar ergens een ander risiconiveau dan het volledige model, dan wordt het niet geschreven.
+import os, sys, json, math, argparse
+from bisect import bisect_right
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "..", "data")
+SURROGATE_PATH = os.path.join(DATA_DIR, "surrogate.npz")
+FORMAT_VERSION = 2
+KNOTS = 12                     # kwantielknopen per feature
+FIT_ROWS = 20_000
+RISK_BOUNDARIES = (0.33, 0.66) # zelfde grenzen als _alloc_from_risk in app.py
+MARGIN = 0.02                  # extra marge bovenop de gemeten foutgrens
+BOUND_BINS = 20                # kansbins voor de lokale foutgrens
+MIN_BIN_ROWS = 20              # minder rijen in een bin → daar altijd het volledige model
+COVER_QUANTILE = 0.01          # gedekt bereik: COVER_QUANTILE .. 1 - COVER_QUANTILE van de fitdata
+
+
+def _ratios(cols):
+    # (naam, teller-kolommen, noemer-kolom, factor): alleen als de kolommen er zijn
+    spec = [("lastendruk", ("vaste_lasten", "pensioen_inleg"), "inkomen", 1.0),
+            ("krediet_ratio", ("krediet_bedrag",), "inkomen", 12.0)]
+    return [(name, [cols.index(c) for c in num], cols.index(den), k)
+            for name, num, den, k in spec if all(c in cols for c in num + (den,))]
+
+
+def _features(X: np.ndarray, ratios) -> np.ndarray:
+    extra = [X[:, num].sum(axis=1) / np.maximum(k * X[:, den], 1.0) for _, num, den, k in ratios]
+    return np.column_stack([X] + extra) if extra else X
+
+
+def _basis(F: np.ndarray, knots) -> np.ndarray:
+    # hoedfuncties: elke rij heeft per feature twee gewichten (lineaire interpolatie tussen knopen)
+    n, blocks = len(F), []
+    rows = np.arange(n)
+    for j, k in enumerate(knots):
+        B = np.zeros((n, len(k)))
+        if len(k) == 1:
+            B[:, 0] = 1.0
+        else:
+            x = np.clip(F[:, j], k[0], k[-1])
+            i = np.clip(np.searchsorted(k, x, side="right") - 1, 0, len(k) - 2)
+            t = (x - k[i]) / (k[i + 1] - k[i])
+            B[rows, i], B[rows, i + 1] = 1 - t, t
+        blocks.append(B)
+    return np.hstack(blocks + [np.ones((n, 1))])
+
+
+def _level(p, boundaries):
+    return np.searchsorted(np.asarray(boundaries), p, side="right")
+
+
+def _bin(q, bins):
+    return np.minimum((np.asarray(q) * bins).astype(int), bins - 1)
+
+
+def _error_bounds(sur, X: np.ndarray, p: np.ndarray, margin: float, bins: int = BOUND_BINS,
+                  min_rows: int = MIN_BIN_ROWS) -> np.ndarray:
+    """Per kansbin de grootste |q - p| op gedekte rijen, ook van de buurbins, plus margin; te weinig rijen → 1."""
+    q = sur.predict_array(X)
+    keep = sur.covers(X)
+    b, err = _bin(q[keep], bins), np.abs(q - p)[keep]
+    bound = np.ones(bins)
+    for i in range(bins):
+        if (b == i).sum() >= min_rows:
+            bound[i] = err[b == i].max()
+    # een q vlak bij de rand van een bin kan de fout van de buurbin hebben
+    bound = np.maximum(bound, np.maximum(np.r_[bound[1:], bound[-1]], np.r_[bound[0], bound[:-1]]))
+    return np.minimum(bound + margin, 1.0)
+
+
+def fit_surrogate(predict, cols: list[str], X_fit: np.ndarray, X_valid: np.ndarray, knots: int = KNOTS,
+                  margin: float = MARGIN, boundaries=RISK_BOUNDARIES, ridge: float = 1e-3, model_version: str = ""):
+    """
+    Arrays voor surrogate.npz. predict: (n, features) → kansen van het volledige model.
+    X_valid: de eerste helft bepaalt (met X_fit) de foutgrenzen, de tweede helft het rapport.
+    """
+    ratios = _ratios(list(cols))
+    F = _features(X_fit, ratios)
+    grids = [np.unique(np.quantile(F[:, j], np.linspace(0, 1, knots))) for j in range(F.shape[1])]
+    B = _basis(F, grids)
+    p = predict(X_fit)
+    pc = np.clip(p, 1e-3, 1 - 1e-3)
+    z = np.log(pc / (1 - pc))
+    w = np.ones(len(z))
+    for _ in range(4):
+        # IRLS-achtig: gewicht q(1-q) ≈ afgeleide van de sigmoid → kleinste kwadraten in kanspunten
+        A = B * w[:, None]
+        coef = np.linalg.solve(A.T @ B + ridge * np.eye(B.shape[1]), A.T @ z)
+        q = 1 / (1 + np.exp(-(B @ coef)))
+        w = np.maximum(q * (1 - q), 0.01)
+
+    values, pos = [], 0
+    for g in grids:
+        values.append(coef[pos:pos + len(g)])
+        pos += len(g)
+    names = list(cols) + [r[0] for r in ratios]
+    width = max(len(g) for g in grids)
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION), "columns": np.array(list(cols)), "features": np.array(names),
+        "ratio_num": np.array([num + [-1] * (2 - len(num)) for _, num, _, _ in ratios], dtype=np.int64).reshape(-1, 2),
+        "ratio_den": np.array([den for _, _, den, _ in ratios], dtype=np.int64),
+        "ratio_factor": np.array([k for _, _, _, k in ratios], dtype=np.float64),
+        # knopen/waarden opgevuld tot gelijke lengte met het laatste punt (interp blijft correct)
+        "knots": np.array([np.pad(g, (0, width - len(g)), mode="edge") for g in grids]),
+        "values": np.array([np.pad(v, (0, width - len(v)), mode="edge") for v in values]),
+        "intercept": np.array(float(coef[-1])), "margin": np.array(float(margin)),
+        "boundaries": np.array(boundaries, dtype=np.float64), "model_version": np.array(model_version),
+        "lo": np.quantile(F, COVER_QUANTILE, axis=0), "hi": np.quantile(F, 1 - COVER_QUANTILE, axis=0),
+        "error_bound": np.ones(BOUND_BINS),
+    }
+    half = len(X_valid) // 2
+    X_bound = np.vstack([X_fit, X_valid[:half]])
+    arrays["error_bound"] = _error_bounds(Surrogate(arrays), X_bound, np.concatenate([p, predict(X_valid[:half])]),
+                                          margin)
+    report = validate_surrogate(Surrogate(arrays), predict, X_valid[half:])
+    arrays["report"] = np.array(json.dumps(report))
+    return arrays
+
+
+def validate_surrogate(sur, predict, X: np.ndarray) -> dict:
+    """Afwijking t.o.v. het volledige model op niet-gefitte rijen, zonder en met bewaking."""
+    p = predict(X)
+    q = sur.predict_array(X)
+    covered = sur.covers(X)
+    dev = np.abs(q - p)[covered]
+    fallback = ~covered | sur.near_boundary(q)
+    served = np.where(fallback, p, q)
+    return {
+        "rows": int(len(X)), "covered": float(covered.mean()) if len(X) else 0.0,
+        "max_abs_dev": float(dev.max()) if len(dev) else 0.0,
+        "p99_abs_dev": float(np.quantile(dev, 0.99)) if len(dev) else 0.0,
+        "mean_abs_dev": float(dev.mean()) if len(dev) else 0.0,
+        "fallback_rate": float(fallback.mean()) if len(X) else 0.0,
+        "served_max_abs_dev": float(np.abs(served - p).max()) if len(X) else 0.0,
+        "level_agreement": float((_level(served, sur.boundaries) == _level(p, sur.boundaries)).mean()) if len(X) else 1.0,
+        "margin": sur.margin, "max_error_bound": float(sur.error_bound.max()),
+    }
+
+
+class Surrogate:
+    def __init__(self, arrays):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Onbekende surrogaat-versie {int(arrays['format_version'])}")
+        self.cols = [str(c) for c in arrays["columns"]]
+        self.knots = np.asarray(arrays["knots"], dtype=np.float64)
+        self.values = np.asarray(arrays["values"], dtype=np.float64)
+        self.intercept = float(arrays["intercept"])
+        self.margin = float(arrays["margin"])
+        self.boundaries = [float(b) for b in arrays["boundaries"]]
+        self.model_version = str(arrays["model_version"])
+        self.error_bound = np.asarray(arrays["error_bound"], dtype=np.float64)
+        self.report = json.loads(str(arrays["report"])) if "report" in arrays else {}
+        self.ratios = [([int(i) for i in num if i >= 0], int(den), float(k))
+                       for num, den, k in zip(arrays["ratio_num"], arrays["ratio_den"], arrays["ratio_factor"])]
+        self.lo = np.asarray(arrays["lo"], dtype=np.float64)
+        self.hi = np.asarray(arrays["hi"], dtype=np.float64)
+        # enkele rij: bisect op lijsten i.p.v. numpy per feature
+        self._k = self.knots.tolist()
+        self._v = self.values.tolist()
+        self._bounds = list(zip(self.lo.tolist(), self.hi.tolist()))
+        self._err = self.error_bound.tolist()
+
+    @classmethod
+    def load(cls, path: str = SURROGATE_PATH):
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def _features(self, X):
+        return _features(X, [(None, num, den, k) for num, den, k in self.ratios])
+
+    def covers(self, X: np.ndarray) -> np.ndarray:
+        F = self._features(np.atleast_2d(X))
+        return ((F >= self.lo) & (F <= self.hi)).all(axis=1)
+
+    def near_boundary(self, q) -> np.ndarray:
+        """True waar een risicogrens binnen de foutgrens van q ligt: het niveau staat dan niet vast."""
+        q = np.asarray(q)
+        bound = self.error_bound[_bin(q, len(self.error_bound))]
+        near = np.zeros(q.shape, dtype=bool)
+        for b in self.boundaries:
+            near |= np.abs(q - b) <= bound
+        return near
+
+    def predict_array(self, X: np.ndarray) -> np.ndarray:
+        F = self._features(np.atleast_2d(np.asarray(X, dtype=np.float64)))
+        s = np.full(len(F), self.intercept)
+        for j in range(F.shape[1]):
+            s += np.interp(F[:, j], self.knots[j], self.values[j])
+        return 1 / (1 + np.exp(-s))
+
+    def predict_row(self, row: list):
+        """Kans voor één rij (lijst in self.cols-volgorde); None buiten het gedekte bereik of binnen de foutgrens van een risicogrens."""
+        feats = row + [sum(row[i] for i in num) / max(k * row[den], 1.0) for num, den, k in self.ratios]
+        s = self.intercept
+        for j, x in enumerate(feats):
+            lo, hi = self._bounds[j]
+            if x < lo or x > hi:
+                return None
+            g, v = self._k[j], self._v[j]
+            i = bisect_right(g, x)
+            if i >= len(g):
+                s += v[-1]
+            else:
+                s += v[i - 1] + (v[i] - v[i - 1]) * (x - g[i - 1]) / (g[i] - g[i - 1])
+        p = 1 / (1 + math.exp(-s)) if s > -700 else 0.0
+        bound = self._err[min(int(p * len(self._err)), len(self._err) - 1)]
+        for b in self.boundaries:
+            if abs(p - b) <= bound:
+                return None
+        return p
+
+
+def export_surrogate(model, cols: list[str], data, path: str = SURROGATE_PATH, model_version: str = "",
+                     rows: int = FIT_ROWS, seed: int = 17, max_dev: float | None = None, **kw) -> dict:
+    """
+    Fit op een steekproef van `data`, valideer op de rest. Schrijft alleen als het bewaakte surrogaat op de
+    rapportrijen overal hetzelfde risiconiveau geeft als het volledige model en (met max_dev) de geserveerde
+    afwijking binnen max_dev blijft; anders ValueError.
+    """
+    import pandas as pd
+    from ml.explain import _predict
+    X = np.asarray(data[cols] if isinstance(data, pd.DataFrame) else data, dtype=np.float64)
+    X = X[np.random.default_rng(seed).permutation(len(X))]
+    n_fit = min(rows, int(len(X) * 0.8))
+    predict = lambda A: _predict(model, cols, A)
+    arrays = fit_surrogate(predict, cols, X[:n_fit], X[n_fit:n_fit + rows], model_version=model_version, **kw)
+    report = json.loads(str(arrays["report"]))
+    if report["level_agreement"] < 1.0:
+        raise ValueError(f"Surrogaat geeft op {1 - report['level_agreement']:.2%} van de validatierijen een ander "
+                         f"risiconiveau dan het volledige model; niet geschreven")
+    if max_dev is not None and report["served_max_abs_dev"] > max_dev:
+        raise ValueError(f"Surrogaat wijkt na bewaking tot {report['served_max_abs_dev']:.3f} af (> {max_dev}); niet geschreven")
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return report
+
+
+def format_report(report: dict) -> str:
+    return (f"max |Δp|={report['max_abs_dev']:.3f} | p99={report['p99_abs_dev']:.3f} | gem={report['mean_abs_dev']:.3f} | "
+            f"geserveerd max |Δp|={report['served_max_abs_dev']:.3f} | "
+            f"gedekt={report['covered']:.1%} | terugval={report['fallback_rate']:.1%} | "
+            f"zelfde risiconiveau={report['level_agreement']:.2%} | n={report['rows']:,}")
+
+
+def main():
+    # surrogate.npz maken voor een bestaand model.joblib zonder opnieuw te trainen
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(DATA_DIR, "synth_train.csv"),
+                    help="Fit- en validatiedata (CSV of kolommap), bv. de trainingsset")
+    ap.add_argument("--rows", type=int, default=FIT_ROWS)
+    ap.add_argument("--knots", type=int, default=KNOTS)
+    ap.add_argument("--margin", type=float, default=MARGIN, help="Extra marge bovenop de gemeten foutgrens per kansbin")
+    ap.add_argument("--max-dev", type=float, default=None,
+                    help="Niet schrijven als de geserveerde max |Δp| (na bewaking) op validatie hoger is")
+    ap.add_argument("--out", default=SURROGATE_PATH)
+    args = ap.parse_args()
+    sys.path.insert(0, os.path.dirname(ROOT))
+    from ml.model_runtime import load_model_or_none, artifact_paths, _content_hash
+    from ml.columnar import read_table
+    model, cols = load_model_or_none()
+    if model is None:
+        sys.exit("Model ontbreekt. Train eerst met: python ml/gen_data.py && python ml/train.py")
+    try:
+        report = export_surrogate(model, cols, read_table(args.data, cols), args.out,
+                                  model_version=_content_hash(artifact_paths("fast")), rows=args.rows,
+                                  max_dev=args.max_dev, knots=args.knots, margin=args.margin)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"[Validatie] {format_report(report)}")
+    print(f"[OK] Surrogaat -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 # ml/train.py
-import os, json, warnings, math
+import os, sys, json, warnings, math, argparse
 import numpy as np
-import pandas as pd
 from joblib import dump
 from sklearn.model_selection import RandomizedSearchCV, RepeatedStratifiedKFold
 from sklearn.ensemble import HistGradientBoostingClassifier
@@ -12,11 +11,20 @@ from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import roc_auc_score, average_precision_score, f1_score
 from sklearn.utils import check_random_state
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.compact_model import export_compact
+from ml.explain import export_explainer, EXPLAIN_PATH
+from ml.surrogate import export_surrogate, format_report, SURROGATE_PATH
+from ml.model_runtime import artifact_paths, _content_hash
+from ml.columnar import SUFFIX, read_table
+from ml.search import run_search as run_halving_search, CheckpointMismatch
+from ml import out_of_core as ooc
+
 warnings.filterwarnings("ignore", category=UserWarning)
 
 # ===========================
 # ✦ ROBUSTNESS CONTROLS ✦
-# Pas gerust aan je machine aan
+# Defaults; overschrijfbaar via de CLI (python ml/train.py --help)
 # ===========================
 CV_FOLDS   = 10        # meer folds → robuuster (8–10 is prima)
 CV_REPEATS = 2         # herhaal CV voor stabiliteit (1–3)
@@ -25,56 +33,26 @@ N_JOBS     = -1        # -1 = alle cores; zet op 1 als je macOS-multiprocessing-
 RANDOM_SEED = 17       # vast zaad voor reproduceerbaarheid
 VERBOSE_SEARCH = 1
 
+# successive halving / Hyperband
+HALVING_FACTOR = 3          # per ronde gaat 1/factor van de kandidaten door
+HALVING_MIN_RESOURCES = 1000  # rijen in de eerste ronde
+HALVING_CV_FOLDS = 5
+
 # Optioneel: zet op True om joblib 'threading' te forceren (soms stiller op macOS)
 USE_THREADING_BACKEND = False
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(ROOT, "..", "data")
 MODEL_OUT = os.path.join(DATA_DIR, "model.joblib")
+COMPACT_OUT = os.path.join(DATA_DIR, "model.npz")
 COLS_OUT  = os.path.join(DATA_DIR, "columns.json")
+CHECKPOINT_OUT = os.path.join(DATA_DIR, "search_checkpoint.json")
+CHECKPOINT_OOC_OUT = os.path.join(DATA_DIR, "search_checkpoint_ooc.json")   # --out-of-core zoekt op bin-codes
 
 train_csv = os.path.join(DATA_DIR, "synth_train.csv")
 valid_csv = os.path.join(DATA_DIR, "synth_valid.csv")
-assert os.path.exists(train_csv), "Run eerst: python ml/gen_data.py"
-
-train = pd.read_csv(train_csv)
-if os.path.exists(valid_csv):
-    valid = pd.read_csv(valid_csv)
-else:
-    # fallback: simpele split (mocht valid er niet zijn)
-    valid = train.sample(frac=0.15, random_state=RANDOM_SEED)
-    train = train.drop(valid.index)
-
-y_train = train["label"].astype(int).values
-y_valid = valid["label"].astype(int).values
-
-features = [c for c in train.columns if c != "label"]
-X_train = train[features].copy()
-X_valid = valid[features].copy()
-
-# ====== Preprocessing: alle features numeriek, licht schalen ======
-pre = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(with_mean=True, with_std=True), features)
-    ],
-    remainder="drop"
-)
-
-# ====== Basismodel ======
-base = HistGradientBoostingClassifier(
-    max_depth=None,
-    learning_rate=0.05,
-    max_bins=255,
-    l2_regularization=0.0,
-    early_stopping=True,
-    validation_fraction=0.1,   # gebruikt tijdens fit voor internal early_stopping
-    random_state=RANDOM_SEED
-)
-
-pipe = Pipeline([
-    ("pre", pre),
-    ("clf", base)
-])
+train_cols = os.path.join(DATA_DIR, "synth_train" + SUFFIX)   # python ml/gen_data.py --format npy
+valid_cols = os.path.join(DATA_DIR, "synth_valid" + SUFFIX)
 
 # ====== Hyperparam-ruimte (bewust breed) ======
 # Let op: max_leaf_nodes mag geen None zijn bij HGB
@@ -86,59 +64,275 @@ param_space = {
     "clf__max_bins": [63, 127, 255]
 }
 
-# ====== RepeatedStratifiedKFold voor stabielere schattingen ======
-cv = RepeatedStratifiedKFold(
-    n_splits=CV_FOLDS,
-    n_repeats=CV_REPEATS,
-    random_state=RANDOM_SEED
-)
-
-search = RandomizedSearchCV(
-    estimator=pipe,
-    param_distributions=param_space,
-    n_iter=N_ITER,
-    cv=cv,
-    scoring="roc_auc",
-    n_jobs=N_JOBS,
-    verbose=VERBOSE_SEARCH,
-    random_state=RANDOM_SEED,
-    refit=True,
-)
-
-def run_search():
-    if USE_THREADING_BACKEND:
+
+def _default_path(csv_path, cols_path):
+    # kolommap heeft voorrang: geen CSV-parsing en kleinere dtypes
+    return cols_path if os.path.isdir(cols_path) else csv_path
+
+
+def _read(path, columns=None):
+    # float32-kolommen uit de kolommap blijven float32: geen kopie van de hele tabel, HGB bint ze direct
+    return read_table(path, columns)
+
+
+def load_data(seed=RANDOM_SEED, train_path=None, valid_path=None, columns=None):
+    train_path = train_path or _default_path(train_csv, train_cols)
+    valid_path = valid_path or _default_path(valid_csv, valid_cols)
+    assert os.path.exists(train_path), "Run eerst: python ml/gen_data.py"
+    train = _read(train_path, columns)
+    if os.path.exists(valid_path):
+        valid = _read(valid_path, columns)
+    else:
+        # fallback: simpele split (mocht valid er niet zijn)
+        valid = train.sample(frac=0.15, random_state=seed)
+        train = train.drop(valid.index)
+    return train, valid
+
+
+def build_pipeline(features, seed=RANDOM_SEED):
+    # ====== Preprocessing: alle features numeriek, licht schalen ======
+    pre = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(with_mean=True, with_std=True), features)
+        ],
+        remainder="drop"
+    )
+
+    # ====== Basismodel ======
+    base = HistGradientBoostingClassifier(
+        max_depth=None,
+        learning_rate=0.05,
+        max_bins=255,
+        l2_regularization=0.0,
+        early_stopping=True,
+        validation_fraction=0.1,   # gebruikt tijdens fit voor internal early_stopping
+        random_state=seed
+    )
+
+    return Pipeline([
+        ("pre", pre),
+        ("clf", base)
+    ])
+
+
+def random_search(pipe, X_train, y_train, args):
+    # ====== RepeatedStratifiedKFold voor stabielere schattingen ======
+    cv = RepeatedStratifiedKFold(
+        n_splits=args.cv_folds,
+        n_repeats=args.cv_repeats,
+        random_state=args.seed
+    )
+    search = RandomizedSearchCV(
+        estimator=pipe,
+        param_distributions=param_space,
+        n_iter=args.n_iter,
+        cv=cv,
+        scoring="roc_auc",
+        n_jobs=args.n_jobs,
+        verbose=VERBOSE_SEARCH,
+        random_state=args.seed,
+        refit=False,  # calibratie hieronder fit het beste model toch opnieuw
+    )
+    search.fit(X_train, y_train)
+    print(f"[CV best score] AUC={search.best_score_:.4f} "
+          f"(RepeatedStratifiedKFold {args.cv_folds}x{args.cv_repeats}; n_iter={args.n_iter})")
+    return search.best_params_
+
+
+def halving_search(pipe, X_train, y_train, args):
+    checkpoint = None if args.no_checkpoint else args.checkpoint
+    if checkpoint and args.fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    best_params, best_score, history = run_halving_search(
+        pipe, param_space, X_train, y_train,
+        strategy=args.search, n_candidates=args.n_iter, factor=args.factor,
+        min_resources=args.min_resources, cv_folds=args.cv_folds, n_jobs=args.n_jobs,
+        seed=args.seed, checkpoint_path=checkpoint, verbose=VERBOSE_SEARCH,
+    )
+    print(f"[CV best score] AUC={best_score:.4f} ({args.search}; {len(history)} evaluaties, "
+          f"factor={args.factor}, {args.cv_folds}-fold)")
+    return best_params
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Train het risicomodel (HGB + isotone calibratie).")
+    ap.add_argument("--search", choices=["random", "halving", "hyperband", "none"], default="random",
+                    help="random = RandomizedSearchCV (oude gedrag); halving/hyperband = hervatbaar, veel sneller; "
+                         "none = defaults uit build_pipeline")
+    ap.add_argument("--n-iter", type=int, default=N_ITER, help="Aantal kandidaten (per bracket bij hyperband)")
+    ap.add_argument("--cv-folds", type=int, default=None,
+                    help=f"CV-folds (default {CV_FOLDS} bij random, {HALVING_CV_FOLDS} bij halving/hyperband)")
+    ap.add_argument("--cv-repeats", type=int, default=CV_REPEATS, help="Alleen bij --search random")
+    ap.add_argument("--n-jobs", type=int, default=N_JOBS)
+    ap.add_argument("--seed", type=int, default=RANDOM_SEED)
+    ap.add_argument("--factor", type=int, default=HALVING_FACTOR)
+    ap.add_argument("--min-resources", type=int, default=HALVING_MIN_RESOURCES,
+                    help="Rijen in de eerste halving-ronde")
+    ap.add_argument("--checkpoint", default=None,
+                    help="Checkpoint voor halving/hyperband (default data/search_checkpoint.json, "
+                         "bij --out-of-core data/search_checkpoint_ooc.json)")
+    ap.add_argument("--no-checkpoint", action="store_true")
+    ap.add_argument("--fresh", action="store_true", help="Negeer een bestaand checkpoint")
+    ap.add_argument("--train-path", default=None,
+                    help="CSV (.csv/.csv.gz) of kolommap (.cols); default data/synth_train.cols of .csv")
+    ap.add_argument("--valid-path", default=None, help="Idem voor validatie")
+    ap.add_argument("--columns", default=None,
+                    help="Komma-gescheiden subset van features (label wordt altijd gelezen)")
+    ooc_args = ap.add_argument_group("out-of-core", "Streamend trainen op data groter dan het geheugen")
+    ooc_args.add_argument("--out-of-core", action="store_true")
+    ooc_args.add_argument("--chunk-rows", type=int, default=ooc.CHUNK_ROWS)
+    ooc_args.add_argument("--fit-rows", type=int, default=ooc.FIT_ROWS,
+                          help="Max. rijen (gebinde steekproef) waarop HGB en de search fitten")
+    ooc_args.add_argument("--sample-rows", type=int, default=ooc.SAMPLE_ROWS, help="Rijen voor de bin-grenzen")
+    ooc_args.add_argument("--calib-frac", type=float, default=ooc.CALIB_FRAC)
+    ooc_args.add_argument("--calib-rows", type=int, default=ooc.CALIB_ROWS)
+    ooc_args.add_argument("--work-dir", default=None, help="Map voor de uint8-codes (default: tijdelijke map)")
+    ap.add_argument("--surrogate-max-dev", type=float, default=None,
+                    help="Surrogaat niet schrijven als de geserveerde max |Δp| op validatie hoger is")
+    ap.add_argument("--threading", action="store_true", default=USE_THREADING_BACKEND,
+                    help="Forceer joblib 'threading' (soms stiller op macOS)")
+    args = ap.parse_args(argv)
+    if args.cv_folds is None:
+        args.cv_folds = CV_FOLDS if args.search == "random" else HALVING_CV_FOLDS
+    if args.checkpoint is None:
+        args.checkpoint = CHECKPOINT_OOC_OUT if args.out_of_core else CHECKPOINT_OUT
+    return args
+
+
+def run_search_backend(search, pipe, X_train, y_train, args):
+    if args.search == "none":
+        return {}
+    if args.threading:
         from joblib import parallel_backend
         with parallel_backend("threading"):
-            search.fit(X_train, y_train)
-    else:
-        search.fit(X_train, y_train)
+            return search(pipe, X_train, y_train, args)
+    return search(pipe, X_train, y_train, args)
+
+
+def main_out_of_core(args):
+    train_path = args.train_path or _default_path(train_csv, train_cols)
+    valid_path = args.valid_path or _default_path(valid_csv, valid_cols)
+    assert os.path.exists(train_path), "Run eerst: python ml/gen_data.py"
+    has_valid = os.path.exists(valid_path)
+    features = args.columns.split(",") if args.columns else [c for c in ooc.table_columns(train_path) if c != "label"]
+    valid_frac = 0.0 if has_valid else 0.15
+
+    store = ooc.build_binned_store(
+        train_path, features, chunk_rows=args.chunk_rows, sample_rows=args.sample_rows,
+        calib_frac=args.calib_frac, calib_rows=args.calib_rows, valid_frac=valid_frac,
+        seed=args.seed, work_dir=args.work_dir,
+    )
+    try:
+        X_codes, y_codes = store.subsample(args.fit_rows, args.seed)
+    finally:
+        store.close()
+
+    # search + fit op de codes; de Pipeline heeft hier alleen de 'clf'-stap
+    pipe = build_pipeline(features, args.seed)
+    clf_only = Pipeline([("clf", pipe.named_steps["clf"])])
+    search = random_search if args.search == "random" else halving_search
+    best_params = run_search_backend(search, clf_only, X_codes, y_codes, args)
+    print("\n[Best params]", best_params)
+    clf = clf_only.set_params(**best_params).fit(X_codes, y_codes).named_steps["clf"]
+    ooc.remap_thresholds(clf, store.edges)
+
+    pre = ooc.apply_scaler(pipe.named_steps["pre"].fit(store.calib_X), store.scaler)
+    best = Pipeline([("pre", pre), ("clf", clf)])
+
+    # ====== Calibratie op de apart gehouden rijen (model is al gefit) ======
+    calib = CalibratedClassifierCV(best, method="isotonic", cv="prefit")
+    calib.fit(store.calib_X, store.calib_y)
+
+    # ====== Evaluatie (streamend) ======
+    roles = None if has_valid else (args.seed, args.calib_frac, valid_frac)
+    m = ooc.evaluate_streaming(calib, valid_path if has_valid else train_path, features,
+                               chunk_rows=args.chunk_rows, roles=roles)
+    print(f"[Valid] AUC={m['auc']:.3f} | AP={m['ap']:.3f} | F1={m['f1']:.3f} | "
+          f"logloss={m['logloss']:.3f} | n={m['n']:,}")
+
+    save_model(calib, features, background=store.calib_X, surrogate_max_dev=args.surrogate_max_dev)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        return main_out_of_core(args) if args.out_of_core else main_in_memory(args)
+    except CheckpointMismatch as e:
+        sys.exit(f"{e}; start opnieuw met --fresh (of kies een ander --checkpoint).")
+
+
+def main_in_memory(args):
+    columns = args.columns.split(",") + ["label"] if args.columns else None
+    train, valid = load_data(args.seed, args.train_path, args.valid_path, columns)
+
+    # label eruit halen i.p.v. de features te kopiëren (float32 blijft float32)
+    y_train = train.pop("label").astype(int).values
+    y_valid = valid.pop("label").astype(int).values
+
+    features = list(train.columns)
+    X_train, X_valid = train, valid
+
+    pipe = build_pipeline(features, args.seed)
+    search = random_search if args.search == "random" else halving_search
+
+    # ====== Train ======
+    best_params = run_search_backend(search, pipe, X_train, y_train, args)
+    print("\n[Best params]", best_params)
+    best = pipe.set_params(**best_params)
+
+    # ====== Calibratie voor betrouwbare predict_proba ======
+    calib = CalibratedClassifierCV(best, method="isotonic", cv=3)
+    calib.fit(X_train, y_train)
+
+    # ====== Evaluatie ======
+    p_tr = calib.predict_proba(X_train)[:, 1]
+    p_va = calib.predict_proba(X_valid)[:, 1]
+
+    print(f"[Train] AUC={roc_auc_score(y_train,p_tr):.3f} | AP={average_precision_score(y_train,p_tr):.3f} | F1={f1_score(y_train,(p_tr>0.5).astype(int)):.3f}")
+    print(f"[Valid] AUC={roc_auc_score(y_valid,p_va):.3f} | AP={average_precision_score(y_valid,p_va):.3f} | F1={f1_score(y_valid,(p_va>0.5).astype(int)):.3f}")
+
+    # ====== Opslaan ======
+    save_model(calib, features, background=X_train, surrogate_max_dev=args.surrogate_max_dev)
 
-# ====== Train ======
-run_search()
-best = search.best_estimator_
-print("\n[Best params]", search.best_params_)
-print(f"[CV best score] AUC={search.best_score_:.4f} (RepeatedStratifiedKFold {CV_FOLDS}x{CV_REPEATS}; n_iter={N_ITER})")
+    print("\nTip: wil je nóg robuuster?")
+    print("- Verhoog --n-iter (bijv. 120 of 200).")
+    print("- Verhoog --cv-repeats naar 3 (kost tijd) of gebruik --search halving voor snelheid.")
+    print("- Voeg meer variatie in synthetische data toe (ml/gen_data.py).")
 
-# ====== Calibratie voor betrouwbare predict_proba ======
-calib = CalibratedClassifierCV(best, method="isotonic", cv=3)
-calib.fit(X_train, y_train)
 
-# ====== Evaluatie ======
-p_tr = calib.predict_proba(X_train)[:, 1]
-p_va = calib.predict_proba(X_valid)[:, 1]
+def save_model(calib, features, background=None, surrogate_max_dev=None):
+    # schrijven via tmp + os.replace: een app met hot reload ziet nooit een half bestand
+    dump(calib, MODEL_OUT + ".tmp")
+    with open(COLS_OUT + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"columns": features}, f, ensure_ascii=False, indent=2)
+    os.replace(COLS_OUT + ".tmp", COLS_OUT)
+    os.replace(MODEL_OUT + ".tmp", MODEL_OUT)
 
-print(f"[Train] AUC={roc_auc_score(y_train,p_tr):.3f} | AP={average_precision_score(y_train,p_tr):.3f} | F1={f1_score(y_train,(p_tr>0.5).astype(int)):.3f}")
-print(f"[Valid] AUC={roc_auc_score(y_valid,p_va):.3f} | AP={average_precision_score(y_valid,p_va):.3f} | F1={f1_score(y_valid,(p_va>0.5).astype(int)):.3f}")
+    # compact artefact voor snelle cold start (scoren zonder scikit-learn)
+    export_compact(calib, features, COMPACT_OUT)
+    # partial-dependence-raster voor de uitleg per feature (achtergrond = trainingsrijen)
+    if background is not None:
+        # uitleg en surrogaat zijn gekoppeld aan deze modelversie (inhoudshash van model.joblib + columns.json)
+        version = _content_hash(artifact_paths("fast"))
+        export_explainer(calib, features, background, EXPLAIN_PATH, model_version=version)
+        # gedistilleerd surrogaat (INFERENCE_MODE "surrogate"); alleen als het de validatie haalt,
+        # anders blijft een oud surrogate.npz staan dat door de versiecheck niet meer geladen wordt
+        try:
+            report = export_surrogate(calib, features, background, SURROGATE_PATH, model_version=version,
+                                      max_dev=surrogate_max_dev)
+            print(f"[Surrogaat] {format_report(report)}")
+        except ValueError as e:
+            report = None
+            print(f"[Surrogaat] {e}")
 
-# ====== Opslaan ======
-dump(calib, MODEL_OUT)
-with open(COLS_OUT, "w", encoding="utf-8") as f:
-    json.dump({"columns": features}, f, ensure_ascii=False, indent=2)
+    print(f"[OK] Model -> {MODEL_OUT}")
+    print(f"[OK] Columns -> {COLS_OUT}")
+    print(f"[OK] Compact model -> {COMPACT_OUT}")
+    if background is not None:
+        print(f"[OK] Uitleg -> {EXPLAIN_PATH}")
+        if report is not None:
+            print(f"[OK] Surrogaat -> {SURROGATE_PATH}")
 
-print(f"[OK] Model -> {MODEL_OUT}")
-print(f"[OK] Columns -> {COLS_OUT}")
 
-print("\nTip: wil je nóg robuuster?")
-print("- Verhoog N_ITER (bijv. 120 of 200).")
-print("- Verhoog CV_REPEATS naar 3 (kost tijd).")
-print("- Voeg meer variatie in synthetische data toe (ml/gen_data.py).")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# multiasset.py
+# Gecorreleerde projectie over een willekeurig aantal fondsen/assets met verwisselbare rendementsmodellen.
+#
+# Universe = namen + jaarlijkse verwachte rendementen + jaarlijkse covariantiematrix. Rendementen per
+# (pad, maand, asset) komen uit één gebatchte trekking z @ L.T (L = Cholesky van de maandcovariantie).
+# Bij maandelijkse herbalancering (zoals projection.py) is alleen w·r nodig: normaal en multivariaat-t
+# blijven dan eendimensionaal met sigma_p = sqrt(w' Σ w), en bootstrap trekt uit de historische
+# portefeuillereeks. 20+ fondsen kosten dan evenveel als 3 buckets.
+import numpy as np
+import pandas as pd
+
+from projection import finals_from_growth, summarize
+
+
+class Universe:
+    def __init__(self, names, means, cov):
+        self.names = list(names)
+        self.means = np.asarray(means, dtype=float)      # jaarlijks
+        self.cov = np.asarray(cov, dtype=float)          # jaarlijks
+        n = len(self.names)
+        if self.means.shape != (n,) or self.cov.shape != (n, n):
+            raise ValueError(f"Universe: {n} namen maar means {self.means.shape}, cov {self.cov.shape}")
+
+    def monthly(self):
+        """(maandelijkse means, Cholesky-factor van de maandcovariantie)."""
+        means = (1 + self.means) ** (1 / 12) - 1
+        try:
+            chol = np.linalg.cholesky(self.cov / 12)
+        except np.linalg.LinAlgError:
+            raise ValueError("Covariantiematrix is niet positief definiet") from None
+        return means, chol
+
+
+def correlated_cov(groups, vols, within: dict, between: dict):
+    """
+    Covariantie uit een blokstructuur: correlatie `within[g]` binnen groep g, `between[(g, h)]`
+    (of (h, g)) tussen groepen, 0 als niet opgegeven. groups/vols per asset.
+    """
+    groups = list(groups)
+    vols = np.asarray(vols, dtype=float)
+    corr = np.eye(len(groups))
+    for i, g in enumerate(groups):
+        for j, h in enumerate(groups):
+            if i != j:
+                corr[i, j] = within.get(g, 0.0) if g == h else between.get((g, h), between.get((h, g), 0.0))
+    return corr * np.outer(vols, vols)
+
+
+# ---------- Rendementsmodellen ----------
+# draw(rng, sims, months, means, chol) → (sims, months, n) maandrendementen
+# portfolio(rng, sims, months, means, chol, weights) → (sims, months), zelfde verdeling als draw(...) @ weights
+
+class NormalReturns:
+    name = "normal"
+
+    def shocks(self, rng, shape):
+        return rng.standard_normal(shape)
+
+    def draw(self, rng, sims, months, means, chol):
+        return means + self.shocks(rng, (sims, months, len(means))) @ chol.T
+
+    def portfolio(self, rng, sims, months, means, chol, weights):
+        sigma = np.linalg.norm(chol.T @ weights)
+        return means @ weights + sigma * self.shocks(rng, (sims, months))
+
+
+class StudentTReturns(NormalReturns):
+    """Multivariaat-t (één gedeelde schaal per pad en maand) met eenheidsvariantie: dikkere staarten, zelfde Σ."""
+    name = "t"
+
+    def __init__(self, df: float = 5.0):
+        if df <= 2:
+            raise ValueError("Student-t vereist df > 2 (eindige variantie)")
+        self.df = float(df)
+
+    def shocks(self, rng, shape):
+        z = rng.standard_normal(shape)
+        scale_shape = shape[:2] + (1,) * (len(shape) - 2)
+        w = rng.chisquare(self.df, scale_shape) / self.df
+        return z / np.sqrt(w) * np.sqrt((self.df - 2) / self.df)
+
+
+class BootstrapReturns:
+    """Trekt hele historische maanden (alle assets tegelijk, dus met hun echte samenhang); means/Σ worden genegeerd."""
+    name = "bootstrap"
+
+    def __init__(self, history: pd.DataFrame):
+        self.history = history.astype(float)
+
+    @classmethod
+    def from_csv(cls, path: str):
+        # kolommen = namen (bv. tickers), rijen = maandrendementen als fractie; optionele datumkolom
+        df = pd.read_csv(path)
+        df = df.drop(columns=[c for c in df.columns if c.lower() in ("date", "datum", "maand")])
+        if df.empty:
+            raise ValueError(f"{path}: geen maandrendementen")
+        return cls(df)
+
+    def matrix(self, names):
+        missing = [n for n in names if n not in self.history.columns]
+        if missing:
+            raise ValueError(f"Geen historie voor: {', '.join(missing)}")
+        return self.history[list(names)].to_numpy()
+
+    def draw(self, rng, sims, months, hist):
+        return hist[rng.integers(0, len(hist), (sims, months))]
+
+    def portfolio(self, rng, sims, months, hist, weights):
+        return (hist @ weights)[rng.integers(0, len(hist), (sims, months))]
+
+
+def return_model(name: str, df: float = 5.0, history_csv: str | None = None):
+    if name == "normal":
+        return NormalReturns()
+    if name == "t":
+        return StudentTReturns(df)
+    if name == "bootstrap":
+        if not history_csv:
+            raise ValueError("Return-model 'bootstrap' vereist een CSV met historische maandrendementen")
+        return BootstrapReturns.from_csv(history_csv)
+    raise ValueError(f"Onbekend return-model: {name!r}")
+
+
+# ---------- Projectie ----------
+
+def _params(universe: Universe, model):
+    if isinstance(model, BootstrapReturns):
+        return (model.matrix(universe.names),)
+    return universe.monthly()
+
+
+def draw_returns(universe: Universe, model, sims: int, months: int, seed: int = 7):
+    """(sims, months, n) gecorreleerde maandrendementen per asset."""
+    return model.draw(np.random.default_rng(seed), sims, months, *_params(universe, model))
+
+
+def simulate(inleg: float, months: int, universe: Universe, weights, model=None, sims: int = 800,
+             seed: int = 7, fee_annual: float = 0.0, rebalance: bool = True):
+    """
+    Eindwaarden per pad. rebalance=True: elke maand terug naar `weights` (één portefeuillereeks);
+    False: elke inleg volgens `weights` erbij, daarna laat elk asset zijn eigen pad lopen.
+    """
+    model = model or NormalReturns()
+    weights = np.asarray(weights, dtype=float)
+    fee_m = (1 - fee_annual) ** (1 / 12) if fee_annual > 0 else 1.0
+    rng = np.random.default_rng(seed)
+    params = _params(universe, model)
+    if rebalance:
+        growth = (1.0 + model.portfolio(rng, sims, months, *params, weights)) * fee_m
+        return finals_from_growth(inleg, growth)
+    if months == 0:
+        return np.zeros(sims)
+    growth = (1.0 + model.draw(rng, sims, months, *params)) * fee_m      # (sims, months, n)
+    tail = np.cumprod(growth[:, ::-1, :], axis=1).sum(axis=1)            # per asset, per euro inleg
+    return inleg * (tail @ weights)
+
+
+def project(inleg: float, jaren: int, universe: Universe, weights, model=None, sims: int = 800,
+            seed: int = 7, fee_annual: float = 0.0, rebalance: bool = True):
+    finals = simulate(inleg, int(jaren * 12), universe, weights, model, sims, seed, fee_annual, rebalance)
+    return summarize(finals)
+
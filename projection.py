@@ -0,0 +1,476 @@
+# projection.py
+# Gevectoriseerde Monte-Carlo-projectie van een maandelijkse inleg.
+import os, json, threading, time
+from collections import OrderedDict
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+
+BUCKETS = ("equity", "bonds", "cash")
+PERCENTILES = {"p10": 10, "median": 50, "p90": 90}
+
+
+def monthly_params(alloc: dict, assump: dict):
+    """Zet jaarlijkse aannames om naar maandelijkse (means, vols, weights, fee-factor)."""
+    keys = list(alloc)
+    means = np.array([(1 + assump[f"{k}_mean"]) ** (1 / 12) - 1 for k in keys])
+    vols = np.array([assump[f"{k}_vol"] / np.sqrt(12) for k in keys])
+    weights = np.array([float(alloc[k]) for k in keys])
+    fee_m = (1 - assump["fee_annual"]) ** (1 / 12) if assump["fee_annual"] > 0 else 1.0
+    return means, vols, weights, fee_m
+
+
+def growth_factors(rng, sims: int, months: int, means, vols, weights, fee_m):
+    # alle maandrendementen per bucket in één trekking: (sims, months, buckets)
+    draws = rng.standard_normal((sims, months, len(weights)))
+    # sum_k w_k * (mu_k + sigma_k * z_k), met mu/sigma vooraf in de gewichten gevouwen
+    r = draws @ (weights * vols) + means @ weights
+    return (1.0 + r) * fee_m
+
+
+def finals_from_growth(inleg: float, growth):
+    """
+    Eindwaarde van port_t = (port_{t-1} + inleg) * g_t, zonder Python-lus:
+    final = inleg * sum_t prod_{j>=t} g_j  (cumulatief product van achteren).
+    """
+    if growth.shape[1] == 0:
+        return np.zeros(growth.shape[0])
+    tail = np.cumprod(growth[:, ::-1], axis=1)
+    return inleg * tail.sum(axis=1)
+
+
+def summarize(finals):
+    vals = np.percentile(finals, list(PERCENTILES.values()))
+    return {k: float(v) for k, v in zip(PERCENTILES.keys(), vals)}
+
+
+def simulate(inleg: float, months: int, alloc: dict, assump: dict, sims: int = 800, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    means, vols, weights, fee_m = monthly_params(alloc, assump)
+    growth = growth_factors(rng, sims, int(months), means, vols, weights, fee_m)
+    return finals_from_growth(inleg, growth)
+
+
+def project(inleg: float, jaren: int, alloc: dict, assump: dict, sims: int = 800, seed: int = 7,
+            mode: str = "mc"):
+    """
+    mode: "mc" (oorspronkelijke simulatie), "analytic", of een variantiereductie-methode
+    "antithetic" / "sobol", optioneel met "+cv" (control variate), bv. "sobol+cv" of "mc+cv".
+    De variantiereductie-modi geven ook "se" (standaardfout per percentiel) terug.
+    """
+    if mode == "analytic":
+        return project_analytic(inleg, jaren, alloc, assump)
+    if mode == "mc":
+        return summarize(simulate(inleg, int(jaren * 12), alloc, assump, sims=sims, seed=seed))
+    method, _, extra = mode.partition("+")
+    if method not in METHODS or extra not in ("", "cv"):
+        raise ValueError(f"Onbekende projectiemodus: {mode!r}")
+    return estimate(inleg, jaren, alloc, assump, sims=sims, seed=seed, method=method, control_variate=extra == "cv")
+
+
+def quantile_halfwidth(sorted_finals, q: float, z: float = 1.96):
+    """Halve breedte van het (verdelingsvrije) 95%-betrouwbaarheidsinterval van kwantiel q via orde-statistieken."""
+    n = len(sorted_finals)
+    se = np.sqrt(n * q * (1 - q))
+    lo = sorted_finals[max(0, int(np.floor(n * q - z * se)))]
+    hi = sorted_finals[min(n - 1, int(np.ceil(n * q + z * se)))]
+    return (hi - lo) / 2
+
+
+def progressive(inleg: float, jaren: int, alloc: dict, assump: dict, sims: int = 800, seed: int = 7,
+                batch: int = 100, tol: float = 0.02, min_sims: int = 200):
+    """
+    Simuleert in batches en levert na elke batch de lopende P10/mediaan/P90 op, met
+    rel_error = grootste relatieve CI-halve-breedte over de drie percentielen. Stopt zodra
+    rel_error <= tol én de schattingen sinds de vorige batch minder dan tol bewogen.
+    Dezelfde random-stroom als simulate(): zonder vroege stop gelijk aan project().
+    """
+    rng = np.random.default_rng(seed)
+    means, vols, weights, fee_m = monthly_params(alloc, assump)
+    months = int(jaren * 12)
+    finals = np.empty(int(sims))
+    n, prev = 0, None
+    while n < sims:
+        b = min(int(batch), int(sims) - n)
+        finals[n:n + b] = finals_from_growth(inleg, growth_factors(rng, b, months, means, vols, weights, fee_m))
+        n += b
+        est = summarize(finals[:n])
+        x = np.sort(finals[:n])
+        err = max((quantile_halfwidth(x, q / 100) / abs(est[k]) if est[k] else 0.0)
+                  for k, q in PERCENTILES.items())
+        moved = (max(abs(est[k] - prev[k]) / abs(est[k]) if est[k] else 0.0 for k in est)
+                 if prev else float("inf"))
+        converged = n >= min_sims and err <= tol and moved <= tol
+        yield {**est, "sims": n, "rel_error": float(err), "converged": converged, "final": converged or n >= sims}
+        if converged:
+            return
+        prev = est
+
+
+# ---------- Variantiereductie ----------
+#
+# Het portfolio-rendement per maand is sum_k w_k (mu_k + sigma_k z_k) ~ N(w.mu, sum w_k^2 sigma_k^2):
+# één standaardnormale schok per maand volstaat (zelfde verdeling, minder dimensies voor QMC).
+#
+# "sobol": Sobol-punten met random digital shift → ndtri, gedraaid met een Householder-spiegeling zodat de
+# eerste (best verdeelde) Sobol-coördinaat langs de gradiënt van de eindwaarde ligt (Imai & Tan).
+# De eindwaarde hangt vrijwel alleen van die richting af; gemeten t.o.v. 400k paden (1–30 jaar):
+# 128 Sobol-punten (4 replicaties) geven een kleinere P10/P90-fout dan 800 gewone paden.
+# "antithetic": paren (z, -z); vooral de mediaan wordt veel nauwkeuriger.
+# "+cv": gewogen kwantielen met de exact bekende E[S] (annuity_moments) als control variate.
+
+METHODS = ("mc", "antithetic", "sobol")
+REPLICATES = 4
+
+
+SOBOL_BITS = 30
+
+
+def _gradient_reflector(months: int, growth: float):
+    """
+    Vector v van de Householder-spiegeling H = I - 2vvᵀ die e1 op de genormaliseerde gradiënt
+    dS/dz (in z=0) afbeeldt; z @ H is dan z - 2 (z·v) vᵀ, zonder de m×m-matrix te bouwen.
+    """
+    # dS/dz_k ∝ sum_{t<=k} g^(m-t): latere maanden raken meer inleggingen
+    a = np.cumsum(growth ** (months - np.arange(1, months + 1, dtype=float)))
+    a /= np.linalg.norm(a)
+    v = -a
+    v[0] += 1.0
+    norm = np.linalg.norm(v)
+    return None if norm < 1e-12 else v / norm
+
+
+@lru_cache(maxsize=64)
+def _sobol_base(months: int, log2n: int):
+    """Ongescrambelde Sobol-punten als gehele getallen (SOBOL_BITS bits), eenmalig per (dim, n)."""
+    from scipy.stats import qmc
+    u = qmc.Sobol(months, scramble=False).random_base2(log2n)
+    base = (u * (1 << SOBOL_BITS)).astype(np.uint64)
+    base.flags.writeable = False
+    return base
+
+
+def standard_normals(method: str, n: int, months: int, rng, reflector=None):
+    if method == "mc":
+        return rng.standard_normal((n, months))
+    if method == "antithetic":
+        half = rng.standard_normal(((n + 1) // 2, months))
+        return np.vstack([half, -half])[:n]
+    if method == "sobol":
+        from scipy.special import ndtri
+        # random digital shift (XOR per dimensie): zuivere gerandomiseerde QMC en veel goedkoper
+        # dan Owen-scrambling bij elke aanroep; +0.5 houdt u weg van 0 en 1
+        base = _sobol_base(months, max(1, int(round(np.log2(max(n, 2))))))
+        shift = rng.integers(0, 1 << SOBOL_BITS, size=months, dtype=np.uint64)
+        z = ndtri(((base ^ shift) + 0.5) / (1 << SOBOL_BITS))
+        if reflector is not None:
+            z -= 2.0 * np.outer(z @ reflector, reflector)
+        return z
+    raise ValueError(f"Onbekende methode: {method!r}")
+
+
+def weighted_percentiles(finals, control, control_mean: float):
+    """
+    Kwantielen van de met regressie-gewichten gecorrigeerde empirische verdeling (Σw = 1, Σw·C = E[C]).
+    Bij een grote correctie worden gewichten in de staart negatief; die worden op 0 gezet en de rest
+    hernormaliseerd, zodat de cumulatieve som monotoon blijft (searchsorted vereist dat).
+    """
+    c = control - control.mean()
+    denom = float(c @ c)
+    w = np.full(len(finals), 1.0 / len(finals))
+    if denom > 0:
+        w += (control_mean - control.mean()) * c / denom
+        w = np.clip(w, 0.0, None)
+        w = w / w.sum() if w.sum() > 0 else np.full(len(finals), 1.0 / len(finals))
+    order = np.argsort(finals)
+    cum = np.cumsum(w[order])
+    idx = np.minimum(np.searchsorted(cum, [q / 100 for q in PERCENTILES.values()]), len(finals) - 1)
+    return {k: float(finals[order][i]) for k, i in zip(PERCENTILES, idx)}
+
+
+def estimate(inleg: float, jaren: int, alloc: dict, assump: dict, sims: int = 128, seed: int = 7,
+             method: str = "sobol", control_variate: bool = False, replicates: int = REPLICATES):
+    """
+    Percentielen uit `replicates` onafhankelijke replicaties van ~sims/replicates paden
+    (bij sobol afgerond op een macht van 2). Schatting = percentiel over alle paden;
+    se = spreiding van de replicatie-percentielen / sqrt(replicates).
+    """
+    months = int(jaren * 12)
+    means, vols, weights, fee_m = monthly_params(alloc, assump)
+    mu_p = float(means @ weights)
+    sigma_p = float(np.sqrt(((weights * vols) ** 2).sum()))
+    e1 = annuity_moments(months, alloc, assump)[0] if control_variate else None
+    reflector = _gradient_reflector(months, (1 + mu_p) * fee_m) if method == "sobol" and months > 1 else None
+    per = max(2, int(np.ceil(sims / replicates)))
+
+    finals, reps = [], []
+    for r in range(replicates):
+        rng = np.random.default_rng([seed, r])
+        z = standard_normals(method, per, months, rng, reflector)
+        growth = (1.0 + mu_p + sigma_p * z) * fee_m
+        f = finals_from_growth(inleg, growth) if months else np.zeros(len(z))
+        finals.append(f)
+        reps.append(weighted_percentiles(f, f / inleg, e1) if control_variate and inleg else summarize(f))
+    allf = np.concatenate(finals)
+    est = weighted_percentiles(allf, allf / inleg, e1) if control_variate and inleg else summarize(allf)
+    se = {k: float(np.std([rp[k] for rp in reps], ddof=1) / np.sqrt(replicates)) for k in PERCENTILES}
+    return {**est, "se": se, "sims": int(len(allf))}
+
+
+# ---------- Analytische benadering ----------
+
+# standaardnormale kwantielen voor P10/P50/P90
+_Z = {"p10": -1.2815515655446004, "median": 0.0, "p90": 1.2815515655446004}
+
+
+def annuity_moments(months: int, alloc: dict, assump: dict):
+    """
+    Exacte E[S] en E[S^2] van S = sum_t prod_{j>=t} g_j (eindwaarde per euro inleg),
+    met g_j onafhankelijk en gelijk verdeeld: g = (1 + r) * fee_m, r ~ N(w.mu, sum w^2 sigma^2).
+    """
+    means, vols, weights, fee_m = monthly_params(alloc, assump)
+    mu_p = float(means @ weights)
+    var_p = float(((weights * vols) ** 2).sum())
+    m1 = (1 + mu_p) * fee_m
+    m2 = ((1 + mu_p) ** 2 + var_p) * fee_m ** 2
+    e1, e2 = 0.0, 0.0
+    for _ in range(int(months)):
+        # S_t = (S_{t-1} + 1) * g_t, g_t onafhankelijk van S_{t-1}
+        e1, e2 = (e1 + 1) * m1, (e2 + 2 * e1 + 1) * m2
+    return e1, e2
+
+
+def project_analytic(inleg: float, jaren: int, alloc: dict, assump: dict):
+    """
+    Lognormale moment-matching van de eindwaarde (geen simulatie, enkele microseconden).
+
+    Foutmarge t.o.v. Monte Carlo (200k paden, de drie allocaties uit
+    _alloc_from_risk, 1–10 jaar, fee 0–0.3%): max. relatieve afwijking
+    P10 0.6%, mediaan 0.3%, P90 0.2%. De fout groeit met de horizon (de som
+    van lognormale termen is niet exact lognormaal); ter vergelijking: de
+    steekproeffout van 800 paden is ~1–2%.
+    """
+    e1, e2 = annuity_moments(int(jaren * 12), alloc, assump)
+    if e1 <= 0:
+        return {k: 0.0 for k in _Z}
+    s2 = max(0.0, np.log(e2 / e1 ** 2))
+    mu = np.log(e1) - s2 / 2
+    s = np.sqrt(s2)
+    return {k: float(inleg * np.exp(mu + z * s)) for k, z in _Z.items()}
+
+
+# ---------- Wat-als-raster (common random numbers) ----------
+
+def sweep(points, sims: int = 800, seed: int = 7):
+    """
+    P10/mediaan/P90 voor een lijst (inleg, maanden, alloc, assump) met één gedeelde trekking
+    (sims, langste horizon, buckets): alle punten zien dezelfde scenario's, kortere horizonnen de eerste
+    maanden ervan. Verschillen tussen punten zijn dan effect van de invoer, geen simulatieruis.
+    Per (alloc, assump) één cumulatief product voor alle horizonnen:
+    S_m = sum_{t<=m} prod_{t<=j<=m} g_j = P_m * sum_{t<=m} 1/P_{t-1}, met P_t = g_1···g_t.
+    De langste horizon geeft precies simulate(...) met dezelfde seed; de inleg schaalt lineair.
+    """
+    points = [(inleg, int(months), {k: alloc[k] for k in BUCKETS if k in alloc} or alloc, assump)
+              for inleg, months, alloc, assump in points]
+    if not points:
+        return []
+    longest = max(1, max(m for _, m, _, _ in points))
+    draws = np.random.default_rng(seed).standard_normal((sims, longest, len(BUCKETS)))
+    per_euro = {}
+    for _, months, alloc, assump in points:
+        fam = (family_key(alloc, assump), round(float(assump["fee_annual"]), 8))
+        if fam not in per_euro:
+            means, vols, weights, fee_m = monthly_params(alloc, assump)
+            growth = (1.0 + draws[:, :, :len(weights)] @ (weights * vols) + means @ weights) * fee_m
+            P = np.cumprod(growth, axis=1)
+            prev = np.concatenate([np.ones((sims, 1)), P[:, :-1]], axis=1)
+            per_euro[fam] = (P * np.cumsum(1.0 / prev, axis=1), {})
+        S, done = per_euro[fam]
+        if months not in done:
+            done[months] = (np.percentile(S[:, months - 1], list(PERCENTILES.values()))
+                            if months > 0 else np.zeros(len(PERCENTILES)))
+    out = []
+    for inleg, months, alloc, assump in points:
+        vals = per_euro[(family_key(alloc, assump), round(float(assump["fee_annual"]), 8))][1][months]
+        out.append({k: float(inleg) * float(v) for k, v in zip(PERCENTILES, vals)})
+    return out
+
+
+# ---------- Cache ----------
+
+def scale(result: dict, factor: float):
+    """Projectie voor `factor` × de inleg: de eindwaarden (en dus percentielen en SE's) zijn lineair in de inleg."""
+    out = dict(result)
+    for k in PERCENTILES:
+        out[k] = result[k] * factor
+    if "se" in result:
+        out["se"] = {k: v * factor for k, v in result["se"].items()}
+    return out
+
+
+def cache_key(inleg, jaren, alloc: dict, assump: dict, sims: int, seed: int, mode: str):
+    # kwantiseer floats zodat 0.30000000000000004 en 0.3 dezelfde sleutel geven
+    return (
+        round(float(inleg), 2), int(jaren),
+        tuple((k, round(float(w), 6)) for k, w in alloc.items()),
+        tuple(sorted((k, round(float(v), 8)) for k, v in assump.items())),
+        int(sims), int(seed), mode,
+    )
+
+
+class ProjectionCache:
+    """Begrensde LRU-cache met TTL voor projectie-uitkomsten (thread-safe)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        """Waarde of None; telt als hit/miss."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (self.ttl <= 0 or now - item[0] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return dict(item[1])
+            if item is not None:
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+        # buiten de lock rekenen: een gelijktijdige miss rekent hooguit dubbel
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+# ---------- Voorberekende tabel ----------
+#
+# Per euro inleg hangen de percentielen alleen af van (allocatie, rendementsaannames, fee, jaren):
+# percentiel(inleg * S) = inleg * percentiel(S). De tabel bewaart die per-euro-percentielen per
+# familie (allocatie + aannames zonder fee) op een fee-raster × horizon; opzoeken = interpolatie
+# over de fee en vermenigvuldigen met de inleg.
+
+TABLE_VERSION = 1
+TABLE_HORIZONS = range(1, 11)
+TABLE_FEE_GRID = np.linspace(0.0, 0.005, 51)   # 0–0,50% per jaar in stappen van 1 bp
+
+
+def family_key(alloc: dict, assump: dict):
+    return (tuple((k, round(float(w), 6)) for k, w in alloc.items()),
+            tuple(sorted((k, round(float(v), 8)) for k, v in assump.items() if k != "fee_annual")))
+
+
+def _per_euro_percentiles(jaren, alloc, assump, fees, sims, seed, mode):
+    """(len(fees), 3) percentielen van S bij inleg 1 voor elke fee."""
+    if mode != "mc":
+        return np.array([[project(1.0, jaren, alloc, dict(assump, fee_annual=f), sims, seed, mode)[k]
+                          for k in PERCENTILES] for f in fees])
+    # zelfde trekkingen als simulate(); alle fees in één matrixproduct:
+    # S(fee) = sum_j prod_{laatste j+1 maanden}(1+r) * fee_m^(j+1)
+    months = int(jaren * 12)
+    means, vols, weights, _ = monthly_params(alloc, dict(assump, fee_annual=0.0))
+    growth = growth_factors(np.random.default_rng(seed), sims, months, means, vols, weights, 1.0)
+    tail = np.cumprod(growth[:, ::-1], axis=1)
+    fee_m = np.array([(1 - f) ** (1 / 12) if f > 0 else 1.0 for f in fees])
+    powers = fee_m[None, :] ** np.arange(1, months + 1)[:, None]
+    return np.percentile(tail @ powers, list(PERCENTILES.values()), axis=0).T
+
+
+class ProjectionTable:
+    def __init__(self, families: list, sims: int, seed: int, mode: str, horizons):
+        # families: [(alloc, assump, fees (n,), values (n, len(horizons), 3))]
+        self.families = families
+        self.index = {family_key(a, s): i for i, (a, s, _, _) in enumerate(families)}
+        self.sims, self.seed, self.mode = int(sims), int(seed), mode
+        self.horizons = list(horizons)
+        # als Python-lijsten: opzoeken is een bisect en een handvol float-operaties (geen numpy per request)
+        self._fees = [f.tolist() for _, _, f, _ in families]
+        self._rows = [[v[:, h, :].tolist() for h in range(len(self.horizons))] for _, _, _, v in families]
+        self._hpos = {h: i for i, h in enumerate(self.horizons)}
+        self._keys = {}   # ruwe (alloc, aannames)-items → familie-index (of None)
+
+    @classmethod
+    def build(cls, families, sims=800, seed=7, mode="mc", horizons=TABLE_HORIZONS, fee_grid=TABLE_FEE_GRID):
+        """families: [(alloc, assump, extra_fees)]; extra_fees (bv. alle haalbare fees) komen exact in het raster."""
+        out = []
+        for alloc, assump, extra in families:
+            fees = np.unique(np.concatenate([fee_grid, np.asarray(extra, dtype=float)]))
+            values = np.stack([_per_euro_percentiles(j, alloc, assump, fees, sims, seed, mode) for j in horizons],
+                              axis=1)
+            out.append((dict(alloc), {k: v for k, v in assump.items() if k != "fee_annual"}, fees, values))
+        return cls(out, sims, seed, mode, horizons)
+
+    def lookup(self, inleg, jaren, alloc, assump, sims, seed, mode):
+        """Percentielen of None als de combinatie niet in de tabel valt (dan live rekenen)."""
+        if (int(sims), int(seed), mode) != (self.sims, self.seed, self.mode):
+            return None
+        raw = (tuple(alloc.items()), tuple(assump.items()))
+        i = self._keys.get(raw, -1)
+        if i == -1:
+            i = self._keys[raw] = self.index.get(family_key(alloc, assump))
+            if len(self._keys) > 4096:
+                self._keys.clear()
+        h = self._hpos.get(jaren)
+        if i is None or h is None or jaren != int(jaren):
+            return None
+        fees, rows = self._fees[i], self._rows[i][h]
+        fee = float(assump.get("fee_annual", 0.0))
+        if not fees[0] <= fee <= fees[-1]:
+            return None
+        j = bisect_left(fees, fee)
+        if fees[j] == fee:
+            vals = rows[j]
+        else:
+            t = (fee - fees[j - 1]) / (fees[j] - fees[j - 1])
+            vals = [a + (b - a) * t for a, b in zip(rows[j - 1], rows[j])]
+        inleg = float(inleg)
+        return {k: inleg * v for k, v in zip(PERCENTILES, vals)}
+
+    def save(self, path: str):
+        arrays = {"version": np.array(TABLE_VERSION), "horizons": np.array(self.horizons),
+                  "meta": np.array(json.dumps({"sims": self.sims, "seed": self.seed, "mode": self.mode,
+                                               "families": [[a, s] for a, s, _, _ in self.families]}))}
+        for i, (_, _, fees, values) in enumerate(self.families):
+            arrays[f"fees_{i}"] = fees
+            arrays[f"values_{i}"] = values
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["version"]) != TABLE_VERSION:
+                raise ValueError(f"{path}: onbekende tabelversie {int(z['version'])}")
+            meta = json.loads(str(z["meta"]))
+            families = [(a, s, z[f"fees_{i}"], z[f"values_{i}"]) for i, (a, s) in enumerate(meta["families"])]
+            return cls(families, meta["sims"], meta["seed"], meta["mode"], z["horizons"].tolist())
@@ -0,0 +1,151 @@
+# sessions.py
+# Server-side sessies (SESSION_BACKEND): de cookie bevat alleen een willekeurig sessie-id,
+# de inhoud staat in het geheugen (LRU, één proces) of in SQLite (gedeeld door meerdere workers).
+# Scheelt per request de cookie-header en het ondertekenen/serialiseren van sticky_index.
+import os, secrets, sqlite3, threading, time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class MemoryStore:
+    """LRU met TTL; alleen voor één proces (elke worker heeft zijn eigen sessies)."""
+
+    def __init__(self, maxsize=10_000, ttl=86_400):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.data = OrderedDict()   # sid → (verloopt, payload)
+        self.lock = threading.Lock()
+
+    def get(self, sid):
+        with self.lock:
+            item = self.data.get(sid)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self.data[sid]
+                return None
+            # glijdende TTL: actieve sessies verlopen niet
+            self.data[sid] = (time.time() + self.ttl, item[1])
+            self.data.move_to_end(sid)
+            return item[1]
+
+    def set(self, sid, payload):
+        with self.lock:
+            self.data[sid] = (time.time() + self.ttl, payload)
+            self.data.move_to_end(sid)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, sid):
+        with self.lock:
+            self.data.pop(sid, None)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class SQLiteStore:
+    """Eén tabel in een lokaal SQLite-bestand (WAL); verlopen sessies worden periodiek opgeruimd."""
+
+    def __init__(self, path, ttl=86_400, purge_every=300):
+        self.path = path
+        self.ttl = float(ttl)
+        self.purge_every = float(purge_every)
+        self.local = threading.local()
+        self.last_purge = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, expires REAL NOT NULL, data TEXT NOT NULL)")
+            c.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _conn(self):
+        # één connectie per thread (en per proces: na een fork opnieuw openen)
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid):
+        c = self._conn()
+        row = c.execute("SELECT expires, data FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        now = time.time()
+        if row is None or row[0] < now:
+            return None
+        if row[0] - now < self.ttl / 2:
+            # glijdende TTL, maar hooguit één schrijfactie per halve TTL
+            c.execute("UPDATE sessions SET expires = ? WHERE sid = ?", (now + self.ttl, sid))
+        return row[1]
+
+    def set(self, sid, payload):
+        now = time.time()
+        c = self._conn()
+        c.execute("INSERT OR REPLACE INTO sessions (sid, expires, data) VALUES (?, ?, ?)", (sid, now + self.ttl, payload))
+        if now - self.last_purge > self.purge_every:
+            self.last_purge = now
+            c.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions WHERE expires >= ?", (time.time(),)).fetchone()[0]
+
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()   # zelfde typen (tuples, bytes, datetime) als de cookie-sessie
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            payload = self.store.get(sid)
+            if payload is not None:
+                return ServerSession(self.serializer.loads(payload), sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.modified:
+            self.store.set(session.sid, self.serializer.dumps(dict(session)))
+        if session.new or session.modified or self.should_set_cookie(app, session):
+            response.vary.add("Cookie")
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+
+def make_session_interface(backend: str, ttl=86_400, max_entries=10_000, sqlite_path=None):
+    """None voor "cookie" (Flask-standaard), anders een ServerSessionInterface met de gekozen store."""
+    if backend == "cookie":
+        return None
+    if backend == "memory":
+        return ServerSessionInterface(MemoryStore(max_entries, ttl))
+    if backend == "sqlite":
+        if not sqlite_path:
+            raise ValueError("SESSION_BACKEND 'sqlite' vereist SESSION_SQLITE_PATH")
+        return ServerSessionInterface(SQLiteStore(sqlite_path, ttl))
+    raise ValueError(f"Onbekende SESSION_BACKEND: {backend!r}")
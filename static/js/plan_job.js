@@ -0,0 +1,32 @@
+// Haalt een op de achtergrond berekende projectie op (PLAN_ASYNC) en vult P10/Mediaan/P90 in.
+document.addEventListener('DOMContentLoaded', () => {
+  const list = document.getElementById('projection-pending');
+  if (!list) return;
+  const status = document.getElementById('projection-status');
+  const url = list.dataset.jobUrl;
+  let delay = 250;
+
+  function show(projection) {
+    list.querySelectorAll('[data-q]').forEach(el => {
+      el.textContent = '€' + Math.round(projection[el.dataset.q]);
+    });
+    status.remove();
+  }
+
+  async function poll() {
+    try {
+      const resp = await fetch(url, {headers: {'Accept': 'application/json'}});
+      const body = await resp.json();
+      if (resp.ok && body.status === 'done') return show(body.projection);
+      if (!resp.ok || body.status === 'error') {
+        status.textContent = body.error || 'Projectie mislukt. Genereer het plan opnieuw.';
+        return;
+      }
+    } catch (e) {
+      console.warn('plan job poll failed:', e);
+    }
+    delay = Math.min(delay * 1.5, 2000);  // rustig aan bij lange simulaties
+    setTimeout(poll, delay);
+  }
+  poll();
+});
@@ -0,0 +1,26 @@
+// Toont lopende P10/Mediaan/P90 uit /plan/stream (server-sent events) met een nauwkeurigheidsindicatie.
+document.addEventListener('DOMContentLoaded', () => {
+  const list = document.getElementById('projection-live');
+  if (!list) return;
+  const status = document.getElementById('projection-status');
+  const source = new EventSource(list.dataset.streamUrl);
+
+  function show(est) {
+    list.querySelectorAll('[data-q]').forEach(el => {
+      el.textContent = '€' + Math.round(est[el.dataset.q]);
+    });
+    const pct = (est.rel_error * 100).toFixed(1);
+    status.textContent = est.final
+      ? `${est.sims} simulaties · nauwkeurig tot ±${pct}%` + (est.converged ? ' (vroeg gestopt: stabiel)' : '')
+      : `${est.sims} simulaties · nu ±${pct}%…`;
+  }
+
+  source.addEventListener('progress', e => show(JSON.parse(e.data)));
+  source.addEventListener('done', e => { show(JSON.parse(e.data)); source.close(); });
+  source.onerror = () => {
+    source.close();
+    if (!list.querySelector('[data-q]').textContent.startsWith('€')) {
+      status.textContent = 'Projectie kon niet geladen worden. Genereer het plan opnieuw.';
+    }
+  };
+});
@@ -0,0 +1,77 @@
+// Wat-als-schuifregelaars: één aanroep naar /api/whatif per veldkeuze, daarna alleen opzoeken in het raster.
+document.addEventListener('DOMContentLoaded', () => {
+  const box = document.getElementById('whatif');
+  if (!box) return;
+  const axes = JSON.parse(box.dataset.axes);
+  const base = JSON.parse(box.dataset.base);
+  const sliderA = document.getElementById('whatif-a');
+  const sliderB = document.getElementById('whatif-b');
+  const select = document.getElementById('whatif-field');
+  const status = document.getElementById('whatif-status');
+  const out = name => box.querySelector(`[data-out="${name}"]`);
+  const euro = v => '€' + Math.round(v).toLocaleString('nl-NL');
+  const labels = {equity: 'aandelen', bonds: 'obligaties', cash: 'cash'};
+  let grid = null;
+
+  function nearest(values, v) {
+    const x = Number(v);
+    if (v === null || v === '' || Number.isNaN(x)) return 0;
+    let best = 0;
+    values.forEach((val, i) => { if (Math.abs(val - x) < Math.abs(values[best] - x)) best = i; });
+    return best;
+  }
+
+  function fmt(field, v) {
+    return field === 'horizon_maanden' ? `${v} mnd` : euro(v);
+  }
+
+  function render() {
+    if (!grid) return;
+    const [fa, fb] = grid.fields;
+    const a = Number(sliderA.value), b = Number(sliderB.value);
+    const p = grid.points[a * grid.axes[fb].length + b];  // laatste veld varieert het snelst
+    box.querySelector('[data-label="a"]').textContent = fmt(fa, grid.axes[fa][a]);
+    box.querySelector('[data-label="b"]').textContent = fmt(fb, grid.axes[fb][b]);
+    const level = out('level');
+    level.className = 'badge ' + p.badge;
+    level.textContent = p.level;
+    out('score').textContent = p.score;
+    out('alloc').textContent = Object.keys(labels)
+      .filter(k => k in p.alloc).map(k => `${Math.round(p.alloc[k] * 100)}% ${labels[k]}`).join(' · ');
+    ['p10', 'median', 'p90'].forEach(q => { out(q).textContent = euro(p[q]); });
+  }
+
+  async function load() {
+    const field = select.value;
+    status.textContent = 'Raster laden…';
+    sliderA.disabled = sliderB.disabled = true;
+    try {
+      const resp = await fetch(box.dataset.url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
+        body: JSON.stringify({vary: {inleg: axes.inleg, [field]: axes[field]}}),
+      });
+      const body = await resp.json();
+      if (!resp.ok) {
+        status.textContent = body.error || 'Wat-als-raster kon niet geladen worden.';
+        return;
+      }
+      grid = body;
+      sliderA.max = grid.axes.inleg.length - 1;
+      sliderB.max = grid.axes[field].length - 1;
+      sliderA.value = nearest(grid.axes.inleg, base.inleg);
+      sliderB.value = nearest(grid.axes[field], base[field]);
+      sliderA.disabled = sliderB.disabled = false;
+      status.textContent = `${grid.points.length} varianten · ${grid.sims} gedeelde scenario's`;
+      render();
+    } catch (e) {
+      console.warn('whatif failed:', e);
+      status.textContent = 'Wat-als-raster kon niet geladen worden.';
+    }
+  }
+
+  sliderA.addEventListener('input', render);
+  sliderB.addEventListener('input', render);
+  select.addEventListener('change', load);
+  load();
+});
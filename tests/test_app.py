@@ -0,0 +1,285 @@
+import json
+
+import numpy as np
+import pytest
+
+import app as app_module
+
+PROFILE = {
+    "leeftijd": 30, "inkomen": 3000, "spaardoel": 2000, "horizon_maanden": 60,
+    "ervaring_level": 1, "buffer_maanden": 4, "vaste_lasten": 1200, "pensioen_inleg": 100,
+    "belasting_schatting": 30, "krediet_bedrag": 0, "krediet_rente": 0, "hypotheek_rente": 3,
+    "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0,
+}
+
+needs_model = pytest.mark.skipif(app_module.MODELS.get() is None, reason="data/model.joblib ontbreekt")
+
+
+@pytest.fixture
+def client():
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+@needs_model
+def test_score_json_and_csv_agree(client):
+    rows = [PROFILE, dict(PROFILE, krediet_bedrag=40000, krediet_rente=12)]
+    js = client.post("/api/score", json=rows)
+    assert js.status_code == 200
+    scores = json.loads(js.data)["scores"]
+    assert len(scores) == 2 and scores[1] > scores[0]
+
+    header = ",".join(PROFILE)
+    body = "\n".join([header] + [",".join(str(r[k]) for k in PROFILE) for r in rows])
+    csv_resp = client.post("/api/score", data=body, content_type="text/csv")
+    lines = csv_resp.data.decode().strip().splitlines()
+    assert lines[0] == "row,score"
+    assert [float(l.split(",")[1]) for l in lines[1:]] == scores
+
+
+@needs_model
+def test_score_rejects_non_list(client):
+    assert client.post("/api/score", json={"leeftijd": 30}).status_code == 400
+
+
+def test_json_array_is_decoded_incrementally():
+    import io
+    recs = [{"naam": "Zoë €", "i": i, "x": [1.5, {"y": None}]} for i in range(40)]
+    data = (" [\n " + " ,\n".join(json.dumps(r, ensure_ascii=False) for r in recs) + " ]\n").encode()
+    for block in (1, 7, 64, 1 << 16):   # objecten en UTF-8-tekens over blokgrenzen heen
+        assert list(app_module._json_array_records(io.BytesIO(data), block=block)) == recs
+    reads = []
+    stream = io.BytesIO(data)
+    gen = app_module._json_array_records(type("S", (), {"read": lambda self, n: reads.append(n) or stream.read(n)})(), 64)
+    next(gen)
+    assert len(reads) < 5   # eerste object zonder de hele upload te lezen
+    assert list(app_module._json_array_records(io.BytesIO(b"[]"))) == []
+    for bad in (b'{"a": 1}', b"", b'[{"a": 1}, 2]', b'[{"a": 1} {"b": 2}]', b'[{"a": 1},', b'[{"a": '):
+        with pytest.raises(ValueError):
+            list(app_module._json_array_records(io.BytesIO(bad), block=4))
+
+
+@needs_model
+def test_warmup_marks_ready(client):
+    assert app_module.warmup()
+    resp = client.get("/healthz/ready")
+    assert resp.status_code == 200 and resp.get_json()["ready"]
+
+
+@needs_model
+def test_ready_warms_up_without_wsgi(client, monkeypatch):
+    # flask run / python app.py: geen warmup() vooraf, de eerste probe doet het
+    monkeypatch.setitem(app_module.WARM, "ready", False)
+    resp = client.get("/healthz/ready")
+    assert resp.status_code == 200 and resp.get_json()["ready"]
+
+
+@needs_model
+def test_plan_post_good_and_bad(client):
+    form = {k: str(v) for k, v in PROFILE.items() if k != "ervaring_level"}
+    form["ervaring_select"] = "licht"
+    resp = client.post("/plan", data=form)
+    assert resp.status_code == 200 and "Mediaan" in resp.get_data(as_text=True)
+    client.get("/mode/bad")
+    resp = client.post("/plan", data={"inkomen": "2500", "horizon_maanden": "24"})
+    assert resp.status_code == 200 and "Mediaan" in resp.get_data(as_text=True)
+
+
+@needs_model
+def test_metrics_and_server_timing(client, monkeypatch):
+    from metrics import Metrics
+    m = Metrics(enabled=True, server_timing=True)
+    m.gauges = app_module.METRICS.gauges
+    monkeypatch.setattr(app_module, "METRICS", m)
+    client.get("/mode/good")
+    form = {k: str(v) for k, v in PROFILE.items() if k not in ("ervaring_level", "duurzaam_voorkeur")}
+    resp = client.post("/plan", data=dict(form, ervaring_select="licht"))
+    timing = resp.headers["Server-Timing"]
+    for stage in ("collect", "score", "select_holdings", "project", "render", "total"):
+        assert f"{stage};dur=" in timing
+    text = client.get("/metrics").data.decode()
+    assert 'hcaid_stage_seconds_count{stage="score"} 1' in text
+    assert 'hcaid_request_seconds_bucket{endpoint="plan",method="POST",le="+Inf"} 1' in text
+    assert "hcaid_projection_cache_hits_total" in text
+
+
+def test_metrics_off_by_default(client):
+    assert client.get("/metrics").status_code == 404
+    assert "Server-Timing" not in client.get("/healthz/ready").headers
+
+
+@needs_model
+def test_async_plan_polls_job(client, monkeypatch):
+    import re, time
+    monkeypatch.setitem(app_module.app.config, "PLAN_ASYNC", True)
+    monkeypatch.setitem(app_module.app.config, "PROJECTION_TABLE", False)
+    app_module.PROJECTION_CACHE.clear()
+    client.get("/mode/good")
+    form = {k: str(v) for k, v in PROFILE.items() if k not in ("ervaring_level", "duurzaam_voorkeur")}
+    html = client.post("/plan", data=dict(form, ervaring_select="licht", inleg="130")).data.decode()
+    url = re.search(r'data-job-url="([^"]+)"', html).group(1)
+    for _ in range(200):
+        body = client.get(url).get_json()
+        if body["status"] == "done":
+            break
+        time.sleep(0.01)
+    assert body["status"] == "done" and body["projection"]["p10"] < body["projection"]["p90"]
+    # resultaat staat nu in de cache: dezelfde invoer rendert meteen
+    html = client.post("/plan", data=dict(form, ervaring_select="licht", inleg="130")).data.decode()
+    assert "data-job-url" not in html
+    assert client.get("/plan/job/onbekend").status_code == 404
+
+
+def test_job_queue_backpressure():
+    import threading
+    from jobs import JobQueue, QueueFull
+    gate = threading.Event()
+    q = JobQueue(workers=1, max_pending=2)
+    ids = [q.submit(gate.wait, 5) for _ in range(2)]
+    with pytest.raises(QueueFull):
+        q.submit(gate.wait, 5)
+    assert q.stats()["rejected"] == 1
+    gate.set()
+    for _ in range(100):
+        if all(q.status(i)["status"] == "done" for i in ids):
+            break
+        threading.Event().wait(0.01)
+    assert q.status(ids[0])["result"] is True and q.stats()["pending"] == 0
+    q.submit(lambda: 1)  # weer ruimte
+
+
+@needs_model
+def test_projection_stream_converges(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "PROJECTION_STREAM", True)
+    monkeypatch.setitem(app_module.app.config, "PROJECTION_TABLE", False)
+    app_module.PROJECTION_CACHE.clear()
+    client.get("/mode/good")
+    form = {k: str(v) for k, v in PROFILE.items() if k not in ("ervaring_level", "duurzaam_voorkeur")}
+    form = dict(form, ervaring_select="licht", horizon_maanden="12", inleg="90")
+    html = client.post("/plan", data=form).data.decode()
+    assert "data-stream-url" in html
+    resp = client.get("/plan/stream")
+    assert resp.mimetype == "text/event-stream"
+    events = [e for e in resp.data.decode().split("\n\n") if e.strip()]
+    progress = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: progress")]
+    assert events[-1].startswith("event: done")
+    assert [p["sims"] for p in progress] == list(range(100, progress[-1]["sims"] + 1, 100))
+    assert progress[-1]["final"] and progress[-1]["sims"] < 800  # 1 jaar convergeert ruim vóór 800
+    # daarna uit de cache, zonder stream
+    assert "data-stream-url" not in client.post("/plan", data=form).data.decode()
+
+
+def test_projection_table_serves_standard_combinations(tmp_path, monkeypatch):
+    import projection
+    path = str(tmp_path / "table.npz")
+    projection.ProjectionTable.build(app_module._projection_families(), sims=200).save(path)
+    monkeypatch.setattr(app_module, "PROJECTION_TABLE_PATH", path)
+    monkeypatch.setitem(app_module._TABLE, "table", None)
+    monkeypatch.setitem(app_module._TABLE, "loaded", False)
+    monkeypatch.setattr(app_module.PROJECTION_CACHE, "maxsize", 0)
+    alloc, _, _ = app_module._alloc_from_risk(0.5)
+    _, fee = app_module._select_holdings(alloc, 1, 2)
+    assump = app_module._assumptions(fee)
+    live = projection.project(175, 4, alloc, assump, sims=200, seed=7)
+    monkeypatch.setattr(projection, "project", None)   # een tabeltreffer simuleert niet
+    hit = app_module._project(175, 4, alloc, assump, sims=200)
+    assert all(abs(hit[k] / live[k] - 1) < 1e-12 for k in live)
+
+
+def test_funds_engine_simulates_selected_funds(monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "PROJECTION_ENGINE", "funds")
+    alloc, _, _ = app_module._alloc_from_risk(0.5)
+    holdings, fee = app_module._select_holdings(alloc, 1, 1)
+    universe, weights = app_module._fund_universe(holdings, alloc, app_module._assumptions(fee))
+    assert not holdings["cash"] and universe.names[-1] == "cash"   # geen duurzame cash: bucket zelf
+    assert abs(sum(weights) - 1) < 1e-12
+    proj = app_module._plan_projection(150, 6, alloc, app_module._assumptions(fee), holdings=holdings)["projection"]
+    assert proj["p10"] < proj["median"] < proj["p90"]
+
+
+def test_funds_in_one_bucket_have_own_paths(monkeypatch):
+    lib = {f["ticker"]: f for f in app_module.HOLDINGS_LIBRARY["equity"]}
+    holdings = {"equity": [lib["ACXG"], lib["ALTR"]]}
+    assump = app_module._assumptions(0.0015)
+    universe, _ = app_module._fund_universe(holdings, {"equity": 1.0}, assump)
+    assert np.allclose(universe.means, [0.050, 0.058])
+    assert np.allclose(np.sqrt(np.diag(universe.cov)), [0.150, 0.240])
+    a = app_module.multiasset.simulate(100, 60, universe, [1.0, 0.0], sims=200, seed=7)
+    b = app_module.multiasset.simulate(100, 60, universe, [0.0, 1.0], sims=200, seed=7)
+    assert np.std(b) > 1.2 * np.std(a)
+    # per euro gecachet: andere inleg = zelfde simulatie, geschaald
+    calls = []
+    project = app_module.multiasset.project
+    monkeypatch.setattr(app_module.multiasset, "project", lambda *a, **kw: calls.append(a[0]) or project(*a, **kw))
+    one = app_module._project_funds(100, 5, holdings, {"equity": 1.0}, assump, sims=200, seed=11)
+    two = app_module._project_funds(250, 5, holdings, {"equity": 1.0}, assump, sims=200, seed=11)
+    assert calls == [1.0] and two["median"] == pytest.approx(2.5 * one["median"])
+
+
+@needs_model
+def test_whatif_grid_one_batched_call(client, monkeypatch):
+    calls = []
+    model = app_module.MODELS.get()
+    predict = model.fast.predict_array
+    monkeypatch.setattr(model.fast, "predict_array", lambda X: calls.append(len(X)) or predict(X))
+    monkeypatch.setattr(app_module.projection, "simulate", None)   # alles via één gedeelde trekking
+    vary = {"inleg": [50, 100, 150], "krediet_bedrag": {"min": 0, "max": 60000, "steps": 5}}
+    body = client.post("/api/whatif", json={"profile": dict(PROFILE, krediet_rente=12), "vary": vary}).get_json()
+    assert calls == [15] and body["fields"] == ["inleg", "krediet_bedrag"] and len(body["points"]) == 15
+    first = body["points"][:5]   # inleg 50, krediet oplopend
+    assert [p["krediet_bedrag"] for p in first] == [0, 15000, 30000, 45000, 60000]
+    assert first[-1]["score"] > first[0]["score"] and first[-1]["alloc"]["equity"] < first[0]["alloc"]["equity"]
+    same = [p for p in body["points"] if p["krediet_bedrag"] == 0]
+    assert same[1]["median"] == pytest.approx(2 * same[0]["median"])
+    assert client.post("/api/whatif", json={"profile": PROFILE, "vary": {"x": [1]}}).status_code == 400
+    big = {"inleg": {"min": 25, "max": 500, "steps": 50}, "horizon_maanden": {"min": 12, "max": 120, "steps": 50}}
+    assert client.post("/api/whatif", json={"profile": PROFILE, "vary": big}).status_code == 400
+
+
+@needs_model
+def test_whatif_values_are_bounded(client):
+    post = lambda vary, **kw: client.post("/api/whatif", json={"profile": dict(PROFILE, **kw), "vary": vary})
+    # horizon afgekapt op 120 maanden (zoals het formulier), dubbele punten vallen weg
+    body = post({"horizon_maanden": [60, 12000, 10**7]}).get_json()
+    assert body["axes"]["horizon_maanden"] == [60, 120]
+    assert post({"horizon_maanden": {"min": 12, "max": 1e7, "steps": 3}}).get_json()["axes"]["horizon_maanden"] == [12, 66, 120]
+    assert post({"inleg": [100]}, horizon_maanden=12000).status_code == 200   # ook de horizon uit het profiel
+    # negatieve inleg en niet-numerieke waarden: 400 i.p.v. P10 > P90 of stilletjes 0
+    for vary in ({"inleg": [-50, 100]}, {"inleg": ["abc"]}, {"krediet_bedrag": {"min": -1000, "max": 0}},
+                 {"leeftijd": [30, None]}, {"inleg": [float("inf")]}, {"inleg": ["inf"]}):
+        resp = post(vary)
+        assert resp.status_code == 400 and resp.get_json()["error"]
+    # basisinleg langs dezelfde validatie
+    for inleg in (-5, "inf", "1e400", "abc"):
+        resp = client.post("/api/whatif", json={"profile": PROFILE, "vary": {"horizon_maanden": [12]}, "inleg": inleg})
+        assert resp.status_code == 400 and resp.get_json()["error"]
+
+
+@needs_model
+def test_plan_page_whatif_uses_session_profile(client):
+    client.get("/mode/good")
+    form = {k: str(v) for k, v in PROFILE.items() if k not in ("ervaring_level", "duurzaam_voorkeur")}
+    html = client.post("/plan", data=dict(form, ervaring_select="licht", inleg="120")).get_data(as_text=True)
+    assert 'id="whatif"' in html and "js/whatif.js" in html
+    body = client.post("/api/whatif", json={"vary": {"horizon_maanden": [12, 60, 120]}}).get_json()
+    assert [p["inleg"] for p in body["points"]] == [120] * 3
+    assert body["points"][0]["median"] < body["points"][1]["median"] < body["points"][2]["median"]
+
+
+@needs_model
+def test_score_reports_errors_after_first_chunk(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "SCORE_CHUNK_ROWS", 2)
+    good = json.dumps(PROFILE)
+    resp = client.post("/api/score", data="\n".join([good, good, good, "{kapot"]), content_type="application/x-ndjson")
+    body = json.loads(resp.data)   # nog steeds geldige JSON, met expliciete fout
+    assert resp.status_code == 200 and len(body["scores"]) == 2 and body["scored"] == 2
+    assert "Regel 4" in body["error"]
+    bad_first = client.post("/api/score", data="{kapot\n" + good, content_type="application/x-ndjson")
+    assert bad_first.status_code == 400
+
+    header = ",".join(PROFILE)
+    row = ",".join(str(v) for v in PROFILE.values())
+    body = "\n".join([header, row, row, row, row + ",1,2"])
+    lines = client.post("/api/score", data=body, content_type="text/csv").data.decode().strip().splitlines()
+    assert lines[0] == "row,score" and lines[-1].startswith("error,")
+    assert all(l.split(",")[0].isdigit() for l in lines[1:-1])
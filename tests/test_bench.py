@@ -0,0 +1,38 @@
+import json
+
+import bench
+
+
+def test_compare_flags_only_real_regressions():
+    base = {"a": {"p50_ms": 1.0}, "b": {"p50_ms": 0.01}, "c": {"p50_ms": 5.0}}
+    cur = {"a": {"p50_ms": 1.5}, "b": {"p50_ms": 0.03}, "c": {"p50_ms": 5.5}, "new": {"p50_ms": 9.0}}
+    regs = bench.compare(cur, base, threshold=0.25, min_delta_ms=0.05)
+    # b is relatief trager maar valt onder de ruisgrens; c binnen de drempel; new heeft geen baseline
+    assert [r["case"] for r in regs] == ["a"]
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path):
+    out, base = tmp_path / "r.json", tmp_path / "b.json"
+    args = ["--n", "3", "-k", "goodux", "--out", str(out), "--baseline", str(base)]
+    assert bench.main(args + ["--save-baseline"]) == 0
+    results = json.loads(out.read_text())["results"]
+    assert set(results["goodux_collect"]) >= {"p50_ms", "p99_ms", "ops_per_sec"}
+    stored = json.loads(base.read_text())
+    stored["results"]["goodux_collect"]["p50_ms"] = 1e-9
+    base.write_text(json.dumps(stored))
+    assert bench.main(args + ["--min-delta-ms", "0"]) == 1
+
+
+def test_no_projection_cache_bypasses_table(monkeypatch):
+    class Table:
+        def lookup(self, *a):
+            return {"p10": -1.0, "median": -1.0, "p90": -1.0}
+    monkeypatch.setitem(bench.app_module._TABLE, "table", Table())
+    monkeypatch.setitem(bench.app_module._TABLE, "loaded", True)
+    alloc = {"equity": 0.5, "bonds": 0.4, "cash": 0.1}
+    assump = bench._assumptions(0.002)
+    with bench.app.app_context():
+        assert bench._project(100, 1, alloc, assump, sims=64)["median"] == -1.0
+        with bench.no_projection_cache():
+            assert bench._project(100, 1, alloc, assump, sims=64)["median"] > 0
+    assert bench.app.config["PROJECTION_TABLE"]
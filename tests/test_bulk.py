@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import app as app_module
+import bulk
+
+needs_model = pytest.mark.skipif(app_module.MODELS.get() is None, reason="data/model.joblib ontbreekt")
+
+PROFILE = {
+    "leeftijd": 30, "inkomen": 3000, "spaardoel": 2000, "horizon_maanden": 60,
+    "ervaring_level": 1, "buffer_maanden": 4, "vaste_lasten": 1200, "pensioen_inleg": 100,
+    "belasting_schatting": 30, "krediet_bedrag": 0, "krediet_rente": 0, "hypotheek_rente": 3,
+    "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0,
+}
+
+
+def _write_profiles(path, n):
+    rows = [dict(PROFILE, id=f"k{i}", inkomen=2000 + 37 * i, krediet_bedrag=(i % 5) * 9000, krediet_rente=(i % 4) * 3,
+                 horizon_maanden=12 * (1 + i % 15), duurzaam_voorkeur=i % 2, inleg="") for i in range(n)]
+    rows[3]["ervaring_level"] = ""   # ongeldig profiel → foutregel, run gaat door
+    rows[5]["inleg"], rows[6]["inleg"], rows[8]["inleg"] = "abc", "inf", 150   # ongeldige inleg idem
+    cols = list(rows[0])
+    path.write_text("\n".join([",".join(cols)] + [",".join(str(r[c]) for c in cols) for r in rows]) + "\n")
+    return rows
+
+
+@needs_model
+def test_bulk_matches_builder_and_resumes(tmp_path, monkeypatch):
+    src, out = tmp_path / "profielen.csv", str(tmp_path / "plannen.jsonl")
+    rows = _write_profiles(src, 45)
+    stats = bulk.generate(str(src), out, chunk_rows=10, workers=1, verbose=False)
+    assert stats["rows"] == 45 and stats["chunks"] == 5
+    plans = [json.loads(l) for l in open(out)]
+    assert [p["id"] for p in plans] == [r["id"] for r in rows]
+    assert all("error" in plans[i] and "score" not in plans[i] for i in (3, 5, 6))
+    assert plans[8]["inleg"] == 150
+
+    # zelfde plan als de app (score gebatcht, projectie per euro geschaald)
+    ref = app_module.build_good_plan_profile(dict(rows[7]), None)
+    got = plans[7]
+    assert got["score"] == ref["score"] and got["holdings"] == ref["holdings"]
+    assert all(abs(got["projection"][k] / ref["projection"][k] - 1) < 1e-9 for k in ("p10", "median", "p90"))
+
+    # crash midden in chunk 3: half geschreven uitvoer wordt bij --resume afgekapt en opnieuw gedaan
+    full = open(out).read()
+    out2 = str(tmp_path / "hervat.jsonl")
+    real = bulk.plan_chunk
+    def crash(records, start=0, fmt="jsonl"):
+        if start >= 30:
+            with open(out2, "a") as f:
+                f.write('{"id": "half')
+            raise KeyboardInterrupt
+        return real(records, start, fmt)
+    monkeypatch.setattr(bulk, "plan_chunk", crash)
+    with pytest.raises(KeyboardInterrupt):
+        bulk.generate(str(src), out2, chunk_rows=10, workers=1, verbose=False)
+    monkeypatch.setattr(bulk, "plan_chunk", real)
+    stats = bulk.generate(str(src), out2, chunk_rows=10, workers=1, resume=True, verbose=False)
+    assert stats["rows"] == 15 and open(out2).read() == full
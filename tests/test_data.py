@@ -0,0 +1,33 @@
+import pandas as pd
+
+from ml.chunked import BLOCK_ROWS, write_csv
+from ml.gen_data import make_block
+
+
+def test_chunked_output_independent_of_chunk_size(tmp_path):
+    n = 3 * BLOCK_ROWS + 123
+    a = tmp_path / "a.csv"
+    b = tmp_path / "b.csv.gz"
+    write_csv(str(a), make_block, n, seed=5, chunk_rows=BLOCK_ROWS)
+    stats = write_csv(str(b), make_block, n, seed=5, chunk_rows=10 * BLOCK_ROWS, label="label")
+    da, db = pd.read_csv(a), pd.read_csv(b)
+    assert len(da) == n and stats["rows"] == n
+    pd.testing.assert_frame_equal(da, db)
+    assert stats["label_mean"] == da["label"].mean()
+
+
+def test_columnar_matches_csv(tmp_path):
+    from ml.chunked import write_npy
+    from ml.columnar import read_columnar, read_meta
+
+    n = 2 * BLOCK_ROWS + 7
+    write_csv(str(tmp_path / "a.csv"), make_block, n, seed=5)
+    stats = write_npy(str(tmp_path / "a.cols"), make_block, n, seed=5, chunk_rows=BLOCK_ROWS, label="label")
+    csv = pd.read_csv(tmp_path / "a.csv")
+    cols = read_columnar(str(tmp_path / "a.cols"))
+    assert read_meta(str(tmp_path / "a.cols"))["rows"] == n and stats["rows"] == n
+    assert list(cols.columns) == list(csv.columns)
+    assert cols["leeftijd"].dtype == "int16" and cols["inkomen"].dtype == "float32"
+    pd.testing.assert_frame_equal(cols.astype("float64"), csv.astype("float64"), rtol=1e-6)
+    sub = read_columnar(str(tmp_path / "a.cols"), columns=["label", "inkomen"])
+    assert list(sub.columns) == ["label", "inkomen"]
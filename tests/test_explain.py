@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as app_module
+from ml.explain import Explainer, build_explainer, export_explainer, load_explainer_or_none
+
+needs_model = pytest.mark.skipif(app_module.MODELS.get() is None, reason="data/model.joblib ontbreekt")
+
+PROFILE = {
+    "leeftijd": 30, "inkomen": 3000, "spaardoel": 2000, "horizon_maanden": 60,
+    "ervaring_level": 1, "buffer_maanden": 4, "vaste_lasten": 1200, "pensioen_inleg": 100,
+    "belasting_schatting": 30, "krediet_bedrag": 0, "krediet_rente": 0, "hypotheek_rente": 3,
+    "kosten_sensitiviteit": 1, "duurzaam_voorkeur": 0,
+}
+
+
+@pytest.fixture
+def client():
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
+
+
+class _Linear:
+    # p = 0.1 + 0.02·a - 0.01·b; PD per feature is dan exact lineair
+    def predict_proba(self, df):
+        p = 0.1 + 0.02 * df["a"].to_numpy() - 0.01 * df["b"].to_numpy()
+        return np.column_stack([1 - p, p])
+
+
+def test_additive_model_is_explained_exactly():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(0, 10, 300), rng.uniform(0, 5, 300)])
+    ex = Explainer(build_explainer(_Linear(), ["a", "b"], X, grid=12, rows=200))
+    row = {"a": 7.5, "b": 1.0}
+    contrib = ex.contributions(np.array([[7.5, 1.0]]))[0]
+    p = _Linear().predict_proba(pd.DataFrame([row]))[0, 1]
+    assert abs(ex.base + contrib.sum() - p) < 1e-3
+    single = ex.explain(row, 2)
+    assert single == ex.explain_batch(np.array([[7.5, 1.0]]), 2)[0]
+    assert single[0]["feature"] == "a" and single[0]["contribution"] > 0
+
+
+def test_explainer_is_tied_to_model_version(tmp_path, monkeypatch):
+    X = np.random.default_rng(1).uniform(0, 5, (100, 2))
+    path = str(tmp_path / "explain.npz")
+    monkeypatch.setattr(app_module, "EXPLAIN_PATH", path)
+    monkeypatch.setitem(app_module._EXPLAINER, "key", None)
+    monkeypatch.setitem(app_module._EXPLAINER, "explainer", None)
+
+    class Model:
+        cols, backend, version = ["a", "b"], "fast", "nieuw"
+    # hot reload: het nieuwe model is er, de uitleg nog van het vorige model (zelfde kolommen)
+    export_explainer(_Linear(), ["a", "b"], X, path, rows=50, model_version="oud")
+    assert load_explainer_or_none(["a", "b"], "nieuw", path) is None
+    assert load_explainer_or_none(["a", "b"], "oud", path) is not None
+    assert app_module._explainer(Model()) is None
+    export_explainer(_Linear(), ["a", "b"], X, path, rows=50, model_version="nieuw")
+    assert app_module._explainer(Model()).model_version == "nieuw"
+
+
+@needs_model
+def test_plan_lists_drivers(client):
+    model = app_module.MODELS.get()
+    if app_module._explainer(model) is None:
+        pytest.skip("data/explain.npz ontbreekt")
+    risky = dict(PROFILE, krediet_bedrag=40000, krediet_rente=12, buffer_maanden=0)
+    plan = app_module.build_good_plan_profile(risky, None)
+    drivers = plan["risk_ui"]["drivers"]
+    assert len(drivers) == app_module.app.config["EXPLAIN_TOP"] and drivers[0]["label"]
+    assert any(d["feature"].startswith("krediet") and d["contribution"] > 0 for d in drivers)
+    client.get("/mode/good")
+    form = {k: str(v) for k, v in risky.items() if k != "ervaring_level"}
+    html = client.post("/plan", data=dict(form, ervaring_select="licht")).get_data(as_text=True)
+    assert "Belangrijkste factoren" in html
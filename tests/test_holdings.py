@@ -0,0 +1,51 @@
+import numpy as np
+
+import app as app_module
+from holdings import HoldingsStore
+
+
+def _reference(library, alloc, duurzaam, kosten_sens, k=2):
+    # de oorspronkelijke implementatie van _select_holdings
+    picks, fee = {}, 0.0
+    for bucket in ["equity", "bonds", "cash"]:
+        cand = [x for x in library[bucket] if x["esg"] == 1] if duurzaam else list(library[bucket])
+        cand = sorted(cand, key=lambda d: (d["er"], d["name"])) if kosten_sens >= 1 else cand
+        picks[bucket] = cand[:k]
+        if cand[:k]:
+            fee += alloc.get(bucket, 0.0) * (sum(c["er"] for c in cand[:k]) / len(cand[:k]) / 100.0)
+    return picks, fee + 0.0005
+
+
+def test_select_holdings_unchanged():
+    for p in (0.1, 0.5, 0.9):
+        alloc, _, _ = app_module._alloc_from_risk(p)
+        for d in (0, 1):
+            for ks in (0, 1, 2):
+                assert app_module._select_holdings(alloc, d, ks) == _reference(app_module.HOLDINGS_LIBRARY, alloc, d, ks)
+
+
+def test_large_universe_and_filters(tmp_path):
+    rng = np.random.default_rng(0)
+    regions = ["EU", "US", "WORLD"]
+    library = {b: [{"name": f"{b} fund {i}", "ticker": f"{b[:2].upper()}{i}", "er": round(float(rng.uniform(0.03, 0.6)), 2),
+                    "esg": int(rng.random() < 0.3), "region": regions[i % 3], "size": float(rng.uniform(10, 5000))}
+                   for i in range(n)] for b, n in (("equity", 3000), ("bonds", 1500), ("cash", 200))}
+    path = tmp_path / "universe.csv"
+    with open(path, "w") as f:
+        f.write("bucket,name,ticker,er,esg,region,size\n")
+        for b, rows in library.items():
+            f.writelines(f"{b},{r['name']},{r['ticker']},{r['er']},{r['esg']},{r['region']},{r['size']}\n" for r in rows)
+    store = HoldingsStore.load(str(path))
+    assert len(store) == 4700
+    alloc = {"equity": 0.55, "bonds": 0.35, "cash": 0.10}
+    for d, ks, k in ((0, 0, 2), (1, 1, 5), (0, 2, 10)):
+        ref, fee = _reference(library, alloc, d, ks, k)
+        for b in ref:
+            idx, avg = store.top(b, bool(d), ks >= 1, k)
+            assert [r["ticker"] for r in store.records(idx)] == [r["ticker"] for r in ref[b]]
+            assert abs(avg - sum(r["er"] for r in ref[b]) / k) < 1e-12
+
+    idx, avg = store.top("equity", True, True, 3, region=["EU", "WORLD"], min_size=1000)
+    ref = sorted((r for r in library["equity"] if r["esg"] and r["region"] != "US" and r["size"] >= 1000),
+                 key=lambda d: (d["er"], d["name"]))[:3]
+    assert [r["ticker"] for r in store.records(idx)] == [r["ticker"] for r in ref]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.model_runtime import (load_model_or_none, row_from_inputs, predict_proba, predict_proba_batch,
+                              frame_from_records, FastModel)
+
+MODEL, COLS = load_model_or_none()
+pytestmark = pytest.mark.skipif(MODEL is None, reason="data/model.joblib ontbreekt")
+
+
+@pytest.fixture(scope="module")
+def sample():
+    return pd.read_csv("data/synth_train.csv", nrows=500).drop(columns="label")
+
+
+def test_batch_matches_single_row(sample):
+    batch = predict_proba_batch(MODEL, frame_from_records(sample, COLS))
+    single = [predict_proba(MODEL, row_from_inputs(r, COLS)) for r in sample.head(20).to_dict("records")]
+    assert np.allclose(batch[:20], single)
+
+
+def test_fast_model_matches_pipeline(sample):
+    fast = FastModel(MODEL, COLS)
+    ref = predict_proba_batch(MODEL, sample[COLS])
+    assert np.allclose(fast.predict_array(sample[COLS].to_numpy(float)), ref, atol=1e-9)
+    row = dict(sample.iloc[0].to_dict(), duurzaam_voorkeur="on")
+    assert fast.predict_one(row) == pytest.approx(predict_proba(MODEL, row_from_inputs(row, COLS)))
+
+
+def test_compact_export_roundtrip(tmp_path, sample):
+    from ml.compact_model import export_compact, CompactModel
+    path = export_compact(MODEL, COLS, str(tmp_path / "model.npz"))
+    compact = CompactModel.load(path)
+    X = sample[COLS].to_numpy(float)
+    X[::7, 1] = np.nan  # ontbrekende waarden volgen missing_go_to_left
+    ref = predict_proba_batch(MODEL, pd.DataFrame(X, columns=COLS))
+    assert np.allclose(compact.predict_array(X), ref, atol=1e-9)
+    # gedeeld via mmap, geen private kopie; zelfde uitkomst als volledig inlezen
+    from ml.compact_model import mmap_npz
+    assert all(isinstance(v, np.memmap) for k, v in mmap_npz(path).items() if v.ndim and v.size)
+    assert isinstance(compact.value, np.memmap) or isinstance(compact.value.base, np.memmap)
+    assert np.array_equal(CompactModel.load(path, mmap=False).predict_array(X), compact.predict_array(X))
+
+
+def test_registry_swaps_after_stable_change(tmp_path):
+    from ml.model_runtime import ModelRegistry, LoadedModel
+
+    artifact = tmp_path / "model.bin"
+    artifact.write_text("v1")
+    loads = []
+
+    def loader(backend):
+        loads.append(artifact.read_text())
+        return LoadedModel(MODEL, COLS, backend)
+
+    reg = ModelRegistry("pipeline", loader=loader)
+    reg.paths = [str(artifact)]
+    first = reg.get()
+    v1 = reg.info()["version"]
+
+    artifact.write_text("v2-longer")
+    assert not reg.check_for_update()  # eerste ronde: wijziging gezien, nog niet stabiel
+    assert reg.check_for_update()      # tweede ronde: laden, valideren, inwisselen
+    assert reg.get() is not first and reg.info()["version"] != v1
+    assert loads == ["v1", "v2-longer"] and reg.reloads == 1
+
+
+def test_surrogate_guard_falls_back_to_full_model(tmp_path, sample):
+    from ml.surrogate import export_surrogate, Surrogate
+    from ml.model_runtime import GuardedSurrogate
+    path = str(tmp_path / "surrogate.npz")
+    report = export_surrogate(MODEL, COLS, sample, path, rows=400)
+    assert report["rows"] == 50 and 0 <= report["mean_abs_dev"] <= report["p99_abs_dev"] <= report["max_abs_dev"]
+    # bewaakt: elke geserveerde score valt in hetzelfde risiconiveau als die van het volledige model
+    assert report["served_max_abs_dev"] <= report["max_abs_dev"] and report["level_agreement"] == 1.0
+    fast = FastModel(MODEL, COLS)
+    guarded = GuardedSurrogate(Surrogate.load(path), fast)
+    X = sample[COLS].to_numpy(float)
+    batch = guarded.predict_array(X[:50])
+    assert np.allclose(batch, [guarded.predict_one(r) for r in sample[COLS].head(50).to_dict("records")])
+    # buffer van 24 maanden zit niet in de fitdata (max 12): volledig model, exact
+    row = dict(sample.iloc[0].to_dict(), buffer_maanden=24)
+    before = guarded.fallbacks
+    assert guarded.predict_one(row) == fast.predict_one(row) and guarded.fallbacks == before + 1
+    with pytest.raises(ValueError):
+        export_surrogate(MODEL, COLS, sample, str(tmp_path / "strict.npz"), rows=400, max_dev=1e-6)
+    # zonder foutgrens (negatieve marge) klopt het niveau niet overal: weigeren, niets schrijven
+    with pytest.raises(ValueError, match="risiconiveau"):
+        export_surrogate(MODEL, COLS, sample, str(tmp_path / "loose.npz"), rows=400, margin=-1.0)
+    assert not (tmp_path / "loose.npz").exists() and not (tmp_path / "strict.npz").exists()
+
+
+def test_provider_retries_missing_model():
+    from ml.model_runtime import ModelProvider, LoadedModel
+    results = [None, LoadedModel(object(), ["a"], "fast")]
+    provider = ModelProvider(loader=lambda backend: results.pop(0), retry_interval=0.0)
+    assert provider.get() is None and not provider.loaded
+    assert provider.get() is not None and provider.loaded   # na training alsnog zichtbaar
+    assert provider.get() is provider.get() and results == []
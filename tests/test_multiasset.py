@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import multiasset as ma
+
+GROUPS = ["equity"] * 3 + ["bonds"] * 2
+COV = ma.correlated_cov(GROUPS, [0.15, 0.18, 0.12, 0.05, 0.04], {"equity": 0.8, "bonds": 0.7}, {("equity", "bonds"): 0.1})
+UNIVERSE = ma.Universe(["a", "b", "c", "d", "e"], [0.05, 0.06, 0.04, 0.02, 0.02], COV)
+WEIGHTS = np.array([0.2, 0.2, 0.2, 0.25, 0.15])
+
+
+@pytest.mark.parametrize("model", [ma.NormalReturns(), ma.StudentTReturns(5)])
+def test_portfolio_collapse_matches_full_draw(model):
+    # herbalanceren: één portefeuillereeks heeft dezelfde verdeling als de gecorreleerde trekking @ w
+    means, chol = UNIVERSE.monthly()
+    full = model.draw(np.random.default_rng(1), 4000, 50, means, chol) @ WEIGHTS
+    port = model.portfolio(np.random.default_rng(2), 4000, 50, means, chol, WEIGHTS)
+    assert abs(full.mean() - port.mean()) < 2e-4
+    assert abs(full.std() / port.std() - 1) < 0.01
+    assert abs(port.std() / np.sqrt(WEIGHTS @ COV @ WEIGHTS / 12) - 1) < 0.01
+    a = ma.project(100, 5, UNIVERSE, WEIGHTS, model, sims=20000, rebalance=True)
+    b = ma.project(100, 5, UNIVERSE, WEIGHTS, model, sims=20000, rebalance=False)
+    assert abs(a["median"] / b["median"] - 1) < 0.02
+
+
+def test_student_t_has_fatter_tails():
+    z = ma.StudentTReturns(4.5).shocks(np.random.default_rng(0), (200_000, 1))
+    assert abs(z.std() - 1) < 0.03
+    assert np.mean(np.abs(z) > 3) > 2 * np.mean(np.abs(np.random.default_rng(0).standard_normal(200_000)) > 3)
+
+
+def test_bootstrap_from_csv(tmp_path):
+    path = tmp_path / "hist.csv"
+    path.write_text("datum,a,b,c,d,e\n2024-01,0.01,0.02,0.0,0.001,0.002\n2024-02,-0.02,-0.01,0.01,0.003,0.0\n")
+    model = ma.return_model("bootstrap", history_csv=str(path))
+    r = ma.draw_returns(UNIVERSE, model, 100, 12)
+    assert r.shape == (100, 12, 5)
+    assert set(map(tuple, r.reshape(-1, 5))) <= {(0.01, 0.02, 0.0, 0.001, 0.002), (-0.02, -0.01, 0.01, 0.003, 0.0)}
+    assert ma.project(50, 2, UNIVERSE, WEIGHTS, model)["p10"] > 0
+    with pytest.raises(ValueError):
+        ma.draw_returns(ma.Universe(["x"], [0.05], [[0.01]]), model, 10, 12)
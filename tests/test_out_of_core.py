@@ -0,0 +1,61 @@
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import roc_auc_score, average_precision_score
+
+from ml.gen_data import make_block
+from ml.out_of_core import Reservoir, StreamingMetrics, remap_thresholds, build_binned_store, fit_codes
+from ml.columnar import write_columnar
+from ml import train
+
+
+def test_binned_fit_matches_scaled_space(tmp_path):
+    df = make_block(6000, np.random.default_rng(1))
+    features = [c for c in df.columns if c != "label"]
+    write_columnar(df, str(tmp_path / "t.cols"))
+    store = build_binned_store(str(tmp_path / "t.cols"), features, chunk_rows=1000, calib_frac=0.1,
+                               work_dir=str(tmp_path / "work"), verbose=False)
+    X, y = store.subsample(10**9, 0)
+    assert len(y) == store.n_rows and X.dtype == np.float32
+    # fit op codes, voorspel daarna op geschaalde floats: identiek na remap
+    Xs = store.scaler.transform(df[features].to_numpy(np.float64))
+    codes = fit_codes(store.bin_mapper.transform(Xs))
+    clf = HistGradientBoostingClassifier(max_iter=20, random_state=0).fit(codes, df["label"])
+    p_codes = clf.predict_proba(codes)[:, 1]
+    remap_thresholds(clf, store.edges)
+    np.testing.assert_allclose(clf.predict_proba(Xs)[:, 1], p_codes, rtol=0, atol=1e-12)
+    store.close()
+
+
+def test_train_out_of_core_with_missing_values(tmp_path, monkeypatch):
+    df = make_block(4000, np.random.default_rng(2))
+    rng = np.random.default_rng(3)
+    df.loc[rng.random(len(df)) < 0.2, "inkomen"] = np.nan
+    df.loc[rng.random(len(df)) < 0.05, "krediet_rente"] = np.nan
+    write_columnar(df, str(tmp_path / "t.cols"))
+    saved = {}
+    monkeypatch.setattr(train, "save_model", lambda calib, features, background=None, **kw: saved.update(
+        calib=calib, features=features))
+    train.main(["--out-of-core", "--search", "none", "--train-path", str(tmp_path / "t.cols"),
+                "--valid-path", str(tmp_path / "geen.cols"), "--chunk-rows", "1000",
+                "--calib-frac", "0.1", "--work-dir", str(tmp_path / "work")])
+    X = df[saved["features"]]
+    p = saved["calib"].predict_proba(X)[:, 1]
+    assert np.isfinite(p).all()
+    assert roc_auc_score(df["label"], p) > 0.7
+    assert not (tmp_path / "work").exists()
+
+
+def test_streaming_metrics_and_reservoir():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 5000)
+    p = np.clip(0.3 * y + rng.random(5000) * 0.7, 0, 1)
+    m = StreamingMetrics()
+    for s in range(0, 5000, 700):
+        m.update(y[s:s + 700], p[s:s + 700])
+    r = m.result()
+    assert abs(r["auc"] - roc_auc_score(y, p)) < 1e-3
+    assert abs(r["ap"] - average_precision_score(y, p)) < 1e-2
+    res = Reservoir(100, 0)
+    for s in range(0, 5000, 700):
+        res.add(p[s:s + 700, None], y[s:s + 700])
+    assert len(res.y) == 100
@@ -0,0 +1,123 @@
+import numpy as np
+
+import projection
+
+ALLOC = {"equity": 0.55, "bonds": 0.35, "cash": 0.10}
+ASSUMP = {
+    "equity_mean": 0.05, "equity_vol": 0.15,
+    "bonds_mean": 0.02, "bonds_vol": 0.05,
+    "cash_mean": 0.01, "cash_vol": 0.01,
+    "fee_annual": 0.0016,
+}
+
+
+def test_recursion_matches_monthly_loop():
+    rng = np.random.default_rng(3)
+    means, vols, weights, fee_m = projection.monthly_params(ALLOC, ASSUMP)
+    growth = projection.growth_factors(rng, 50, 36, means, vols, weights, fee_m)
+    port = np.zeros(50)
+    for t in range(36):
+        port = (port + 150) * growth[:, t]
+    assert np.allclose(projection.finals_from_growth(150, growth), port)
+
+
+def test_project_contract_and_determinism():
+    a = projection.project(100, 5, ALLOC, ASSUMP, sims=400, seed=7)
+    b = projection.project(100, 5, ALLOC, ASSUMP, sims=400, seed=7)
+    assert set(a) == {"p10", "median", "p90"}
+    assert a == b
+    assert a["p10"] < a["median"] < a["p90"]
+
+
+def test_analytic_mode_close_to_simulation():
+    mc = projection.project(100, 10, ALLOC, ASSUMP, sims=50_000, seed=1)
+    an = projection.project(100, 10, ALLOC, ASSUMP, mode="analytic")
+    for k in mc:
+        assert abs(an[k] / mc[k] - 1) < 0.02
+
+
+def test_cache_lru_counters():
+    cache = projection.ProjectionCache(maxsize=2, ttl=0)
+    calls = []
+
+    def compute(v):
+        calls.append(v)
+        return {"p10": v, "median": v, "p90": v}
+
+    for v in (1, 2, 1, 3, 2):
+        key = projection.cache_key(v, 1, ALLOC, ASSUMP, 800, 7, "mc")
+        assert cache.get_or_compute(key, lambda: compute(v))["median"] == v
+    # 1 en 2 gemist, 1 geraakt, 3 gemist (evict 2), 2 opnieuw gemist (evict 1)
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 4, "evictions": 2}
+
+
+def test_variance_reduced_modes_match_reference():
+    ref = projection.project(100, 10, ALLOC, ASSUMP, sims=100_000, seed=1)
+    for mode in ("antithetic", "sobol", "sobol+cv", "mc+cv"):
+        sims = 128 if mode.startswith("sobol") else 800
+        r = projection.project(100, 10, ALLOC, ASSUMP, sims=sims, seed=3, mode=mode)
+        assert set(r) == {"p10", "median", "p90", "se", "sims"}
+        for k in ("p10", "median", "p90"):
+            assert abs(r[k] / ref[k] - 1) < 0.03
+            assert 0 < r["se"][k] < 0.03 * r[k]
+    assert projection.project(100, 10, ALLOC, ASSUMP, sims=128, seed=3, mode="sobol") == \
+        projection.project(100, 10, ALLOC, ASSUMP, sims=128, seed=3, mode="sobol")
+
+
+def test_sobol_beats_plain_mc_with_fewer_paths():
+    ref = projection.project(100, 5, ALLOC, ASSUMP, sims=200_000, seed=99)
+    def rmse(mode, sims):
+        errs = [projection.project(100, 5, ALLOC, ASSUMP, sims=sims, seed=s, mode=mode)["p10"] / ref["p10"] - 1
+                for s in range(40)]
+        return float(np.sqrt(np.mean(np.square(errs))))
+    assert rmse("sobol+cv", 128) < rmse("mc", 800)
+
+
+def test_projection_table_lookup(tmp_path):
+    base = dict(ASSUMP, fee_annual=0.0)
+    path = str(tmp_path / "t.npz")
+    projection.ProjectionTable.build([(ALLOC, base, [0.0016])], sims=300).save(path)
+    table = projection.ProjectionTable.load(path)
+    for jaren in (1, 6, 10):
+        # op een roosterpunt exact, ertussen geïnterpoleerd over de fee
+        for fee, tol in ((0.0016, 1e-12), (0.00237, 1e-5)):
+            assump = dict(ASSUMP, fee_annual=fee)
+            live = projection.project(120, jaren, ALLOC, assump, sims=300, seed=7)
+            hit = table.lookup(120, jaren, ALLOC, assump, 300, 7, "mc")
+            assert all(abs(hit[k] / live[k] - 1) < tol for k in live)
+    assert table.lookup(120, 11, ALLOC, ASSUMP, 300, 7, "mc") is None          # buiten de horizonnen
+    assert table.lookup(120, 5, ALLOC, ASSUMP, 800, 7, "mc") is None           # andere sims
+    assert table.lookup(120, 5, ALLOC, dict(ASSUMP, equity_mean=0.06), 300, 7, "mc") is None
+
+
+def test_sweep_shares_draws_across_points():
+    risky = {"equity": 0.30, "bonds": 0.55, "cash": 0.15}
+    points = [(100, 120, ALLOC, ASSUMP), (250, 120, ALLOC, ASSUMP), (100, 36, ALLOC, ASSUMP),
+              (100, 120, risky, ASSUMP), (100, 120, ALLOC, dict(ASSUMP, fee_annual=0.004))]
+    full, double, short, defensive, costly = projection.sweep(points, sims=400, seed=7)
+    ref = projection.project(100, 10, ALLOC, ASSUMP, sims=400, seed=7)
+    assert all(abs(full[k] / ref[k] - 1) < 1e-12 for k in ref)   # langste horizon = simulate()
+    assert all(abs(double[k] / full[k] - 2.5) < 1e-12 for k in ref)
+    # kortere horizon = de eerste 36 maanden van dezelfde paden
+    means, vols, weights, fee_m = projection.monthly_params(ALLOC, ASSUMP)
+    draws = np.random.default_rng(7).standard_normal((400, 120, 3))[:, :36]
+    finals = projection.finals_from_growth(100, (1 + draws @ (weights * vols) + means @ weights) * fee_m)
+    assert abs(short["median"] / np.median(finals) - 1) < 1e-12
+    # zelfde scenario's: hogere kosten geven op elk percentiel minder
+    assert all(costly[k] < full[k] for k in ref) and defensive["p90"] < full["p90"]
+
+
+def test_weighted_percentiles_with_negative_weights():
+    # E[C] ver boven het steekproefgemiddelde: regressiegewichten in de linkerstaart worden negatief
+    finals = np.random.default_rng(0).lognormal(0, 0.5, 200)
+    c = finals - finals.mean()
+    w = 1 / len(finals) + 0.6 * finals.mean() * c / (c @ c)
+    assert (w < 0).any()
+    w = np.clip(w, 0, None) / np.clip(w, 0, None).sum()
+    order = np.argsort(finals)
+    cum = np.cumsum(w[order])
+    got = projection.weighted_percentiles(finals, finals, 1.6 * finals.mean())
+    for k, q in projection.PERCENTILES.items():
+        assert got[k] == finals[order][np.argmax(cum >= q / 100)]
+    assert got["p10"] <= got["median"] <= got["p90"]
@@ -0,0 +1,65 @@
+import json
+
+import pandas as pd
+
+from ml.search import hyperband_brackets, run_search
+from ml.train import build_pipeline, param_space
+
+
+def test_halving_bracket_ends_on_all_rows():
+    [(n, r, rungs)] = hyperband_brackets(60, 3, 1000, 30000, "halving")
+    assert (n, rungs) == (60, 4) and round(r * 3 ** (rungs - 1)) == 30000
+    brackets = hyperband_brackets(60, 3, 1000, 30000, "hyperband")
+    assert [b[2] for b in brackets] == [4, 3, 2, 1]
+
+
+def test_search_resumes_from_checkpoint(tmp_path):
+    df = pd.read_csv("data/synth_train.csv", nrows=900)
+    features = [c for c in df.columns if c != "label"]
+    ckpt = tmp_path / "ckpt.json"
+    kwargs = dict(strategy="halving", n_candidates=3, factor=3, min_resources=300, cv_folds=3,
+                  n_jobs=1, seed=1, checkpoint_path=str(ckpt), verbose=0)
+    best, score, history = run_search(build_pipeline(features), param_space, df[features], df["label"].values, **kwargs)
+    saved = json.loads(ckpt.read_text())["results"]
+    assert len(saved) == len(history) == 4
+
+    # tweede run rekent niets opnieuw: bij gelijke scores wint c0, en diens score komt uit het checkpoint
+    saved = {k: 0.5 for k in saved if k.startswith("b0:r0:")}
+    saved["b0:r1:c0"] = 0.99
+    ckpt.write_text(json.dumps({"signature": json.loads(ckpt.read_text())["signature"], "results": saved}))
+    best2, score2, _ = run_search(build_pipeline(features), param_space, df[features], df["label"].values, **kwargs)
+    assert score2 == 0.99
+
+
+def test_checkpoint_mismatch_is_value_error(tmp_path):
+    import pytest
+    from ml.search import Checkpoint
+    path = tmp_path / "ckpt.json"
+    path.write_text(json.dumps({"signature": {"seed": 1}, "results": {}}))
+    with pytest.raises(ValueError, match="andere instellingen"):
+        Checkpoint(str(path), {"seed": 2})
+
+
+def test_checkpoint_tied_to_data(tmp_path):
+    import pytest
+    from ml.search import CheckpointMismatch, data_signature
+    from ml import train
+    df = pd.read_csv("data/synth_train.csv", nrows=600)
+    features = [c for c in df.columns if c != "label"]
+    X, y = df[features], df["label"].values
+    base = data_signature(X, y)
+    assert data_signature(X, y) == base
+    assert data_signature(X[features[:-1]], y) != base                  # andere --columns
+    assert data_signature(X, y[::-1]) != base                           # zelfde aantal rijen, andere labels
+    assert data_signature(X * 1.01, y) != base                          # hergegenereerde features
+    assert data_signature(X.to_numpy(), y)["columns"] is None           # bin-codes (out-of-core)
+
+    ckpt = str(tmp_path / "ckpt.json")
+    kwargs = dict(strategy="halving", n_candidates=1, factor=3, min_resources=600, cv_folds=2,
+                  n_jobs=1, seed=1, checkpoint_path=ckpt, verbose=0)
+    run_search(build_pipeline(features), param_space, X, y, **kwargs)
+    other = pd.read_csv("data/synth_train.csv", skiprows=range(1, 601), nrows=600)
+    with pytest.raises(CheckpointMismatch):
+        run_search(build_pipeline(features), param_space, other[features], other["label"].values, **kwargs)
+    assert train.parse_args(["--out-of-core"]).checkpoint == train.CHECKPOINT_OOC_OUT
+    assert train.parse_args([]).checkpoint == train.CHECKPOINT_OUT
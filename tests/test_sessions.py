@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+import app as app_module
+from sessions import MemoryStore, SQLiteStore, make_session_interface
+
+needs_model = pytest.mark.skipif(app_module.MODELS.get() is None, reason="data/model.joblib ontbreekt")
+
+
+def test_memory_store_lru_and_ttl(monkeypatch):
+    store = MemoryStore(maxsize=2, ttl=10)
+    store.set("a", "1"); store.set("b", "2")
+    assert store.get("a") == "1"          # a is nu het recentst gebruikt
+    store.set("c", "3")
+    assert store.get("b") is None and store.get("a") == "1" and len(store) == 2
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert store.get("a") is None
+
+
+def test_sqlite_store_shared_between_workers(tmp_path, monkeypatch):
+    path = str(tmp_path / "s.sqlite3")
+    a, b = SQLiteStore(path, ttl=10), SQLiteStore(path, ttl=10)   # twee workers, één bestand
+    a.set("sid", '{"mode": "bad"}')
+    assert b.get("sid") == '{"mode": "bad"}'
+    b.delete("sid")
+    assert a.get("sid") is None
+    a.set("old", "x")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert a.get("old") is None and len(a) == 0
+
+
+@needs_model
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_cookie_holds_only_session_id(backend, tmp_path, monkeypatch):
+    iface = make_session_interface(backend, sqlite_path=str(tmp_path / "s.sqlite3"))
+    monkeypatch.setattr(app_module.app, "session_interface", iface)
+    client = app_module.app.test_client()
+    client.get("/mode/bad")
+    form = {"inkomen": "2500", "horizon_maanden": "24", "spaardoel": "1234567890" * 200}
+    assert client.post("/plan", data=form).status_code == 200
+    cookie = client.get_cookie(app_module.app.config["SESSION_COOKIE_NAME"])
+    assert len(cookie.value) < 64
+    with client.session_transaction() as sess:
+        assert sess["mode"] == "bad" and len(sess["sticky_index"]["spaardoel"]) == 2000
+    assert len(iface.store) == 1
@@ -0,0 +1,6 @@
+# wsgi.py
+# Pre-fork entrypoint: `gunicorn --preload -w 4 wsgi:app`
+# Het model wordt in het master-proces geladen en opgewarmd; workers erven het (copy-on-write).
+from app import app, warmup
+
+warmup()